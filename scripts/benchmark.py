@@ -0,0 +1,870 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the stations service.
+
+Run from the repository root, for example:
+    python scripts/benchmark.py json --counts 100 1000 10000
+"""
+
+import argparse
+import asyncio
+import csv
+import gc
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Tuple
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+
+import requests
+from flask import Flask
+
+from src import compression, geo, json_provider
+from src.geo import GeoGridIndex, haversine_km
+from src.json_provider import PROVIDERS
+from src.logging_config import begin_request_sampling, configure_logging, end_request_sampling, sampled_logger
+from src.search import NameSearchIndex
+from src.station_source import StationFileSource, read_station_file
+from src.stations import StationRecord, StationStore
+from src.upstream import AsyncStationUpstream, StationUpstream
+from test_stations_endpoint import run_load_test
+
+CITIES = ["New York", "Chicago", "Los Angeles", "Philadelphia", "Boston",
+          "Seattle", "Denver", "Atlanta", "Houston", "Miami"]
+
+
+def make_stations(count: int) -> List[Dict[str, Any]]:
+    """Generate a synthetic station catalogue of the given size."""
+    return [
+        {
+            "id": f"st{i:07d}",
+            "name": f"Station {i}",
+            "city": CITIES[i % len(CITIES)],
+            "code": f"C{i:06d}"
+        }
+        for i in range(count)
+    ]
+
+
+def time_call(func, repeat: int = 5) -> float:
+    """Return the best per-call time in seconds for a zero-argument callable."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def print_header(title: str):
+    print("=" * 50)
+    print(title)
+    print("=" * 50)
+
+
+def bench_json(counts: List[int]):
+    """Compare encode time per station count for each available JSON provider."""
+    app = Flask(__name__)
+    providers = {name: cls(app) for name, cls in PROVIDERS.items()
+                 if name != 'orjson' or json_provider.orjson is not None}
+    if 'orjson' not in providers:
+        print("orjson is not installed; only the stdlib encoder is measured")
+
+    print_header("JSON encode time (dumps_bytes, best of 5)")
+    names = sorted(providers)
+    print(f"{'stations':>10} " + " ".join(f"{name + ' ms':>12}" for name in names) + f" {'speedup':>8}")
+    for count in counts:
+        stations = make_stations(count)
+        timings = {name: time_call(lambda p=providers[name]: p.dumps_bytes(stations)) for name in names}
+        row = f"{count:>10} " + " ".join(f"{timings[name] * 1000:>12.3f}" for name in names)
+        if 'orjson' in timings:
+            row += f" {timings['stdlib'] / timings['orjson']:>7.1f}x"
+        print(row)
+
+
+def bench_stream(counts: List[int]):
+    """Measure time-to-first-byte and peak traced memory of /stations?stream=ndjson."""
+    from src import app as app_module
+
+    client = app_module.app.test_client()
+    print_header("NDJSON streaming: time to first chunk and peak memory")
+    print(f"{'stations':>10} {'ttfb ms':>10} {'total ms':>10} {'peak KiB':>10} {'list peak KiB':>14}")
+    for count in counts:
+        app_module.STATIONS_DATA = make_stations(count)
+        store = app_module._get_station_store()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        response = client.get('/stations?stream=ndjson', buffered=False)
+        chunks = iter(response.response)
+        next(chunks)
+        ttfb = time.perf_counter() - start
+        for _ in chunks:
+            pass
+        total = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        response.close()
+
+        # For comparison: materializing the whole body as the non-streaming path does
+        tracemalloc.reset_peak()
+        app_module.app.json.dumps_bytes(store.find())
+        _, list_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"{count:>10} {ttfb * 1000:>10.2f} {total * 1000:>10.1f} {peak / 1024:>10.0f} {list_peak / 1024:>14.0f}")
+
+
+def bench_compression(counts: List[int], requests_per_mode: int):
+    """Measure bytes on the wire and CPU per /stations request with compression off, cached and per request."""
+    from src import app as app_module
+
+    client = app_module.app.test_client()
+    cache = app_module._response_cache
+    print_header("Response compression: unfiltered /stations, bytes sent and CPU per request")
+    print(f"{'stations':>10} {'mode':<18} {'bytes':>12} {'ratio':>7} {'CPU ms/req':>11}")
+    modes = [('off', None, True)]
+    for encoding in compression.available_encodings():
+        modes += [(f"{encoding}, cached", encoding, True), (f"{encoding}, per request", encoding, False)]
+    for count in counts:
+        app_module.STATIONS_DATA = make_stations(count)
+        app_module._get_station_store()
+        plain_size = None
+        for name, encoding, stored in modes:
+            headers = {'Accept-Encoding': encoding} if encoding else {}
+            if not stored:
+                # Compress on every response, as without stored variants
+                cache.encoded = lambda version, key, entry, encoding: compression.compress(entry.body, encoding)
+            size = len(client.get('/stations', headers=headers).data)
+            start = time.process_time()
+            for _ in range(requests_per_mode):
+                client.get('/stations', headers=headers)
+            cpu = (time.process_time() - start) / requests_per_mode
+            cache.__dict__.pop('encoded', None)
+            plain_size = plain_size or size
+            print(f"{count:>10} {name:<18} {size:>12,} {plain_size / size:>6.1f}x {cpu * 1000:>11.3f}")
+
+
+def bench_filters(counts: List[int], queries: int):
+    """Compare composed index filters with a linear scan, and full with projected payload sizes."""
+    from src import app as app_module
+
+    client = app_module.app.test_client()
+    print_header("Multi-field filters: indexed intersection vs linear scan, and fields=code payloads")
+    print(f"{'stations':>10} {'mode':<22} {'us/query':>10}")
+    for count in counts:
+        raw = make_stations(count)
+        store = StationStore(raw, lambda record: True)
+        rng = random.Random(count)
+        filters = [
+            {'city': rng.sample(CITIES, 2), 'code': [f"C{rng.randrange(count):06d}" for _ in range(20)],
+             'id': [f"st{rng.randrange(count):07d}" for _ in range(20)]}
+            for _ in range(queries)
+        ]
+
+        def scan():
+            for query in filters:
+                cities = {city.casefold() for city in query['city']}
+                codes = {code.casefold() for code in query['code']}
+                ids = set(query['id'])
+                [s for s in raw if s['city'].casefold() in cities and s['code'].casefold() in codes
+                 and s['id'] in ids]
+
+        def indexed():
+            for query in filters:
+                store.page(**query)
+
+        for name, run in (('linear scan', scan), ('indexed intersection', indexed)):
+            start = time.perf_counter()
+            run()
+            print(f"{count:>10} {name:<22} {(time.perf_counter() - start) / queries * 1e6:>10.1f}")
+
+        app_module.STATIONS_DATA = raw
+        app_module._get_station_store()
+        full = len(client.get('/stations').data)
+        projected = len(client.get('/stations?fields=code').data)
+        print(f"{count:>10} {'payload bytes':<22} {full:>,} full, {projected:,} with fields=code "
+              f"({full / projected:.1f}x smaller)")
+
+
+def traced_bytes(build) -> int:
+    """
+    Return the traced memory still held by the result of ``build()``.
+
+    ``build`` returns the raw input list as well as the structure under test,
+    so the input can be released before measuring.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    raw, result = build()
+    del raw
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def bench_memory(counts: List[int]):
+    """Compare bytes per station for dict records, slotted records and the whole store."""
+    print_header("Station storage: bytes per station")
+    print(f"{'stations':>10} {'dicts':>10} {'records':>10} {'store':>10} {'+search/geo':>12}")
+    for count in counts:
+        # Round-trip through JSON so every row owns its own strings, as parsed data would
+        payload = json.dumps(make_stations(count))
+        dicts = traced_bytes(lambda: (None, json.loads(payload)))
+        records = traced_bytes(lambda: _with_raw(json.loads(payload),
+                                                 lambda raw: [StationRecord.from_dict(s) for s in raw]))
+        store = traced_bytes(lambda: _with_raw(json.loads(payload), _detached_store))
+        full = traced_bytes(lambda: _with_raw(json.loads(payload), _detached_full_store))
+        print(f"{count:>10} {dicts / count:>10.0f} {records / count:>10.0f} {store / count:>10.0f} "
+              f"{full / count:>12.0f}")
+    print("dicts: parsed list of dicts; records: slotted StationRecord list; "
+          "store: StationStore with its id/city/code indexes, as loaded; "
+          "+search/geo: the store once /stations/search and /stations/nearby have built their indexes")
+
+
+def _detached_store(raw) -> StationStore:
+    """Build a store and drop its reference to the input, to measure the store alone."""
+    store = StationStore(raw, lambda station: True)
+    store.source = None
+    return store
+
+
+def _detached_full_store(raw) -> StationStore:
+    """Build a detached store along with its lazily built name search and geo indexes."""
+    store = _detached_store(raw)
+    store.search_index
+    store.geo_index
+    return store
+
+
+def _with_raw(raw, build):
+    """Return (raw, build(raw)) so traced_bytes can release the raw input."""
+    return raw, build(raw)
+
+
+def bench_logging(iterations: int):
+    """Compare the per-request cost of the two /stations log lines, as seen by the request thread."""
+    logger = logging.getLogger('bench.stations')
+    sampled = sampled_logger('bench.stations')
+    root = logging.getLogger()
+    city, code, count = 'Chicago', 'CHI', 1
+
+    def eager():
+        logger.info(f"Fetching stations with filters - city: '{city}', code: '{code}'")
+        logger.info(f"Successfully retrieved {count} stations after filtering")
+
+    def lazy():
+        # As in the app: a sampled logger, and costly arguments behind isEnabledFor
+        if sampled.isEnabledFor(logging.INFO):
+            sampled.info("Fetching stations with filters - city: '%s', code: '%s'", ','.join([city]), code)
+        sampled.info("Successfully retrieved %d stations after filtering", count)
+
+    def per_request(log) -> float:
+        # CPU time of the request thread only: work moved to the listener
+        # thread is deliberately excluded. Each iteration makes a fresh
+        # sampling decision, as the request hooks do.
+        best = float('inf')
+        for _ in range(3):
+            start = time.thread_time()
+            for _ in range(iterations):
+                token = begin_request_sampling('/stations')
+                log()
+                end_request_sampling(token)
+            best = min(best, time.thread_time() - start)
+        return best / iterations
+
+    with tempfile.TemporaryFile('w') as sink:
+        saved_handlers, saved_level = root.handlers[:], root.level
+        try:
+            baseline = per_request(lambda: None)
+
+            # Before: synchronous stream handler and eagerly formatted messages
+            root.handlers = [logging.StreamHandler(sink)]
+            root.handlers[0].setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+            root.setLevel(logging.INFO)
+            results = [('sync handler, f-strings', per_request(eager))]
+
+            # After: queue handler, JSON formatting on the listener thread
+            root.handlers = []
+            for label, rates in (('queue + json, lazy', {}), ('queue + json, lazy, 1% sampled', {'/stations': 0.01})):
+                listener = configure_logging('INFO', 'json', rates, stream=sink)
+                results.append((label, per_request(lazy)))
+                listener.stop()
+        finally:
+            root.handlers, root.level = saved_handlers, saved_level
+
+    print_header(f"Request-thread logging cost per /stations request ({iterations} requests, 2 lines each)")
+    print(f"{'configuration':<34} {'us/request':>12}")
+    for label, seconds in results:
+        print(f"{label:<34} {(seconds - baseline) * 1e6:>12.1f}")
+
+
+NAME_KINDS = ["Station", "Junction", "Central", "Park", "Halt", "Terminal", "Road", "Street", "Square", "Parkway"]
+
+
+def make_station_names(count: int, seed: int = 7) -> List[str]:
+    """Generate varied station names: one or two made-up place words and a kind."""
+    rng = random.Random(seed)
+    syllables = [c + v + e for c in "bcdfghjklmnprstvwz" for v in "aeiou" for e in ("", "n", "r", "l", "s")]
+    places = ["".join(rng.choice(syllables) for _ in range(rng.randint(2, 3))).capitalize()
+              for _ in range(max(1, count // 3))]
+    return [
+        " ".join(rng.sample(places, rng.choice((1, 1, 2))) + [rng.choice(NAME_KINDS)])
+        for _ in range(count)
+    ]
+
+
+def make_search_queries(names: List[str], count: int, seed: int = 11) -> Dict[str, List[str]]:
+    """Build typeahead queries of each kind from real names."""
+    rng = random.Random(seed)
+
+    def typo(word: str) -> str:
+        i = rng.randrange(len(word))
+        return word[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + word[i + 1:]
+
+    picks = [rng.choice(names) for _ in range(count)]
+    return {
+        'prefix': [name[:rng.randint(1, 6)] for name in picks],
+        'two words': [" ".join(name.split()[:2])[:-1] for name in picks],
+        'later word': [name.split()[-1][:4] for name in picks],
+        'typo': [" ".join(typo(word) if len(word) > 4 else word for word in name.split()) for name in picks],
+        'no match': ["".join(rng.choice("xqz") for _ in range(6)) for _ in picks],
+    }
+
+
+def bench_search(counts: List[int], queries: int, limit: int):
+    """Measure /stations/search index build cost and per-query latency percentiles."""
+    print_header(f"Station name search (limit {limit}, {queries} queries per kind)")
+    print(f"{'stations':>10} {'build ms':>10} {'index MiB':>10}  {'query kind':<12} "
+          f"{'p50 us':>8} {'p99 us':>8} {'max us':>8} {'hits':>6}")
+    for count in counts:
+        names = make_station_names(count)
+        start = time.perf_counter()
+        NameSearchIndex(names)
+        build = time.perf_counter() - start
+
+        gc.collect()
+        tracemalloc.start()
+        index = NameSearchIndex(names)
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        for kind, batch in make_search_queries(names, queries).items():
+            timings = []
+            hits = 0
+            for query in batch:
+                begin = time.perf_counter()
+                found = index.search(query, limit)
+                timings.append(time.perf_counter() - begin)
+                hits += bool(found)
+            timings.sort()
+            p50 = timings[len(timings) // 2]
+            p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+            print(f"{count:>10} {build * 1000:>10.0f} {size / 2**20:>10.1f}  {kind:<12} "
+                  f"{p50 * 1e6:>8.1f} {p99 * 1e6:>8.1f} {timings[-1] * 1e6:>8.1f} {hits:>6}")
+
+
+def make_station_points(count: int, seed: int = 13) -> List[Tuple[int, float, float]]:
+    """Generate station positions: half clustered around a few metro areas, half spread over land-ish latitudes."""
+    rng = random.Random(seed)
+    metros = [(40.75, -73.99), (41.88, -87.63), (34.05, -118.24), (51.51, -0.13), (35.68, 139.77)]
+    points = []
+    for row in range(count):
+        if row % 2:
+            lat, lon = metros[row % len(metros)]
+            points.append((row, max(-90.0, min(90.0, rng.gauss(lat, 0.5))), rng.gauss(lon, 0.5)))
+        else:
+            points.append((row, rng.uniform(-60, 70), rng.uniform(-180, 180)))
+    return points
+
+
+def bench_nearby(counts: List[int], queries: int, k: int):
+    """Compare nearest-station latency of the grid index against a linear haversine scan."""
+    print_header(f"Nearest stations (k {k}, {queries} queries per mode)")
+    print(f"{'stations':>10} {'build ms':>10}  {'mode':<24} {'p50 us':>9} {'p99 us':>9}")
+    rng = random.Random(17)
+    for count in counts:
+        points = make_station_points(count)
+        start = time.perf_counter()
+        index = GeoGridIndex(points)
+        build = time.perf_counter() - start
+        # Query near stations, as a user standing at one would
+        targets = [(lat + rng.uniform(-0.05, 0.05), lon + rng.uniform(-0.05, 0.05))
+                   for _, lat, lon in rng.sample(points, min(queries, count))]
+
+        def linear(lat, lon, radius):
+            ranked = sorted((haversine_km(lat, lon, p_lat, p_lon), row) for row, p_lat, p_lon in points)
+            return [item for item in ranked if radius is None or item[0] <= radius][:k]
+
+        numpy_module = geo.numpy
+        modes = [
+            ('grid, k nearest', numpy_module, lambda lat, lon: index.nearby(lat, lon, None, k)),
+            ('grid, 10 km radius', numpy_module, lambda lat, lon: index.nearby(lat, lon, 10.0, k)),
+            ('grid, no numpy', None, lambda lat, lon: index.nearby(lat, lon, None, k)),
+            ('linear scan', None, lambda lat, lon: linear(lat, lon, None)),
+        ]
+        for mode, numpy_used, func in modes:
+            if numpy_module is None and mode == 'grid, no numpy':
+                continue
+            # The linear scan is slow enough that a few queries tell the story
+            batch = targets[:20] if mode == 'linear scan' else targets
+            geo.numpy = numpy_used
+            timings = []
+            try:
+                for lat, lon in batch:
+                    begin = time.perf_counter()
+                    func(lat, lon)
+                    timings.append(time.perf_counter() - begin)
+            finally:
+                geo.numpy = numpy_module
+            timings.sort()
+            p50 = timings[len(timings) // 2]
+            p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+            print(f"{count:>10} {build * 1000:>10.0f}  {mode:<24} {p50 * 1e6:>9.1f} {p99 * 1e6:>9.1f}")
+
+
+def write_station_file(path: str, stations: List[Dict[str, Any]]):
+    """Write stations in the format named by the file extension."""
+    with open(path, 'w', encoding='utf-8', newline='') as handle:
+        if path.endswith('.csv'):
+            writer = csv.DictWriter(handle, fieldnames=list(stations[0]))
+            writer.writeheader()
+            writer.writerows(stations)
+        elif path.endswith('.ndjson'):
+            handle.writelines(json.dumps(station) + "\n" for station in stations)
+        else:
+            json.dump(stations, handle)
+
+
+def bench_reload(counts: List[int], formats: List[str]):
+    """Measure station file reload time and the memory held while snapshots are swapped."""
+    build = lambda stations: StationStore(stations, lambda station: True)
+
+    print_header("Station file reload: time and memory during the swap")
+    print(f"{'stations':>10} {'format':>7} {'parse ms':>10} {'index ms':>10} "
+          f"{'steady MiB':>11} {'swap peak MiB':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in counts:
+            stations = make_stations(count)
+            for extension in formats:
+                path = os.path.join(directory, f"stations.{extension}")
+                write_station_file(path, stations)
+
+                parse = min(timeit.repeat(lambda: read_station_file(path), number=1, repeat=3))
+                raw = read_station_file(path)
+                index = min(timeit.repeat(lambda: build(raw), number=1, repeat=3))
+                del raw
+
+                # Memory: the old snapshot stays alive (as if still used by an
+                # in-flight request) while the new one is parsed and indexed
+                gc.collect()
+                tracemalloc.start()
+                source = StationFileSource(path, build)
+                gc.collect()
+                steady, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                in_flight = source.store
+                source.reload()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                del in_flight, source
+
+                print(f"{count:>10} {extension:>7} {parse * 1000:>10.1f} {index * 1000:>10.1f} "
+                      f"{steady / 2**20:>11.1f} {peak / 2**20:>14.1f}")
+    print("steady: one published snapshot; swap peak: old snapshot + file parse + new snapshot")
+
+
+# Child process for bench_startup: import the app, optionally warm it up,
+# then time the first /stations and search requests a real client would send
+STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from src import app as app_module
+imported = time.perf_counter() - started
+if sys.argv[1] == 'warm':
+    app_module.warm_up()
+ready = time.perf_counter() - started
+client = app_module.app.test_client()
+first = time.perf_counter()
+client.get('/stations', headers={'Accept-Encoding': 'gzip'})
+client.get('/stations/search?q=station+1')
+print(json.dumps([imported, ready, time.perf_counter() - first]))
+"""
+
+
+def bench_startup(counts: List[int]):
+    """Measure import-to-ready time and the first requests' latency with and without warm-up."""
+    print_header("Startup: import-to-ready time and first-request latency")
+    print(f"{'stations':>10} {'mode':<10} {'import s':>9} {'ready s':>9} {'first requests ms':>18}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in counts:
+            path = os.path.join(directory, 'stations.json')
+            write_station_file(path, make_stations(count))
+            for mode in ('cold', 'warm'):
+                output = subprocess.run(
+                    [sys.executable, '-c', STARTUP_PROBE, mode], cwd=REPO_ROOT, check=True,
+                    env={**os.environ, 'STATIONS_FILE': path}, capture_output=True, text=True
+                ).stdout
+                imported, ready, first = json.loads(output.splitlines()[-1])
+                print(f"{count:>10} {mode:<10} {imported:>9.2f} {ready:>9.2f} {first * 1000:>18.1f}")
+    print("cold: ready as soon as imported (as /hello reports); warm: ready after warm_up(), as /ready reports")
+
+
+def free_port() -> int:
+    """Return a TCP port that is currently free on localhost."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(module: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    """Start ``python -m <module>`` on a port and wait until /hello answers."""
+    process = subprocess.Popen(
+        [sys.executable, '-m', module],
+        cwd=REPO_ROOT,
+        env={**os.environ, **env, 'PORT': str(port)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/hello", timeout=1).status_code == 200:
+                return process
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{module} did not start on port {port}")
+
+
+def bench_server(concurrency: int, duration: float, workers: int, threads: int):
+    """Compare throughput of the Flask dev server and the gunicorn launcher."""
+    servers = [
+        ('flask dev server', 'src.app', {}),
+        (f'gunicorn {workers}w x {threads}t', 'src.server',
+         {'WEB_CONCURRENCY': str(workers), 'GUNICORN_THREADS': str(threads)}),
+    ]
+
+    print_header(f"Server throughput ({concurrency} clients, {duration:.0f}s each)")
+    print(f"{'server':<24} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for label, module, env in servers:
+        port = free_port()
+        process = start_server(module, port, env)
+        try:
+            result = run_load_test(f"http://127.0.0.1:{port}", concurrency, duration)['overall']
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=30)
+        print(f"{label:<24} {result['rps']:>10.0f} {result['p50_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['errors']:>7}")
+
+
+def bench_batch(count: int, sizes: List[int]):
+    """Compare resolving N codes with N GET /stations?code= calls against one POST /stations/batch."""
+    print_header(f"Batch code lookup over HTTP ({count} stations, gunicorn, keep-alive)")
+    print(f"{'codes':>7} {'N GETs ms':>10} {'1 POST ms':>10} {'speedup':>8}")
+    stations = make_stations(count)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'stations.ndjson')
+        write_station_file(path, stations)
+        port = free_port()
+        process = start_server('src.server', port, {'STATIONS_FILE': path, 'WEB_CONCURRENCY': '1'})
+        base = f"http://127.0.0.1:{port}"
+        try:
+            with requests.Session() as session:
+                rng = random.Random(5)
+                for size in sizes:
+                    codes = [station['code'] for station in rng.sample(stations, min(size, count))]
+                    start = time.perf_counter()
+                    for code in codes:
+                        session.get(f"{base}/stations", params={'code': code}).raise_for_status()
+                    one_by_one = time.perf_counter() - start
+                    start = time.perf_counter()
+                    session.post(f"{base}/stations/batch", json={'codes': codes}).raise_for_status()
+                    batched = time.perf_counter() - start
+                    print(f"{size:>7} {one_by_one * 1000:>10.1f} {batched * 1000:>10.1f} "
+                          f"{one_by_one / batched:>7.0f}x")
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=30)
+
+
+def start_stub_upstream(latency: float, stations: List[Dict[str, Any]]) -> ThreadingHTTPServer:
+    """
+    Serve ``stations`` on GET /stations after ``latency`` seconds, like a slow upstream API.
+
+    The server's ``calls`` attribute counts the requests it has answered.
+    """
+    body = json.dumps(stations).encode('utf-8')
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are written separately; don't let Nagle hold the body back
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            with lock:
+                self.server.calls += 1
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        # Every benchmark connection may arrive at once
+        request_queue_size = 1024
+        calls = 0
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _summary(latencies: List[float], elapsed: float) -> str:
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return f"{len(latencies) / elapsed:>10.0f} {p50 * 1000:>8.1f} {p99 * 1000:>8.1f}"
+
+
+def bench_async(concurrency: int, duration: float, latency: float, threads: int):
+    """Compare blocking, thread-bound upstream calls with the async client and the ASGI server."""
+    upstream = start_stub_upstream(latency, make_stations(20))
+    upstream_url = f"http://127.0.0.1:{upstream.server_port}"
+
+    print_header(f"Upstream-backed /stations ({latency * 1000:.0f} ms upstream, {concurrency} in flight, "
+                 f"{duration:.0f}s each)")
+    print(f"{'mode':<36} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+
+    # A gthread worker: each in-flight request holds one of its threads
+    def blocking_worker(stop_at: float) -> List[float]:
+        latencies = []
+        with requests.Session() as session:
+            while time.perf_counter() < stop_at:
+                begin = time.perf_counter()
+                session.get(f"{upstream_url}/stations", timeout=10).raise_for_status()
+                latencies.append(time.perf_counter() - begin)
+        return latencies
+
+    workers = min(threads, concurrency)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        results = list(pool.map(blocking_worker, [start + duration] * workers))
+    elapsed = time.perf_counter() - start
+    print(f"{f'blocking client, {workers} threads':<36} {_summary([x for r in results for x in r], elapsed)}")
+
+    # One event loop overlapping every call over pooled, kept-alive connections
+    async def run_async() -> Tuple[List[float], float]:
+        client = AsyncStationUpstream(upstream_url, max_connections=concurrency)
+        latencies: List[float] = []
+        stop_at = time.perf_counter() + duration
+
+        async def task():
+            while time.perf_counter() < stop_at:
+                begin = time.perf_counter()
+                await client.fetch_stations({})
+                latencies.append(time.perf_counter() - begin)
+
+        begin = time.perf_counter()
+        await asyncio.gather(*(task() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - begin
+        await client.aclose()
+        return latencies, elapsed
+
+    latencies, elapsed = asyncio.run(run_async())
+    print(f"{'async client, 1 event loop':<36} {_summary(latencies, elapsed)}")
+
+    # End to end: HTTP clients -> gunicorn asgi worker -> stub upstream, with the page
+    # cache off so every request waits on the upstream as in the rows above
+    port = free_port()
+    process = start_server('src.server', port, {
+        'SERVER_MODE': 'asgi', 'WEB_CONCURRENCY': '1', 'STATIONS_UPSTREAM_URL': upstream_url,
+        'STATIONS_UPSTREAM_POOL_SIZE': str(concurrency), 'STATIONS_UPSTREAM_CACHE_TTL': '0',
+        'LOG_LEVEL': 'WARNING'
+    })
+    try:
+        result = run_load_test(f"http://127.0.0.1:{port}", concurrency, duration, mix=[('/stations', 1)])
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+        upstream.shutdown()
+        upstream.server_close()
+    overall = result['overall']
+    print(f"{'asgi server, 1 worker':<36} {overall['rps']:>10.0f} {overall['p50_ms']:>8.1f} "
+          f"{overall['p99_ms']:>8.1f}  ({overall['errors']} errors)")
+
+
+def bench_upstream(threads: int, calls: int, keys: int, latency: float):
+    """Compare upstream calls and throughput: one connection per call, a pooled session, and cache plus coalescing."""
+    upstream = start_stub_upstream(latency, make_stations(20))
+    upstream_url = f"http://127.0.0.1:{upstream.server_port}"
+    cities = [f"City {i}" for i in range(keys)]
+
+    print_header(f"Upstream /stations client ({threads} threads x {calls} calls over {keys} pages, "
+                 f"{latency * 1000:.0f} ms upstream)")
+    print(f"{'client':<36} {'upstream calls':>14} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+
+    def run(name: str, fetch):
+        def worker(offset: int) -> List[float]:
+            latencies = []
+            for i in range(calls):
+                begin = time.perf_counter()
+                fetch({'city': cities[(offset + i) % keys]})
+                latencies.append(time.perf_counter() - begin)
+            return latencies
+
+        before = upstream.calls
+        start = time.perf_counter()
+        # Every thread starts on the same cold page
+        with ThreadPoolExecutor(threads) as pool:
+            results = list(pool.map(worker, [0] * threads))
+        elapsed = time.perf_counter() - start
+        print(f"{name:<36} {upstream.calls - before:>14} "
+              f"{_summary([x for r in results for x in r], elapsed)}")
+
+    def unpooled(params):
+        requests.get(f"{upstream_url}/stations", params=params, timeout=5).raise_for_status()
+
+    client = StationUpstream(upstream_url, pool_size=threads, cache_ttl=0)
+    run("requests.get per call", unpooled)
+    run("pooled session", client.fetch_stations)
+    client.close()
+    client = StationUpstream(upstream_url, pool_size=threads, cache_ttl=60)
+    run("pooled session, TTL cache, coalesced", client.get_stations)
+    client.close()
+    upstream.shutdown()
+    upstream.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the stations service")
+    subparsers = parser.add_subparsers(dest='command', help='Available benchmarks')
+
+    json_parser = subparsers.add_parser('json', help='Compare JSON encoders by station count')
+    json_parser.add_argument("--counts", type=int, nargs='+', default=[10, 100, 1000, 10000, 100000],
+                             help="Station counts to encode")
+
+    stream_parser = subparsers.add_parser('stream', help='Measure NDJSON streaming TTFB and peak memory')
+    stream_parser.add_argument("--counts", type=int, nargs='+', default=[1000, 10000, 100000],
+                               help="Catalogue sizes to stream")
+
+    memory_parser = subparsers.add_parser('memory', help='Compare bytes per station by storage layout')
+    memory_parser.add_argument("--counts", type=int, nargs='+', default=[10000, 100000, 1000000],
+                               help="Catalogue sizes to measure")
+
+    server_parser = subparsers.add_parser('server', help='Compare dev server and gunicorn throughput')
+    server_parser.add_argument("--concurrency", type=int, default=16, help="Concurrent client threads")
+    server_parser.add_argument("--duration", type=float, default=10, help="Seconds of load per server")
+    server_parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                               help="Gunicorn worker processes")
+    server_parser.add_argument("--threads", type=int, default=4, help="Gunicorn threads per worker")
+
+    logging_parser = subparsers.add_parser('logging', help='Compare per-request logging cost')
+    logging_parser.add_argument("--iterations", type=int, default=20000, help="Simulated requests")
+
+    reload_parser = subparsers.add_parser('reload', help='Measure station file reload time and swap memory')
+    reload_parser.add_argument("--counts", type=int, nargs='+', default=[10000, 100000],
+                               help="Catalogue sizes to reload")
+    reload_parser.add_argument("--formats", nargs='+', default=['json', 'ndjson', 'csv'],
+                               choices=['json', 'ndjson', 'csv'], help="File formats to measure")
+
+    search_parser = subparsers.add_parser('search', help='Measure name search latency by query kind')
+    search_parser.add_argument("--counts", type=int, nargs='+', default=[10000, 100000],
+                               help="Catalogue sizes to search")
+    search_parser.add_argument("--queries", type=int, default=1000, help="Queries per kind")
+    search_parser.add_argument("--limit", type=int, default=10, help="Results per query")
+
+    nearby_parser = subparsers.add_parser('nearby', help='Compare nearest-station latency: grid index vs linear scan')
+    nearby_parser.add_argument("--counts", type=int, nargs='+', default=[10000, 100000],
+                               help="Catalogue sizes to query")
+    nearby_parser.add_argument("--queries", type=int, default=1000, help="Queries per mode")
+    nearby_parser.add_argument("-k", type=int, default=10, help="Stations per query")
+
+    batch_parser = subparsers.add_parser('batch', help='Compare N single-code requests with one batch request')
+    batch_parser.add_argument("--count", type=int, default=100000, help="Catalogue size served")
+    batch_parser.add_argument("--sizes", type=int, nargs='+', default=[10, 100, 1000],
+                              help="Codes resolved per job")
+
+    async_parser = subparsers.add_parser('async', help='Compare thread-bound and async upstream-backed serving')
+    async_parser.add_argument("--concurrency", type=int, default=64, help="Requests in flight")
+    async_parser.add_argument("--duration", type=float, default=5, help="Seconds per mode")
+    async_parser.add_argument("--latency", type=float, default=0.05, help="Stub upstream latency in seconds")
+    async_parser.add_argument("--threads", type=int, default=4, help="Threads of the blocking baseline")
+
+    compression_parser = subparsers.add_parser('compression', help='Bytes and CPU per request with compression')
+    compression_parser.add_argument("--counts", type=int, nargs='+', default=[1000, 10000, 100000],
+                                    help="Station catalogue sizes")
+    compression_parser.add_argument("--requests", type=int, default=20, help="Requests per mode")
+
+    startup_parser = subparsers.add_parser('startup', help='Import-to-ready time and first-request latency')
+    startup_parser.add_argument("--counts", type=int, nargs='+', default=[10000, 100000],
+                                help="Catalogue sizes to load")
+
+    filters_parser = subparsers.add_parser('filters', help='Multi-field filter latency and projected payload size')
+    filters_parser.add_argument("--counts", type=int, nargs='+', default=[10000, 100000],
+                                help="Catalogue sizes to filter")
+    filters_parser.add_argument("--queries", type=int, default=200, help="Filter combinations per mode")
+
+    upstream_parser = subparsers.add_parser('upstream', help='Upstream client pooling, caching and coalescing')
+    upstream_parser.add_argument("--threads", type=int, default=16, help="Request threads")
+    upstream_parser.add_argument("--calls", type=int, default=50, help="Calls per thread")
+    upstream_parser.add_argument("--keys", type=int, default=10, help="Distinct pages requested")
+    upstream_parser.add_argument("--latency", type=float, default=0.02, help="Stub upstream latency in seconds")
+
+    args = parser.parse_args()
+
+    if args.command == 'json':
+        bench_json(args.counts)
+    elif args.command == 'stream':
+        bench_stream(args.counts)
+    elif args.command == 'memory':
+        bench_memory(args.counts)
+    elif args.command == 'logging':
+        bench_logging(args.iterations)
+    elif args.command == 'reload':
+        bench_reload(args.counts, args.formats)
+    elif args.command == 'search':
+        bench_search(args.counts, args.queries, args.limit)
+    elif args.command == 'nearby':
+        bench_nearby(args.counts, args.queries, args.k)
+    elif args.command == 'batch':
+        bench_batch(args.count, args.sizes)
+    elif args.command == 'compression':
+        bench_compression(args.counts, args.requests)
+    elif args.command == 'startup':
+        bench_startup(args.counts)
+    elif args.command == 'filters':
+        bench_filters(args.counts, args.queries)
+    elif args.command == 'upstream':
+        bench_upstream(args.threads, args.calls, args.keys, args.latency)
+    elif args.command == 'async':
+        bench_async(args.concurrency, args.duration, args.latency, args.threads)
+    elif args.command == 'server':
+        bench_server(args.concurrency, args.duration, args.workers, args.threads)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,393 @@
 #!/usr/bin/env python3
 
 import argparse
+import base64
+import codecs
+import hashlib
+import selectors
+import signal
 import subprocess
 import requests
 import json
 import os
 import sys
 import shutil
+import shlex
 import re
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
-def run_command(command, check=True):
-    """Run a shell command and return the result."""
+# Default number of endpoints migrated at once by mulesoft-migr --multi/--all
+DEFAULT_MIGRATION_JOBS = 4
+
+# On-disk cache of Amazon Q outputs, keyed by a hash of the prompt, its input and the repo state
+Q_CACHE_DIR = os.environ.get('Q_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'cli_tool', 'q')
+Q_CACHE_MAX_AGE = float(os.environ.get('Q_CACHE_MAX_AGE_DAYS', 7)) * 24 * 3600
+Q_CACHE_MAX_BYTES = int(float(os.environ.get('Q_CACHE_MAX_MB', 200)) * 1024 * 1024)
+
+# Cleared by --no-cache or Q_CACHE=off
+q_cache_enabled = os.environ.get('Q_CACHE', 'on').strip().lower() not in ('0', 'off', 'false', 'no')
+
+# Most characters of diff sent to one PR summary call; files with bigger
+# diffs are summarized in hunk-sized pieces
+PR_SUMMARY_CHUNK_CHARS = int(os.environ.get('PR_SUMMARY_CHUNK_CHARS', 60000))
+
+# PR summary calls run at once
+PR_SUMMARY_JOBS = int(os.environ.get('PR_SUMMARY_JOBS', 4))
+
+# Fallback PR description when no summary could be generated
+DEFAULT_PR_SUMMARY = "Changes generated by Amazon Q agent"
+
+CHUNK_SUMMARY_PROMPT = """Summarize the following code changes. They are one part of a larger pull request.
+For each file, state what was changed, why it was changed, and any important implementation details.
+
+Start each file's part with a heading line of the form #### `path/to/file`, then reply with concise markdown bullet points only."""
+
+# Heading a chunk summary starts each file's part with
+SUMMARY_FILE_HEADING_RE = re.compile(r'^#{1,6}\s*`([^`]+)`\s*$')
+
+COMBINE_SUMMARIES_PROMPT = """The following are summaries of different parts of the same code changes, separated by ---.
+Combine them into one concise markdown summary for a pull request description, grouping related changes and without repeating yourself.
+Focus on what was changed, why it was changed, and any important implementation details.
+
+Please provide a well-formatted markdown summary suitable for a PR description."""
+
+# Separates partial summaries sent to one combine call
+SUMMARY_SEPARATOR = "\n\n---\n\n"
+
+PR_FOOTER = "*This PR was generated by Amazon Q agent*"
+
+# Hidden markers around the generated part of a PR body, and one per file
+# with the hash of the file's diff and the commit it was summarized at. The
+# file summaries themselves stay in the Amazon Q cache, keyed by path and
+# diff hash, so the body stays small and later updates only re-summarize
+# changed files
+PR_SUMMARY_START = "<!-- cli_tool:pr-summary commit={commit} -->"
+PR_SUMMARY_END = "<!-- cli_tool:pr-summary-end -->"
+PR_FILE_MARKER = '<!-- cli_tool:file path="{path}" diff={diff_hash} commit={commit} -->'
+PR_SUMMARY_BLOCK_RE = re.compile(r'<!-- cli_tool:pr-summary commit=\w* -->.*?<!-- cli_tool:pr-summary-end -->', re.DOTALL)
+PR_FILE_RE = re.compile(r'<!-- cli_tool:file path="([^"\n]*)" diff=(\w*) commit=(\w*) -->')
+
+# GitHub rejects PR bodies longer than this many characters
+PR_BODY_MAX_CHARS = 65536
+
+# Appended to a summary cut short to fit PR_BODY_MAX_CHARS
+PR_SUMMARY_TRUNCATED = "\n\n*Summary truncated to fit the PR description size limit.*"
+
+# A file's summary: hash of the file's diff, commit it was generated at, and
+# the text (None when read back from a PR body)
+FileSummary = namedtuple('FileSummary', ['diff_hash', 'commit', 'text'])
+
+# The q chat command line used for every agent call
+Q_CHAT_COMMAND = ['q', 'chat', '--no-interactive', '--trust-all-tools']
+
+# Seconds one q chat call may run in total, and without any output, before it is stopped
+Q_CALL_TIMEOUT = float(os.environ.get('Q_CALL_TIMEOUT', 1800))
+Q_IDLE_TIMEOUT = float(os.environ.get('Q_IDLE_TIMEOUT', 300))
+
+# Seconds a stopped agent gets to exit after SIGTERM before its process group is killed
+Q_KILL_GRACE = 5
+
+# Outcome of run_streaming; timed_out is None, 'total', 'idle' or 'cancelled', and
+# first_output is the seconds until the first stdout output (None if none)
+StreamResult = namedtuple('StreamResult', ['returncode', 'stdout', 'stderr', 'timed_out', 'first_output', 'duration'])
+
+# Serializes `git worktree` changes; git locks the shared repository metadata
+_worktree_lock = threading.Lock()
+
+# Commands started by run_streaming that are still running. Each runs in its
+# own session, out of reach of Ctrl-C, so cancel_running_commands stops them
+_running_processes = set()
+_running_lock = threading.Lock()
+
+# Set by cancel_running_commands; run_streaming starts nothing after it
+_cancelled = threading.Event()
+
+def run_command(command, check=True, cwd=None):
+    """Run a shell command (in cwd, if given) and return the result."""
     try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, check=check)
+        result = subprocess.run(command, shell=True, capture_output=True, text=True, check=check, cwd=cwd)
         return result.stdout.strip()
     except subprocess.CalledProcessError as e:
         print(f"Error running command: {command}")
         print(f"Error: {e.stderr}")
         return None
 
+def q_cache_key(kind, *parts):
+    """Hash a cache entry kind and its inputs into a cache key."""
+    digest = hashlib.sha256(kind.encode('utf-8'))
+    for part in parts:
+        data = part.encode('utf-8')
+        # Length-prefix each part so ('ab', 'c') and ('a', 'bc') differ
+        digest.update(len(data).to_bytes(8, 'big'))
+        digest.update(data)
+    return digest.hexdigest()
+
+def q_cache_get(key):
+    """Return the cached entry for a key, or None on a miss, when expired or when caching is off."""
+    if not q_cache_enabled:
+        return None
+    path = os.path.join(Q_CACHE_DIR, f"{key}.json")
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            stored = json.load(file)
+        created, entry = stored['created'], stored['entry']
+        # Age counts from creation, so an entry in constant use still expires
+        if time.time() - created > Q_CACHE_MAX_AGE:
+            os.unlink(path)
+            return None
+        # Touch it so size-based eviction drops least recently used entries first
+        os.utime(path)
+        return entry
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def q_cache_put(key, entry):
+    """Store an entry, then evict expired entries and the oldest ones beyond the size limit."""
+    if not q_cache_enabled:
+        return
+    path = os.path.join(Q_CACHE_DIR, f"{key}.json")
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(Q_CACHE_DIR, exist_ok=True)
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump({'created': time.time(), 'entry': entry}, file)
+        os.replace(temp_path, path)
+        evict_q_cache()
+    except OSError as e:
+        print(f"Warning: could not write Amazon Q cache: {e}")
+
+def evict_q_cache():
+    """
+    Drop entries unused for Q_CACHE_MAX_AGE, then least recently used ones until within Q_CACHE_MAX_BYTES.
+    
+    The modification time is the last use, which q_cache_get updates. An
+    entry unused that long is also older than that, so it is dropped
+    without being read; entries still in use are expired by q_cache_get,
+    from the creation time stored in them.
+    """
+    now = time.time()
+    entries = []
+    for name in os.listdir(Q_CACHE_DIR):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(Q_CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+            if now - stat.st_mtime > Q_CACHE_MAX_AGE:
+                os.unlink(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+        except OSError:
+            # Removed by a concurrent run
+            continue
+    
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= Q_CACHE_MAX_BYTES:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        total -= size
+
+def snapshot_worktree(cwd=None):
+    """
+    Record the working tree, including untracked but not ignored files, as a git tree object.
+    
+    Uses a scratch copy of the index, so the real index is left untouched.
+    Returns the tree id, which changes whenever any file content does, or
+    None outside a git repository.
+    """
+    index_path = run_command("git rev-parse --git-path index", cwd=cwd)
+    if not index_path:
+        return None
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_index = os.path.join(temp_dir, 'index')
+        index_path = os.path.join(cwd or '.', index_path)
+        # Start from the real index so unchanged files are not re-hashed
+        if os.path.exists(index_path):
+            shutil.copyfile(index_path, temp_index)
+        env = {**os.environ, 'GIT_INDEX_FILE': temp_index}
+        try:
+            subprocess.run(['git', 'add', '-A'], cwd=cwd, env=env, capture_output=True, check=True)
+            result = subprocess.run(['git', 'write-tree'], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+            return result.stdout.strip()
+        except subprocess.CalledProcessError:
+            return None
+
+def diff_trees(before, after, cwd=None):
+    """Return the binary-safe patch between two tree objects as bytes."""
+    result = subprocess.run(['git', 'diff', '--binary', before, after], cwd=cwd, capture_output=True, check=True)
+    return result.stdout
+
+def apply_patch(patch, cwd=None):
+    """Apply a patch made by diff_trees to the working tree; return True on success."""
+    if not patch:
+        return True
+    result = subprocess.run(['git', 'apply', '--binary', '-'], input=patch, cwd=cwd, capture_output=True)
+    if result.returncode != 0:
+        print(f"Warning: could not apply cached changes: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return False
+    return True
+
+def run_streaming(args, input_data='', cwd=None, timeout=None, idle_timeout=None, on_line=None):
+    """
+    Run a command, feeding it input while draining stdout and stderr together.
+    
+    All three pipes are multiplexed with a selector, so neither a large input
+    nor a chatty stderr can fill a pipe and stall the run. on_line is called
+    with each complete stdout line as it arrives. The command runs in its own
+    process group; if it runs longer than timeout seconds, or is silent on
+    both outputs for idle_timeout seconds, the whole group is stopped.
+    
+    Returns a StreamResult.
+    """
+    started = time.monotonic()
+    with _running_lock:
+        if _cancelled.is_set():
+            return StreamResult(None, '', '', 'cancelled', None, 0.0)
+        process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   cwd=cwd, start_new_session=True)
+        _running_processes.add(process)
+    selector = selectors.DefaultSelector()
+    pending = memoryview(input_data.encode('utf-8'))
+    if pending:
+        os.set_blocking(process.stdin.fileno(), False)
+        selector.register(process.stdin, selectors.EVENT_WRITE)
+    else:
+        process.stdin.close()
+    decoders, output = {}, {}
+    for stream in (process.stdout, process.stderr):
+        selector.register(stream, selectors.EVENT_READ)
+        decoders[stream] = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        output[stream] = []
+    
+    partial_line = ''
+    first_output = None
+    last_output = started
+    timed_out = None
+    try:
+        while selector.get_map():
+            now = time.monotonic()
+            waits = []
+            if timeout:
+                waits.append(started + timeout - now)
+            if idle_timeout:
+                waits.append(last_output + idle_timeout - now)
+            if waits and min(waits) <= 0:
+                timed_out = 'total' if timeout and now - started >= timeout else 'idle'
+                break
+            
+            for key, _ in selector.select(min(waits) if waits else None):
+                stream = key.fileobj
+                if stream is process.stdin:
+                    try:
+                        pending = pending[os.write(stream.fileno(), pending[:65536]):]
+                    except BrokenPipeError:
+                        # The command stopped reading; the rest of the input is not needed
+                        pending = pending[:0]
+                    if not pending:
+                        selector.unregister(stream)
+                        stream.close()
+                    continue
+                
+                data = os.read(stream.fileno(), 65536)
+                if not data:
+                    selector.unregister(stream)
+                    text = decoders[stream].decode(b'', final=True)
+                else:
+                    last_output = time.monotonic()
+                    text = decoders[stream].decode(data)
+                output[stream].append(text)
+                if stream is process.stdout and text:
+                    if first_output is None:
+                        first_output = last_output - started
+                    if on_line:
+                        partial_line += text
+                        *lines, partial_line = partial_line.split('\n')
+                        for line in lines:
+                            on_line(line.rstrip('\r'))
+        
+        if timed_out is None:
+            # Outputs closed; give the process what is left of the time limit to exit
+            try:
+                process.wait(timeout=max(started + timeout - time.monotonic(), 0) if timeout else None)
+            except subprocess.TimeoutExpired:
+                timed_out = 'total'
+    finally:
+        selector.close()
+        if timed_out is not None or process.poll() is None:
+            terminate_process_group(process)
+        for stream in (process.stdin, process.stdout, process.stderr):
+            stream.close()
+        with _running_lock:
+            _running_processes.discard(process)
+    
+    if _cancelled.is_set() and timed_out is None and process.returncode != 0:
+        # Stopped by cancel_running_commands
+        timed_out = 'cancelled'
+    if on_line and partial_line:
+        on_line(partial_line.rstrip('\r'))
+    return StreamResult(None if timed_out else process.returncode, ''.join(output[process.stdout]),
+                        ''.join(output[process.stderr]), timed_out, first_output, time.monotonic() - started)
+
+def terminate_process_group(process, grace=None):
+    """
+    Stop a process started with start_new_session and everything it spawned.
+    
+    Sends SIGTERM, then SIGKILL after grace seconds (default Q_KILL_GRACE).
+    """
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=Q_KILL_GRACE if grace is None else grace)
+        except subprocess.TimeoutExpired:
+            pass
+        # Also reaches children that outlived or ignored SIGTERM
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+def cancel_running_commands(grace=None):
+    """
+    Stop every command run_streaming is running, and any it would start later.
+    
+    All process groups get SIGTERM at once, then SIGKILL if they are still
+    running after grace seconds (default Q_KILL_GRACE).
+    """
+    with _running_lock:
+        _cancelled.set()
+        processes = list(_running_processes)
+    for process in processes:
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    deadline = time.monotonic() + (Q_KILL_GRACE if grace is None else grace)
+    for process in processes:
+        terminate_process_group(process, max(deadline - time.monotonic(), 0))
+
+def describe_call(result, name):
+    """One-line timing report for a q chat call."""
+    first = f"first output after {result.first_output:.1f}s" if result.first_output is not None else "no output"
+    if result.timed_out == 'total':
+        outcome = "stopped at its time limit (Q_CALL_TIMEOUT)"
+    elif result.timed_out == 'idle':
+        outcome = "stopped after going silent (Q_IDLE_TIMEOUT)"
+    elif result.timed_out == 'cancelled':
+        outcome = "cancelled"
+    else:
+        outcome = f"exited with code {result.returncode}"
+    return f"{name} {outcome}: {result.duration:.1f}s total, {first}"
+
 def create_branch(branch_name):
     """Create a new branch from main."""
     print(f"Creating branch: {branch_name}")
@@ -32,74 +400,79 @@ def create_branch(branch_name):
     run_command(f"git checkout -b {branch_name}")
     return True
 
-def call_amazon_q_agent(prompt):
-    """Call Amazon Q CLI agent with the given prompt."""
+def call_amazon_q_agent(prompt, cwd=None, label=None):
+    """
+    Call Amazon Q CLI agent with the given prompt.
+    
+    The agent works in cwd (default: the current directory). With a label,
+    each output line is prefixed with it, so concurrent agents stay readable.
+    """
     print(f"Calling Amazon Q agent with prompt")
+    prefix = f"[{label}] " if label else ""
+    
+    # The agent's result is the change it makes to the working tree, so the
+    # cache replays that change when the same prompt meets the same files
+    before = snapshot_worktree(cwd) if q_cache_enabled else None
+    cache_key = q_cache_key('agent', prompt, before) if before else None
+    cached = q_cache_get(cache_key) if cache_key else None
+    if cached is not None and apply_patch(base64.b64decode(cached['patch']), cwd):
+        print(f"{prefix}Using cached Amazon Q agent result ({cache_key[:12]})")
+        for line in cached['output']:
+            print(f"{prefix}{line}")
+        return True
     
     try:
-        # Use subprocess to pipe the prompt to q chat and show output in real-time
-        process = subprocess.Popen(
-            ['q', 'chat', '--no-interactive', '--trust-all-tools'],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
-        )
-        
-        # Send the prompt
-        process.stdin.write(prompt)
-        process.stdin.close()
-        
         # Read and display output in real-time
         print("\n" + "="*50)
         print("Amazon Q Agent Output:")
         print("="*50)
         
-        while True:
-            output = process.stdout.readline()
-            if output == '' and process.poll() is not None:
-                break
-            if output:
-                print(output.rstrip())
+        lines = []
+        
+        def show(line):
+            lines.append(line.rstrip())
+            print(f"{prefix}{line.rstrip()}")
         
-        # Wait for process to complete
-        return_code = process.wait()
+        # Pipe the prompt to q chat, streaming its output and draining stderr as it goes
+        result = run_streaming(Q_CHAT_COMMAND, prompt, cwd, Q_CALL_TIMEOUT, Q_IDLE_TIMEOUT, show)
         
         print("="*50)
         print("Amazon Q Agent completed")
         print("="*50 + "\n")
+        print(f"{prefix}{describe_call(result, 'Amazon Q agent')}")
         
-        if return_code == 0:
+        if result.returncode == 0:
             print("Amazon Q agent response received")
+            after = snapshot_worktree(cwd) if cache_key else None
+            if after:
+                patch = diff_trees(before, after, cwd)
+                q_cache_put(cache_key, {'output': lines, 'patch': base64.b64encode(patch).decode('ascii')})
             return True
         else:
-            stderr_output = process.stderr.read()
-            if stderr_output:
-                print(f"Error from Amazon Q agent: {stderr_output}")
+            if result.stderr:
+                print(f"{prefix}Error from Amazon Q agent: {result.stderr}")
             return None
             
     except Exception as e:
         print(f"Error calling Amazon Q agent: {e}")
         return None
 
-def commit_changes(commit_message):
+def commit_changes(commit_message, cwd=None):
     """Commit any changes made by the agent."""
     print("Committing changes...")
     
     # Add all changes
-    run_command("git add .")
+    run_command("git add .", cwd=cwd)
     
     # Commit with the provided message
-    run_command(f'git commit -m "{commit_message}"')
+    run_command(f'git commit -m "{commit_message}"', cwd=cwd)
     return True
 
-def push_branch(branch_name):
+def push_branch(branch_name, cwd=None):
     """Push the branch to GitHub."""
     print(f"Pushing branch {branch_name} to GitHub...")
     
-    result = run_command(f"git push origin {branch_name}")
+    result = run_command(f"git push origin {branch_name}", cwd=cwd)
     return result is not None
 
 def push_current_branch():
@@ -113,11 +486,11 @@ def push_current_branch():
     result = run_command(f"git push origin {current_branch}")
     return result is not None
 
-def get_diff_from_main():
-    """Get the git diff from main branch to current branch."""
+def get_diff_from_main(cwd=None, base='main'):
+    """Get the git diff from base (the main branch by default) to the current branch."""
     try:
-        # Get diff from main to current branch
-        diff_output = run_command("git diff main...HEAD")
+        # Get diff from where the branch left base to current branch
+        diff_output = run_command(f"git diff {base}...HEAD", cwd=cwd)
         return diff_output
     except Exception as e:
         print(f"Error getting git diff from main: {e}")
@@ -141,64 +514,291 @@ def clean_ansi_codes(text):
     
     return cleaned
 
-def generate_pr_summary(diff_content):
-    """Use Amazon Q agent to generate a markdown summary of the changes."""
+def run_q_chat(input_data, cwd=None):
+    """Send input to a non-interactive q chat and return its cleaned output, or None on failure."""
+    result = run_streaming(Q_CHAT_COMMAND, input_data, cwd, Q_CALL_TIMEOUT, Q_IDLE_TIMEOUT)
+    print(describe_call(result, "q chat"))
+    
+    if result.returncode == 0 and result.stdout:
+        # Clean ANSI codes
+        return clean_ansi_codes(result.stdout.strip())
+    print(f"Error from q chat: {result.stderr}")
+    return None
+
+def summarize(kind, prompt, content, cwd=None, heading="Code Changes"):
+    """Run one summary prompt over content through the output cache; return the text or None."""
+    cache_key = q_cache_key(kind, prompt, content)
+    cached = q_cache_get(cache_key)
+    if cached is not None:
+        print(f"Using cached {kind} ({cache_key[:12]})")
+        return cached['output']
+    
+    output = run_q_chat(f"{prompt}\n\n{heading}:\n{content}", cwd)
+    if output:
+        q_cache_put(cache_key, {'output': output})
+    return output
+
+def iter_diff_files(diff_content):
+    """Yield each file's section of a unified diff, from its 'diff --git' line to the next one."""
+    marker = '\ndiff --git '
+    start = 0
+    while start < len(diff_content):
+        end = diff_content.find(marker, start)
+        end = len(diff_content) if end == -1 else end + 1
+        yield diff_content[start:end]
+        start = end
+
+def diff_file_path(file_diff):
+    """Return the (new) path of the file a 'diff --git' section changes, or None."""
+    match = re.match(r'diff --git a/.*? b/(.*)', file_diff)
+    return match.group(1) if match else None
+
+def diff_file_hashes(diff_content):
+    """Map each path changed in a diff to a hash of its section of the diff."""
+    hashes = {}
+    for section in iter_diff_files(diff_content):
+        path = diff_file_path(section)
+        if path is not None:
+            hashes[path] = hashlib.sha256(section.encode('utf-8')).hexdigest()[:16]
+    return hashes
+
+def pack_pieces(pieces, budget, separator=''):
+    """Group consecutive pieces into as few groups as fit within budget characters each."""
+    groups, current, size = [], [], 0
+    for piece in pieces:
+        if current and size + len(separator) + len(piece) > budget:
+            groups.append(current)
+            current = []
+        # Size of the group once joined: separators only go between pieces
+        size = size + len(separator) + len(piece) if current else len(piece)
+        current.append(piece)
+    if current:
+        groups.append(current)
+    return groups
+
+def split_file_diff(file_diff, budget):
+    """
+    Split one file's diff into pieces within budget, each starting with the file's header.
+    
+    Cuts fall between hunks where possible and between lines inside hunks
+    that are bigger than the budget on their own.
+    """
+    first_hunk = file_diff.find('\n@@')
+    if first_hunk == -1:
+        # No hunks (binary or rename-only change); the header says it all
+        return [file_diff[:budget]]
+    header = file_diff[:first_hunk + 1]
+    room = max(budget - len(header), 1)
+    
+    pieces = []
+    for hunk in re.split(r'(?m)^(?=@@)', file_diff[first_hunk + 1:]):
+        if len(hunk) <= room:
+            pieces.append(hunk)
+        else:
+            pieces.extend(''.join(lines) for lines in pack_pieces(hunk.splitlines(keepends=True), room))
+    return [header + ''.join(group) for group in pack_pieces(pieces, room)]
+
+def split_summary_by_file(output, paths):
+    """
+    Split a chunk summary into each file's part, at the headings CHUNK_SUMMARY_PROMPT asks for.
+    
+    Returns a dict of path to text, or None if any of paths has no part.
+    """
+    parts, current = {}, None
+    for line in output.splitlines():
+        match = SUMMARY_FILE_HEADING_RE.match(line.strip())
+        if match and match.group(1) in paths:
+            current = match.group(1)
+            parts.setdefault(current, [])
+        elif current is not None:
+            parts[current].append(line)
+    texts = {path: '\n'.join(lines).strip() for path, lines in parts.items()}
+    if not all(texts.get(path) for path in paths):
+        return None
+    return texts
+
+def combine_summaries(partials, budget, cwd=None, jobs=None):
+    """
+    Reduce partial summaries to one, combining them in budget-sized groups until one call can take the rest.
+    
+    If a combine call fails, the summaries it was given are kept joined.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, jobs or PR_SUMMARY_JOBS)) as pool:
+        while len(partials) > 1:
+            groups = pack_pieces(partials, budget, SUMMARY_SEPARATOR)
+            if len(groups) == 1 or len(groups) == len(partials):
+                # Fits in one call, or grouping would not shrink it further
+                groups = [partials]
+            texts = [SUMMARY_SEPARATOR.join(group) for group in groups]
+            combined = pool.map(
+                lambda text: summarize('summary-combine', COMBINE_SUMMARIES_PROMPT, text, cwd, "Summaries"), texts)
+            partials = [summary or text for summary, text in zip(combined, texts)]
+    return partials[0]
+
+def generate_pr_summary(diff_content, cwd=None, chunk_chars=None, jobs=None, previous_files=None, commit=''):
+    """
+    Use Amazon Q agent to generate a markdown summary of the changes.
+    
+    Changed files are packed, in diff order, into calls of up to chunk_chars
+    of diff each, and files larger than that are summarized in hunk-sized
+    pieces. The calls run concurrently (at most `jobs` at a time), and each
+    call's output is split back into per-file summaries at the file
+    headings, which are then combined into one. Files whose diff was
+    summarized before reuse that summary from the Amazon Q cache; for those
+    recorded in previous_files, the commit it was made at is kept.
+    
+    Returns (summary, files), where files maps each changed path to its
+    FileSummary, in diff order.
+    """
     if not diff_content:
-        return "Changes generated by Amazon Q agent"
+        return DEFAULT_PR_SUMMARY, {}
+    budget = chunk_chars or PR_SUMMARY_CHUNK_CHARS
+    previous_files = previous_files or {}
     
     try:
-        # Create the prompt
-        prompt = """Generate a concise markdown summary of the following code changes for a pull request description. 
-Focus on what was changed, why it was changed, and any important implementation details.
-
-Please provide a well-formatted markdown summary suitable for a PR description."""
+        files, small, tasks = {}, [], []
+        hashes = diff_file_hashes(diff_content)
+        for section in iter_diff_files(diff_content):
+            path = diff_file_path(section)
+            if path is None:
+                continue
+            cached = q_cache_get(q_cache_key('pr-file', path, hashes[path]))
+            if cached is not None:
+                previous = previous_files.get(path)
+                since = previous.commit if previous is not None and previous.diff_hash == hashes[path] else commit
+                files[path] = FileSummary(hashes[path], since, cached['output'])
+                continue
+            files[path] = FileSummary(hashes[path], commit, None)
+            if len(section) <= budget:
+                small.append((path, section))
+            else:
+                tasks.extend(([path], piece) for piece in split_file_diff(section, budget))
+        if not files:
+            return DEFAULT_PR_SUMMARY, {}
         
-        print("Generating PR summary with Amazon Q agent...")
-        
-        # Use subprocess to pipe the diff content to q chat
-        process = subprocess.Popen(
-            ['q', 'chat', '--no-interactive', '--trust-all-tools'],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        # Send the prompt and diff content
-        input_data = f"{prompt}\n\nCode Changes:\n{diff_content}"
-        stdout, stderr = process.communicate(input=input_data)
-        
-        if process.returncode == 0 and stdout:
-            # Clean ANSI codes and ensure it's markdown
-            summary = clean_ansi_codes(stdout.strip())
-            if not summary.startswith('#'):
-                summary = f"## Summary\n\n{summary}"
-            return summary
-        else:
-            print(f"Error from q chat: {stderr}")
-            return "Changes generated by Amazon Q agent"
+        # Small files share calls, so a diff of many small files takes few calls
+        start = 0
+        for group in pack_pieces([section for _, section in small], budget):
+            tasks.append(([path for path, _ in small[start:start + len(group)]], ''.join(group)))
+            start += len(group)
+        
+        changed = len(files) - sum(1 for f in files.values() if f.text is not None)
+        print(f"Generating PR summary with Amazon Q agent: {changed} changed file(s) in {len(tasks)} call(s), "
+              f"{len(files) - changed} reused...")
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, jobs or PR_SUMMARY_JOBS)) as pool:
+            outputs = list(pool.map(lambda task: summarize('summary-chunk', CHUNK_SUMMARY_PROMPT, task[1], cwd), tasks))
+        
+        parts, failed, unattributed = {}, set(), {}
+        for (paths, _), output in zip(tasks, outputs):
+            if not output:
+                failed.update(paths)
+                continue
+            texts = split_summary_by_file(output, paths)
+            if texts is None and len(paths) == 1:
+                texts = {paths[0]: output.strip()}
+            if texts is None:
+                # Not split by file: the text goes into the summary as it is
+                unattributed.update((path, None) for path in paths)
+                unattributed[paths[0]] = output.strip()
+                continue
+            for path, text in texts.items():
+                parts.setdefault(path, []).append(text)
+        for path in parts.keys() | failed | unattributed.keys():
+            if path in failed:
+                # An empty hash never matches, so the next update retries this file
+                files[path] = FileSummary('', commit, "- Summary unavailable")
+            elif path in unattributed:
+                files[path] = FileSummary('', commit, None)
+            else:
+                files[path] = files[path]._replace(text='\n'.join(parts[path]))
+                q_cache_put(q_cache_key('pr-file', path, files[path].diff_hash), {'output': files[path].text})
+        
+        partials = [f"#### `{path}`\n{f.text}" if f.text else unattributed[path]
+                    for path, f in files.items() if f.text or unattributed.get(path)]
+        summary = combine_summaries(partials, budget, cwd, jobs)
+        print(f"PR summary generated in {time.monotonic() - started:.1f}s")
+        
+        if not summary:
+            return DEFAULT_PR_SUMMARY, files
+        # Ensure it's markdown
+        if not summary.startswith('#'):
+            summary = f"## Summary\n\n{summary}"
+        return summary, files
             
     except Exception as e:
         print(f"Error generating PR summary: {e}")
-        return "Changes generated by Amazon Q agent"
+        return DEFAULT_PR_SUMMARY, {}
+
+def parse_pr_file_summaries(pr_body):
+    """Read the per-file diff hashes and commits recorded in the generated part of a PR body; texts are None."""
+    block = PR_SUMMARY_BLOCK_RE.search(pr_body or '')
+    if not block:
+        return {}
+    return {path: FileSummary(diff_hash, commit, None)
+            for path, diff_hash, commit in PR_FILE_RE.findall(block.group(0))}
 
-def create_pull_request(branch_name, title, repo_owner, repo_name):
-    """Create a pull request using GitHub CLI."""
+def render_pr_body(summary, files, commit, previous_body=None):
+    """
+    Build a PR body from a summary and a marker per summarized file.
+    
+    When previous_body has a generated part, only that part is replaced, so
+    text added around it by hand is kept. A body that would be longer than
+    PR_BODY_MAX_CHARS loses file markers from the end first, which only
+    costs re-checking those files on the next update, then the end of the
+    summary.
+    """
+    markers = [PR_FILE_MARKER.format(path=path, diff_hash=f.diff_hash, commit=f.commit) for path, f in files.items()]
+    
+    def build(summary, markers):
+        listed = "".join(f"{marker}\n" for marker in markers)
+        block = f"{PR_SUMMARY_START.format(commit=commit)}\n{summary}\n\n{listed}{PR_SUMMARY_END}"
+        if previous_body and PR_SUMMARY_BLOCK_RE.search(previous_body):
+            return PR_SUMMARY_BLOCK_RE.sub(lambda _: block, previous_body, count=1)
+        return f"{block}\n\n---\n{PR_FOOTER}"
+    
+    body = build(summary, markers)
+    excess = len(body) - PR_BODY_MAX_CHARS
+    if excess > 0:
+        kept = len(markers)
+        while kept and excess > 0:
+            kept -= 1
+            excess -= len(markers[kept]) + 1
+        markers = markers[:kept]
+        if excess > 0:
+            summary = summary[:max(len(summary) - excess - len(PR_SUMMARY_TRUNCATED), 0)] + PR_SUMMARY_TRUNCATED
+        body = build(summary, markers)
+    return body
+
+def write_body_file(pr_body):
+    """Write a PR body to a temporary file for `gh --body-file`; return its path."""
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False, encoding='utf-8') as temp_file:
+        temp_file.write(pr_body)
+        return temp_file.name
+
+def create_pull_request(branch_name, title, repo_owner, repo_name, cwd=None, base='main'):
+    """Create a pull request using GitHub CLI, summarizing the diff from base (the ref the branch was made from)."""
     print(f"Creating pull request for branch: {branch_name}")
     
     try:
-        # Get diff from main to current branch
-        diff_content = get_diff_from_main()
+        # Get diff from base to current branch
+        diff_content = get_diff_from_main(cwd, base)
         
         # Generate PR summary using Amazon Q agent
-        pr_summary = generate_pr_summary(diff_content)
+        commit = run_command("git rev-parse HEAD", cwd=cwd) or ''
+        pr_summary, files = generate_pr_summary(diff_content, cwd, commit=commit)
         
         # Create PR body
-        pr_body = f"{pr_summary}\n\n---\n*This PR was generated by Amazon Q agent*"
+        pr_body = render_pr_body(pr_summary, files, commit)
         
-        # Use GitHub CLI to create pull request
-        command = f'gh pr create --title "{title}" --body "{pr_body}" --base main --head {branch_name}'
-        result = run_command(command)
+        # Use GitHub CLI to create pull request; the body goes through a file
+        # as it holds quotes and backticks
+        body_file = write_body_file(pr_body)
+        try:
+            command = f'gh pr create --title "{title}" --body-file {body_file} --base main --head {branch_name}'
+            result = run_command(command, cwd=cwd)
+        finally:
+            os.unlink(body_file)
         
         if result:
             print(f"Pull request created successfully!")
@@ -241,7 +841,12 @@ def get_github_info():
         return None, None
 
 def update_pr_body_with_diff(branch_name):
-    """Update the PR body with the latest diff using Amazon Q agent."""
+    """
+    Update the PR body with the latest diff using Amazon Q agent.
+    
+    Only files whose diff changed since the summary in the current PR body
+    was generated are re-summarized; the rest of the body is merged in.
+    """
     try:
         # Get diff from main to current branch
         diff_content = get_diff_from_main()
@@ -250,24 +855,30 @@ def update_pr_body_with_diff(branch_name):
             print("No changes detected to update PR body")
             return False
         
+        # Read the summary recorded in the current PR body
+        previous_body = run_command(f"gh pr view {branch_name} --json body --jq .body", check=False) or ''
+        previous_files = parse_pr_file_summaries(previous_body)
+        if previous_files and {path: f.diff_hash for path, f in previous_files.items()} == diff_file_hashes(diff_content):
+            print("PR body is up to date: no file changed since the last summary")
+            return True
+        
         # Generate new PR summary using Amazon Q agent
-        pr_summary = generate_pr_summary(diff_content)
+        commit = run_command("git rev-parse HEAD") or ''
+        pr_summary, files = generate_pr_summary(diff_content, previous_files=previous_files, commit=commit)
+        pr_body = render_pr_body(pr_summary, files, commit, previous_body)
         
         # Update the PR body using GitHub CLI
         print("Updating PR body with latest changes...")
         
         # Create temporary file with new body content
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as temp_file:
-            temp_file.write(pr_summary)
-            temp_file_path = temp_file.name
+        body_file = write_body_file(pr_body)
         
         # Update PR body using GitHub CLI
-        command = f'gh pr edit {branch_name} --body-file {temp_file_path}'
+        command = f'gh pr edit {branch_name} --body-file {body_file}'
         result = run_command(command)
         
         # Clean up temporary file
-        os.unlink(temp_file_path)
+        os.unlink(body_file)
         
         if result:
             print("✅ PR body updated successfully!")
@@ -385,10 +996,10 @@ def create_command(prompt, branch_name, commit_message):
         print(f"Unexpected error: {e}")
         return False
 
-def read_raml_file():
+def read_raml_file(path='./temp/api.raml'):
     """Read the API.raml file and return its contents."""
     try:
-        with open('./temp/api.raml', 'r', encoding='utf-8') as file:
+        with open(path, 'r', encoding='utf-8') as file:
             return file.read()
     except FileNotFoundError:
         print("Warning: api.raml file not found")
@@ -490,6 +1101,235 @@ def show_endpoint_selector(endpoints):
             print("\nSelection cancelled")
             return None
 
+def show_endpoint_multi_selector(endpoints):
+    """Show a CLI selector that accepts several endpoints, e.g. '1,3,5-7' or 'all'."""
+    if not endpoints:
+        print("No endpoints found in RAML file")
+        return None
+    
+    print("\n📋 Available endpoints from RAML:")
+    print("=" * 50)
+    
+    for i, endpoint in enumerate(endpoints, 1):
+        print(f"{i:2d}. {endpoint['full_endpoint']}")
+        if endpoint['description']:
+            print(f"    Description: {endpoint['description']}")
+        print()
+    
+    while True:
+        try:
+            choice = input(f"Select endpoints to migrate (e.g. 1,3,5-7 or 'all'): ").strip()
+            selected = [endpoints[i] for i in parse_endpoint_selection(choice, len(endpoints))]
+            print(f"\n✅ Selected {len(selected)} endpoint(s)")
+            return selected
+        except ValueError as e:
+            print(e)
+        except KeyboardInterrupt:
+            print("\nSelection cancelled")
+            return None
+
+def parse_endpoint_selection(choice, count):
+    """
+    Turn a selection such as '1,3,5-7' or 'all' into 0-based endpoint indexes.
+    
+    Raises ValueError if the selection is empty or out of range.
+    """
+    if choice.lower() == 'all':
+        return list(range(count))
+    
+    indexes = []
+    for part in choice.replace(' ', '').split(','):
+        if not part:
+            continue
+        start, dash, end = part.partition('-')
+        if not start.isdigit() or (dash and not end.isdigit()):
+            raise ValueError(f"Invalid selection: {part}")
+        first, last = int(start), int(end or start)
+        if not 1 <= first <= last <= count:
+            raise ValueError(f"Please enter numbers between 1 and {count}")
+        indexes.extend(i - 1 for i in range(first, last + 1) if i - 1 not in indexes)
+    if not indexes:
+        raise ValueError("Please select at least one endpoint")
+    return indexes
+
+def endpoint_slug(endpoint):
+    """Make a branch-name-safe slug from an endpoint, e.g. 'GET /stations/{id}' -> 'get-stations-id'."""
+    return re.sub(r'[^a-z0-9]+', '-', endpoint['full_endpoint'].lower()).strip('-')
+
+def unique_endpoint_slugs(endpoints):
+    """
+    Slug each endpoint, suffixing repeats with '-2', '-3', ...
+    
+    Endpoints such as 'GET /a-b' and 'GET /a_b' slug the same; each one
+    needs its own branch and worktree.
+    """
+    slugs, taken = [], set()
+    for endpoint in endpoints:
+        slug = base = endpoint_slug(endpoint)
+        suffix = 2
+        while slug in taken:
+            slug = f"{base}-{suffix}"
+            suffix += 1
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+def build_migration_prompt(endpoint, raml_content):
+    """Build the Amazon Q prompt that migrates one endpoint."""
+    return f"""Migrate the following Mulesoft endpoint to python: {endpoint}
+
+API Specification (RAML):
+{raml_content}
+
+Please migrate this endpoint to a Python Flask application with proper error handling, documentation, and tests."""
+
+def add_worktree(path, branch_name, base):
+    """Create a git worktree at path on a new branch from base, leaving the main checkout alone."""
+    with _worktree_lock:
+        return run_command(f"git worktree add -b {shlex.quote(branch_name)} {shlex.quote(path)} {base}") is not None
+
+def remove_worktree(path):
+    """Remove a git worktree; its branch is kept."""
+    with _worktree_lock:
+        run_command(f"git worktree remove --force {shlex.quote(path)}", check=False)
+
+def migrate_endpoint_in_worktree(endpoint, slug, raml_content, branch_name, commit_message,
+                                 repo_owner, repo_name, worktree_root, base):
+    """
+    Migrate one endpoint on its own branch, in its own worktree named slug.
+    
+    Returns a result dict with the endpoint, branch, status ('success' or
+    the step that failed), PR URL and duration in seconds.
+    """
+    label = endpoint['full_endpoint']
+    result = {'endpoint': label, 'branch': branch_name, 'status': 'success', 'pr_url': None}
+    started = time.monotonic()
+    path = os.path.join(worktree_root, slug)
+    
+    try:
+        if not add_worktree(path, branch_name, base):
+            result['status'] = 'failed: create worktree'
+            return result
+        
+        agent_response = call_amazon_q_agent(build_migration_prompt(label, raml_content), cwd=path, label=label)
+        if not agent_response:
+            result['status'] = 'failed: Amazon Q agent'
+        elif not run_command("git status --porcelain", cwd=path):
+            result['status'] = 'no changes'
+        elif not commit_changes(f"{commit_message}: {label}", cwd=path):
+            result['status'] = 'failed: commit'
+        elif not push_branch(branch_name, cwd=path):
+            result['status'] = 'failed: push'
+        else:
+            pr_url = create_pull_request(branch_name, f"{commit_message}: {label}", repo_owner, repo_name,
+                                         cwd=path, base=base)
+            if pr_url:
+                result['pr_url'] = pr_url if isinstance(pr_url, str) else None
+            else:
+                result['status'] = 'failed: pull request'
+    except Exception as e:
+        result['status'] = f"failed: {e}"
+    finally:
+        remove_worktree(path)
+        result['duration'] = time.monotonic() - started
+    
+    return result
+
+def print_migration_summary(results, elapsed):
+    """Print one row per migrated endpoint."""
+    print("\n" + "=" * 50)
+    print(f"Migration summary ({elapsed:.0f}s wall clock)")
+    print("=" * 50)
+    
+    width = max(len(r['endpoint']) for r in results)
+    print(f"{'Endpoint':<{width}}  {'Status':<24}  {'Time':>6}  PR / branch")
+    for r in results:
+        print(f"{r['endpoint']:<{width}}  {r['status']:<24}  {r['duration']:>5.0f}s  {r['pr_url'] or r['branch']}")
+    
+    succeeded = sum(1 for r in results if r['status'] == 'success')
+    print(f"\n{succeeded}/{len(results)} endpoint(s) migrated")
+
+def mulesoft_migr_parallel_command(branch_prefix, commit_message, jobs, select_all=False):
+    """
+    Mulesoft migration of several endpoints at once.
+    
+    Each endpoint gets its own branch and git worktree, so the agents work
+    in parallel (at most `jobs` at a time) without touching the main checkout.
+    """
+    print(f"🔄 Mulesoft Migration mode: migrating endpoints in parallel ({jobs} at a time)")
+    
+    # Get GitHub repository info
+    repo_owner, repo_name = get_github_info()
+    if not repo_owner or not repo_name:
+        return False
+    
+    # Branch from the latest origin/main without checking it out
+    base = "origin/main" if run_command("git fetch origin main") is not None else "main"
+    
+    work_dir = tempfile.mkdtemp(prefix='mulesoft-migr-')
+    try:
+        # Step 1: Download project from Anypoint Design Center, outside the checkout
+        print("Downloading project from Anypoint Design Center...")
+        download_dir = os.path.join(work_dir, 'raml')
+        if not run_command(f"anypoint-cli designcenter project download gen-ai-poc {shlex.quote(download_dir)}"):
+            print("Warning: Failed to download project from Anypoint Design Center")
+        
+        # Step 2: Read and parse the RAML endpoints
+        raml_content = read_raml_file(os.path.join(download_dir, 'api.raml'))
+        if not raml_content:
+            print("No RAML file found. Exiting...")
+            return False
+        endpoints = parse_raml_endpoints(raml_content)
+        if not endpoints:
+            print("No endpoints found in RAML. Exiting...")
+            return False
+        
+        # Step 3: Select endpoints
+        selected = endpoints if select_all else show_endpoint_multi_selector(endpoints)
+        if not selected:
+            print("No endpoint selected. Exiting...")
+            return False
+        
+        # Step 4: Migrate each endpoint in its own worktree
+        worktree_root = os.path.join(work_dir, 'worktrees')
+        started = time.monotonic()
+        results = []
+        pool = ThreadPoolExecutor(max_workers=max(1, jobs))
+        try:
+            futures = [
+                pool.submit(migrate_endpoint_in_worktree, endpoint, slug, raml_content,
+                            f"{branch_prefix}-{slug}", commit_message,
+                            repo_owner, repo_name, worktree_root, base)
+                for endpoint, slug in zip(selected, unique_endpoint_slugs(selected))
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                print(f"[{result['endpoint']}] {result['status']} after {result['duration']:.0f}s")
+                results.append(result)
+        except KeyboardInterrupt:
+            # The agents run in their own sessions, so Ctrl-C did not reach
+            # them; stop them rather than wait up to Q_CALL_TIMEOUT for each
+            print("\nStopping running agents...")
+            pool.shutdown(wait=False, cancel_futures=True)
+            cancel_running_commands()
+            raise
+        finally:
+            # Lets stopped migrations remove their worktrees before work_dir goes
+            pool.shutdown(wait=True)
+        
+        # Step 5: Summary, in selection order
+        order = {endpoint['full_endpoint']: i for i, endpoint in enumerate(selected)}
+        results.sort(key=lambda r: order[r['endpoint']])
+        print_migration_summary(results, time.monotonic() - started)
+        return all(r['status'] in ('success', 'no changes') for r in results)
+    
+    except KeyboardInterrupt:
+        print("\nOperation cancelled by user")
+        return False
+    finally:
+        run_command("git worktree prune", check=False)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
 def mulesoft_migr_command(branch_name, commit_message):
     """Mulesoft migration command: full workflow with new branch and PR."""
     print("🔄 Mulesoft Migration mode: Creating new branch and pull request")
@@ -537,14 +1377,7 @@ def mulesoft_migr_command(branch_name, commit_message):
             return False
         
         # Step 5: Call Amazon Q agent with endpoint and RAML context
-        # Sanitize RAML content
-        sanitized_raml = raml_content
-        enhanced_prompt = f"""Migrate the following Mulesoft endpoint to python: {endpoint}
-
-API Specification (RAML):
-{sanitized_raml}
-
-Please migrate this endpoint to a Python Flask application with proper error handling, documentation, and tests."""
+        enhanced_prompt = build_migration_prompt(endpoint, raml_content)
         
         print("Calling Amazon Q agent with RAML specification...")
         agent_response = call_amazon_q_agent(enhanced_prompt)
@@ -589,7 +1422,10 @@ Please migrate this endpoint to a Python Flask application with proper error han
         return False
 
 def main():
+    global q_cache_enabled
     parser = argparse.ArgumentParser(description="CLI tool to work with Amazon Q agent and GitHub")
+    parser.add_argument("--no-cache", action='store_true',
+                        help="Always call Amazon Q instead of reusing cached outputs (also Q_CACHE=off)")
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
     # Create command (original functionality)
@@ -607,6 +1443,12 @@ def main():
     mulesoft_parser = subparsers.add_parser('mulesoft-migr', help='Migrate Mulesoft endpoint to AWS with Amazon Q agent')
     mulesoft_parser.add_argument("--branch-name", help="Name for the new branch (default: auto-generated)")
     mulesoft_parser.add_argument("--pr-title", help="PR title and commit message (default: auto-generated)")
+    mulesoft_parser.add_argument("--multi", action='store_true',
+                                 help="Select several endpoints and migrate them in parallel, one branch each")
+    mulesoft_parser.add_argument("--all", action='store_true',
+                                 help="Migrate every endpoint in the RAML in parallel, one branch each")
+    mulesoft_parser.add_argument("--jobs", type=int, default=DEFAULT_MIGRATION_JOBS,
+                                 help=f"Endpoints migrated at once with --multi/--all (default: {DEFAULT_MIGRATION_JOBS})")
     
     args = parser.parse_args()
     
@@ -614,6 +1456,9 @@ def main():
         parser.print_help()
         return
     
+    if args.no_cache:
+        q_cache_enabled = False
+    
     if args.command == 'update':
         # Generate commit message if not provided
         commit_message = args.commit_message or f"Update from Amazon Q agent: {args.prompt[:50]}..."
@@ -634,7 +1479,11 @@ def main():
         branch_name = args.branch_name or f"mulesoft-migration-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
         commit_message = args.pr_title or f"Mulesoft Migration: {datetime.now().strftime('%Y%m%d-%H%M%S')}"
         
-        success = mulesoft_migr_command(branch_name, commit_message)
+        if args.multi or args.all:
+            # --branch-name becomes the prefix of one branch per endpoint
+            success = mulesoft_migr_parallel_command(branch_name, commit_message, args.jobs, select_all=args.all)
+        else:
+            success = mulesoft_migr_command(branch_name, commit_message)
         sys.exit(0 if success else 1)
 
 if __name__ == "__main__":
@@ -2,14 +2,37 @@
 """
 Integration test script for the stations endpoint.
 This script demonstrates how to interact with the migrated stations endpoint.
+
+With --load it instead drives /stations and /hello from concurrent workers
+over keep-alive sessions and reports latency percentiles, throughput and
+error rates, optionally comparing against a previous run:
+
+    python scripts/test_stations_endpoint.py --load --concurrency 16 --duration 30 \
+        --output results.json --compare baseline.json
 """
 
+import argparse
+import math
 import requests
 import json
 import sys
-from typing import List, Dict, Any
+import threading
+import time
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Optional, Tuple
 
-def test_stations_endpoint(base_url: str = "http://localhost:80") -> bool:
+# (path, weight) pairs for load mode: mostly stations lookups with a mix of filters
+DEFAULT_LOAD_MIX = [
+    ("/stations", 4),
+    ("/stations?city=New York", 2),
+    ("/stations?code=CHI", 2),
+    ("/stations?city=chicago&code=chi", 1),
+    ("/stations?city=NonExistentCity", 1),
+    ("/hello", 2),
+]
+
+def check_stations_endpoint(base_url: str = "http://localhost:80") -> bool:
     """
     Test the stations endpoint functionality.
     
@@ -127,20 +150,18 @@ def test_stations_endpoint(base_url: str = "http://localhost:80") -> bool:
         
     except requests.exceptions.ConnectionError:
         print("❌ Failed: Could not connect to the API")
-        print("Make sure the Flask application is running on http://localhost:80")
+        print(f"Make sure the Flask application is running on {base_url}")
         return False
     except Exception as e:
         print(f"❌ Failed: Unexpected error: {str(e)}")
         return False
 
-def demonstrate_usage_examples():
+def demonstrate_usage_examples(base_url: str = "http://localhost:80"):
     """Demonstrate various ways to use the stations endpoint."""
     print("\n" + "=" * 50)
     print("💡 USAGE EXAMPLES")
     print("=" * 50)
     
-    base_url = "http://localhost:80"
-    
     try:
         # Example 1: Basic usage
         print("Example 1: Basic station retrieval")
@@ -180,17 +201,220 @@ def demonstrate_usage_examples():
     except Exception as e:
         print(f"Error in usage examples: {str(e)}")
 
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Return the nearest-rank percentile of an ascending list.
+    
+    Args:
+        sorted_values: Values sorted ascending
+        pct: Percentile between 0 and 100
+        
+    Returns:
+        float: The percentile value, or 0.0 for an empty list
+    """
+    if not sorted_values:
+        return 0.0
+    # Multiply before dividing so exact ranks stay exact in floating point
+    rank = max(1, math.ceil(pct * len(sorted_values) / 100))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize_latencies(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """
+    Summarize raw latencies (seconds) into the reported statistics.
+    
+    Args:
+        latencies: Per-request latencies in seconds
+        errors: Number of failed requests
+        elapsed: Wall-clock duration of the run in seconds
+        
+    Returns:
+        Dict with request count, throughput, error rate and latency percentiles in ms
+    """
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": errors / count if count else 0.0,
+        "rps": count / elapsed if elapsed else 0.0,
+        "mean_ms": sum(ordered) / count * 1000 if count else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+def make_session(pool_size: int = 1) -> requests.Session:
+    """Create a keep-alive session with its own connection pool and no retries."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def run_load_test(base_url: str, concurrency: int, duration: float,
+                  mix: Optional[List[Tuple[str, int]]] = None, timeout: float = 10.0) -> Dict[str, Any]:
+    """
+    Drive the API from concurrent workers for a fixed duration.
+    
+    Each worker owns a keep-alive session and walks the weighted request mix,
+    starting at a different offset so the workers interleave paths.
+    
+    Args:
+        base_url: Base URL of the API
+        concurrency: Number of concurrent workers
+        duration: Seconds to run
+        mix: (path, weight) pairs; defaults to DEFAULT_LOAD_MIX
+        timeout: Per-request timeout in seconds
+        
+    Returns:
+        Dict with the run configuration, overall statistics and per-path statistics
+    """
+    mix = mix or DEFAULT_LOAD_MIX
+    schedule = [path for path, weight in mix for _ in range(weight)]
+    latencies: Dict[str, List[float]] = {path: [] for path, _ in mix}
+    errors: Dict[str, int] = {path: 0 for path, _ in mix}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+    
+    def worker(offset: int):
+        session = make_session()
+        local_latencies: Dict[str, List[float]] = {path: [] for path, _ in mix}
+        local_errors: Dict[str, int] = {path: 0 for path, _ in mix}
+        i = offset
+        while time.perf_counter() < stop_at:
+            path = schedule[i % len(schedule)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                response = session.get(f"{base_url}{path}", timeout=timeout)
+                if response.status_code >= 400:
+                    local_errors[path] += 1
+            except requests.exceptions.RequestException:
+                local_errors[path] += 1
+            local_latencies[path].append(time.perf_counter() - start)
+        session.close()
+        with lock:
+            for path in local_latencies:
+                latencies[path].extend(local_latencies[path])
+                errors[path] += local_errors[path]
+    
+    workers = [threading.Thread(target=worker, args=(n * 7,), daemon=True) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    
+    all_latencies = [latency for path_latencies in latencies.values() for latency in path_latencies]
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "base_url": base_url,
+        "concurrency": concurrency,
+        "duration_s": elapsed,
+        "overall": summarize_latencies(all_latencies, sum(errors.values()), elapsed),
+        "paths": {
+            path: summarize_latencies(latencies[path], errors[path], elapsed)
+            for path, _ in mix
+        },
+    }
+
+def print_load_report(report: Dict[str, Any]):
+    """Print a load test report as a table."""
+    print("\n" + "=" * 50)
+    print("📊 LOAD TEST RESULTS")
+    print("=" * 50)
+    print(f"Target: {report['base_url']}  workers: {report['concurrency']}  duration: {report['duration_s']:.1f}s")
+    print(f"\n{'path':<36} {'req':>7} {'rps':>8} {'err%':>6} {'p50':>7} {'p95':>7} {'p99':>7}")
+    rows = list(report["paths"].items()) + [("TOTAL", report["overall"])]
+    for path, stats in rows:
+        print(f"{path:<36} {stats['requests']:>7} {stats['rps']:>8.1f} {stats['error_rate'] * 100:>5.1f}% "
+              f"{stats['p50_ms']:>7.2f} {stats['p95_ms']:>7.2f} {stats['p99_ms']:>7.2f}")
+    print("(latencies in ms)")
+
+def compare_reports(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compare a run against a baseline run.
+    
+    Args:
+        current: Report from this run
+        baseline: Report loaded from a previous run
+        tolerance: Allowed relative regression, e.g. 0.2 for 20%
+        
+    Returns:
+        List of regression descriptions; empty if the run is within tolerance
+    """
+    regressions = []
+    now, before = current["overall"], baseline["overall"]
+    if before["rps"] and now["rps"] < before["rps"] * (1 - tolerance):
+        regressions.append(f"throughput {now['rps']:.1f} rps vs baseline {before['rps']:.1f} rps")
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        if before[key] and now[key] > before[key] * (1 + tolerance):
+            regressions.append(f"{key} {now[key]:.2f} vs baseline {before[key]:.2f}")
+    if now["error_rate"] > before["error_rate"]:
+        regressions.append(f"error rate {now['error_rate']:.2%} vs baseline {before['error_rate']:.2%}")
+    return regressions
+
+def load_command(args) -> bool:
+    """Run load mode and return True if the run passed its thresholds."""
+    print(f"🚂 Load testing {args.base_url} with {args.concurrency} workers for {args.duration:.0f}s")
+    report = run_load_test(args.base_url, args.concurrency, args.duration, timeout=args.timeout)
+    print_load_report(report)
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nResults written to {args.output}")
+    
+    passed = True
+    if report["overall"]["error_rate"] > args.max_error_rate:
+        print(f"❌ Error rate {report['overall']['error_rate']:.2%} exceeds {args.max_error_rate:.2%}")
+        passed = False
+    
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = compare_reports(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"❌ Regression: {regression}")
+        if not regressions:
+            print(f"✅ Within {args.tolerance:.0%} of baseline {args.compare}")
+        passed = passed and not regressions
+    
+    return passed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Integration and load tests for the stations endpoint")
+    parser.add_argument("--base-url", default="http://localhost:80", help="Base URL of the API")
+    parser.add_argument("--load", action="store_true", help="Run the concurrent load test instead of the checks")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent workers in load mode")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to run in load mode")
+    parser.add_argument("--timeout", type=float, default=10, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Write load results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression against the baseline (default: 0.2)")
+    parser.add_argument("--max-error-rate", type=float, default=0.0,
+                        help="Fail if the error rate exceeds this fraction (default: 0)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
+    
+    if args.load:
+        sys.exit(0 if load_command(args) else 1)
+    
     print("🚂 Mulesoft to Python Flask Migration Test")
     print("Testing GET /stations endpoint migration")
     print()
     
     # Run the main test
-    success = test_stations_endpoint()
+    success = check_stations_endpoint(args.base_url)
     
     if success:
         # Show usage examples
-        demonstrate_usage_examples()
+        demonstrate_usage_examples(args.base_url)
         sys.exit(0)
     else:
         print("\n❌ Migration test failed!")
@@ -1,13 +1,39 @@
-from flask import Flask, jsonify, request
-import requests
-from typing import List, Dict, Any
+import time
+
+# Start of the import, for the import-to-ready time reported by /ready
+_IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, Response, g, jsonify, request, stream_with_context
+from werkzeug.datastructures import MultiDict
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 import logging
+import math
+import os
+import threading
+from urllib.parse import urlsplit
+
+from src.compression import compress, configured_encodings, negotiate_encoding
+from src.geo import parse_coordinate
+from src.json_provider import configure_json_provider
+from src.logging_config import configure_logging, init_request_sampling, sampled_logger
+from src.metrics import LATENCY_BUCKETS, SIZE_BUCKETS, MetricsRegistry
+from src.pagination import DEFAULT_PAGE_SIZE, encode_cursor, parse_limit, resolve_cursor
+from src.repository import StationRepository, open_sqlite_repository
+from src.response_cache import CachedResponse, ResponseCache
+from src.station_source import StationFileSource
+from src.search import normalize
+from src.stations import StationRecord, StationStore, COORDINATE_FIELDS, REQUIRED_FIELDS, filter_values, fold_key
+from src.upstream import StationUpstream, UpstreamError, UpstreamTimeout
 
 app = Flask(__name__)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+# Configure logging: JSON lines written from a background thread (see LOG_* settings)
+configure_logging()
+init_request_sampling(app)
+logger = sampled_logger(__name__)
+
+# Use the fastest installed JSON encoder for all responses (see JSON_ENCODER)
+configure_json_provider(app)
 
 # Sample station data (in production, this would come from a database)
 STATIONS_DATA = [
@@ -15,39 +41,168 @@ STATIONS_DATA = [
         "id": "st001",
         "name": "Union Station",
         "city": "New York",
-        "code": "NYS"
+        "code": "NYS",
+        "lat": 40.7527,
+        "lon": -73.9772
     },
     {
         "id": "st002",
         "name": "Central Station",
         "city": "Chicago",
-        "code": "CHI"
+        "code": "CHI",
+        "lat": 41.8789,
+        "lon": -87.6359
     },
     {
         "id": "st003",
         "name": "Grand Central",
         "city": "Los Angeles",
-        "code": "LAX"
+        "code": "LAX",
+        "lat": 34.0562,
+        "lon": -118.2365
     },
     {
         "id": "st004",
         "name": "Penn Station",
         "city": "Philadelphia",
-        "code": "PHL"
+        "code": "PHL",
+        "lat": 39.9557,
+        "lon": -75.182
     },
     {
         "id": "st005",
         "name": "South Station",
         "city": "Boston",
-        "code": "BOS"
+        "code": "BOS",
+        "lat": 42.3523,
+        "lon": -71.0552
     }
 ]
 
+
+# Target size of each chunk written by the NDJSON streaming mode
+NDJSON_CHUNK_BYTES = 64 * 1024
+
+# Results returned by /stations/search when no limit is given
+SEARCH_DEFAULT_LIMIT = 10
+
+# Stations returned by /stations/nearby when no k is given
+NEARBY_DEFAULT_K = 10
+
+# /stations filters; each takes comma-separated alternatives
+FILTER_PARAMS = ('city', 'code', 'name', 'id')
+
+# Most alternatives accepted by one /stations filter
+MAX_FILTER_VALUES = 100
+
+# Field names /stations accepts in its fields projection
+PROJECTABLE_FIELDS = tuple(REQUIRED_FIELDS) + COORDINATE_FIELDS
+
+# Most ids or codes accepted by one /stations/batch request
+BATCH_MAX_KEYS = 1000
+
+# Content encodings offered to clients, most preferred first (see RESPONSE_COMPRESSION)
+COMPRESSION_ENCODINGS = configured_encodings()
+
+# JSON bodies smaller than this are sent uncompressed; the saving would not cover the CPU
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+
+# Requests served by warm_up() before the process reports ready: the hot
+# /stations bodies to pre-serialize, and small lookups that build the
+# search and geo indexes (see STATIONS_WARMUP_PATHS)
+WARMUP_PATHS = tuple(path.strip() for path in os.environ.get(
+    'STATIONS_WARMUP_PATHS',
+    '/stations,/stations/search?q=station,/stations/nearby?lat=0&lon=0&radius=1'
+).split(',') if path.strip())
+
+# WSGI environ key marking warm-up requests, which are left out of the request metrics
+WARMUP_ENVIRON_KEY = 'stations.warmup'
+
+# Serialized /stations bodies keyed by normalized filters, invalidated when the data version changes
+_response_cache = ResponseCache(
+    max_entries=int(os.environ.get('STATIONS_CACHE_MAX_ENTRIES', 256)),
+    max_bytes=int(os.environ.get('STATIONS_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+)
+
+# Request metrics, exposed on /metrics in Prometheus text format
+metrics = MetricsRegistry()
+metrics.histogram('http_request_duration_seconds', 'Request latency by route, method and status.', LATENCY_BUCKETS)
+metrics.histogram('http_response_size_bytes', 'Response body size by route.', SIZE_BUCKETS)
+metrics.counter('stations_validation_failures_total', 'Station records rejected by _validate_station_data at ingest.')
+metrics.counter('stations_filter_requests_total', 'Filtered /stations requests by filter and whether any station matched.')
+metrics.counter('stations_response_cache_requests_total', 'Serialized /stations body lookups by result.')
+metrics.counter('stations_upstream_requests_total', 'Upstream /stations page lookups by result (hit, miss, coalesced, error).')
+metrics.gauge('stations_loaded', 'Valid stations in the current snapshot.', lambda: len(_get_station_store()))
+metrics.gauge('stations_quarantined', 'Invalid station records in the current snapshot.',
+              lambda: _get_station_store().quarantine_count)
+metrics.gauge('stations_ready_seconds', 'Seconds from app import until warm-up finished; 0 until ready.',
+              lambda: _ready_seconds or 0.0)
+
+@app.before_request
+def _start_request_timer():
+    """Record when the request started, for the latency histogram."""
+    if not request.environ.get(WARMUP_ENVIRON_KEY):
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request_metrics(response):
+    """Record latency and payload size for the request."""
+    start = g.get('request_start')
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - start,
+                        (('route', route), ('method', request.method), ('status', str(response.status_code))))
+        # Streamed responses have no length up front
+        if response.content_length is not None:
+            metrics.observe('http_response_size_bytes', response.content_length, (('route', route),))
+    return response
+
+# Registered after the metrics hook so it runs first and sizes are recorded as sent
+@app.after_request
+def _compress_json_response(response):
+    """Compress JSON bodies built per request; cached /stations bodies arrive already encoded."""
+    if (response.mimetype != 'application/json' or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+    size = response.content_length or 0
+    encoding = _negotiate_encoding(size)
+    if _varies_by_encoding(size):
+        response.vary.add('Accept-Encoding')
+    if encoding is not None:
+        response.set_data(compress(response.get_data(), encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+@app.route('/metrics')
+def get_metrics():
+    """Expose request and station metrics in Prometheus text format."""
+    return Response(metrics.render(), status=200, content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/hello')
 def hello():
     """Simple greeting endpoint for health checks."""
     return jsonify({'message': 'Hello, world!'})
 
+@app.route('/ready')
+def ready():
+    """
+    Readiness probe for load balancers and rolling deploys.
+    
+    Unlike /hello, which answers as soon as the app is imported, this only
+    succeeds once warm_up() has built the station indexes and pre-serialized
+    the hot responses.
+    
+    Returns:
+        200 JSON with the import-to-ready time in seconds, or 503 with a
+        Retry-After header while warm-up has not finished
+    """
+    if _ready_seconds is None:
+        response = jsonify({'status': 'starting'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+    return jsonify({'status': 'ready', 'ready_seconds': round(_ready_seconds, 3)})
+
 @app.route('/stations', methods=['GET'])
 def get_stations():
     """
@@ -56,21 +211,41 @@ def get_stations():
     Query Parameters:
         city (str, optional): Filter stations by city name (case-insensitive)
         code (str, optional): Filter stations by station code (case-insensitive)
+        name (str, optional): Filter stations by full name (ignores case and punctuation)
+        fields (str, optional): Comma-separated fields to return, any of PROJECTABLE_FIELDS, e.g. 'code'
+        fields (str, optional): Comma-separated fields to return, e.g. 'code'
+        limit (int, optional): Maximum stations per page (capped at 1000)
+        cursor (str, optional): Opaque cursor from a previous X-Next-Cursor header
+        stream (str, optional): 'ndjson' streams one station per line
+        
+        Each filter accepts up to MAX_FILTER_VALUES comma-separated values
+        and matches any of them; different filters must all match.
         
     Returns:
         JSON response containing list of stations with their details.
-        Each station includes: id, name, city, and code.
+        Each station includes: id, name, city, and code, or only the
+        requested fields. When more pages follow, the X-Next-Cursor header
+        holds the cursor for the next page.
     
     Response Format:
-        200 OK: List of station objects
+        200 OK: List of station objects, with a strong ETag header
+        200 OK (stream=ndjson): application/x-ndjson, one station object per line
+        304 Not Modified: If-None-Match matched the current ETag (no body)
         400 Bad Request: Invalid query parameters
         500 Internal Server Error: Server error occurred
+        502 Bad Gateway / 504 Gateway Timeout: The upstream station API
+            (STATIONS_UPSTREAM_URL) failed or did not answer in time
     
     Example Requests:
         GET /stations - Returns all stations
         GET /stations?city=New York - Returns stations in New York
         GET /stations?code=CHI - Returns stations with code CHI
         GET /stations?city=Chicago&code=CHI - Returns stations matching both filters
+        GET /stations?city=Boston,Chicago - Returns stations in Boston or Chicago
+        GET /stations?fields=code - Returns only the code of every station
+        GET /stations?limit=100 - Returns the first 100 stations
+        GET /stations?limit=100&cursor=<X-Next-Cursor> - Returns the next 100 stations
+        GET /stations?stream=ndjson - Streams all stations as NDJSON
     
     Example Response:
         [
@@ -84,38 +259,481 @@ def get_stations():
     """
     try:
         # Get query parameters
-        city_filter = request.args.get('city', '').strip()
-        code_filter = request.args.get('code', '').strip()
-        
-        logger.info(f"Fetching stations with filters - city: '{city_filter}', code: '{code_filter}'")
-        
-        # Validate data structure and apply filters
-        filtered_stations = []
-        for station in STATIONS_DATA:
-            if not _validate_station_data(station):
-                logger.warning(f"Invalid station data found: {station}")
-                continue
-            
-            # Apply city filter (case-insensitive)
-            if city_filter and station['city'].lower() != city_filter.lower():
-                continue
-                
-            # Apply code filter (case-insensitive)
-            if code_filter and station['code'].lower() != code_filter.lower():
-                continue
-            
-            filtered_stations.append(station)
-        
-        logger.info(f"Successfully retrieved {len(filtered_stations)} stations after filtering")
-        return jsonify(filtered_stations), 200
+        cursor = request.args.get('cursor', '').strip()
+        stream_format = request.args.get('stream', '').strip().lower()
+        try:
+            filters = {name: _filter_param(name) for name in FILTER_PARAMS}
+            fields = _parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return _bad_request(str(e))
+        
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Fetching stations with filters - city: '%s', code: '%s', name: '%s', id: '%s'",
+                        *(','.join(filters[name]) for name in FILTER_PARAMS))
+        
+        if stream_format and stream_format != 'ndjson':
+            return _bad_request("stream must be 'ndjson'")
+        
+        if _station_upstream is not None:
+            return _upstream_stations_response(filters, fields, cursor, stream_format)
+        
+        store = _get_station_store()
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            after = resolve_cursor(store, cursor) if cursor else None
+        except ValueError as e:
+            return _bad_request(str(e))
+        
+        if cursor and limit is None and not stream_format:
+            limit = DEFAULT_PAGE_SIZE
+        
+        # Records are validated at ingest, so the store only holds valid stations
+        if stream_format:
+            logger.info("Streaming stations as NDJSON")
+            records = store.stream(after=after, limit=limit, **filters)
+            return Response(stream_with_context(_ndjson_chunks(records, fields)),
+                            status=200, mimetype='application/x-ndjson')
+        
+        cache_key = (_filter_cache_key(filters), after, limit, fields)
+        cached = _response_cache.get(store.version, cache_key)
+        metrics.inc('stations_response_cache_requests_total', (('result', 'miss' if cached is None else 'hit'),))
+        if cached is None:
+            page = store.page(after=after, limit=limit, **filters)
+            headers = None
+            if page.has_more:
+                headers = {'X-Next-Cursor': encode_cursor(page.records[-1].id, page.positions[-1])}
+            body = app.json.dumps_bytes(_serialize_stations(page.records, fields))
+            cached = _response_cache.put(store.version, cache_key, body, len(page.records), headers)
+        
+        filter_name = '+'.join(name for name in FILTER_PARAMS if filters[name])
+        if filter_name:
+            metrics.inc('stations_filter_requests_total',
+                        (('filter', filter_name), ('result', 'hit' if cached.item_count else 'miss')))
+        
+        logger.info("Successfully retrieved %d stations after filtering", cached.item_count)
+        return _cached_json_response(
+            cached, lambda encoding: _response_cache.encoded(store.version, cache_key, cached, encoding))
         
     except Exception as e:
-        logger.error(f"Error retrieving stations: {str(e)}")
+        logger.error("Error retrieving stations: %s", e)
         return jsonify({
             "error": "Internal server error",
             "message": "Failed to retrieve stations"
         }), 500
 
+@app.route('/stations/search', methods=['GET'])
+def search_stations():
+    """
+    Search station names for typeahead.
+    
+    Query Parameters:
+        q (str): Text typed so far (required)
+        limit (int, optional): Maximum results (default 10, capped at 1000)
+        
+    Returns:
+        JSON list of station objects, best match first: names starting with
+        the query, then names with a later word starting with it, then (only
+        if neither matched) names within a small number of typos.
+    
+    Response Format:
+        200 OK: List of station objects
+        400 Bad Request: Missing query or invalid limit
+        500 Internal Server Error: Server error occurred
+    
+    Example Requests:
+        GET /stations/search?q=uni - Stations named "Union ..." first
+        GET /stations/search?q=unon&limit=5 - Typo-tolerant match, finds "Union Station"
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return _bad_request("q is required")
+        try:
+            limit = parse_limit(request.args.get('limit')) or SEARCH_DEFAULT_LIMIT
+        except ValueError as e:
+            return _bad_request(str(e))
+        
+        results = _get_station_store().search(query, limit)
+        logger.info("Search for '%s' returned %d stations", query, len(results))
+        return Response(app.json.dumps_bytes([station.to_dict() for station in results]),
+                        status=200, mimetype='application/json')
+        
+    except Exception as e:
+        logger.error("Error searching stations: %s", e)
+        return jsonify({
+            "error": "Internal server error",
+            "message": "Failed to search stations"
+        }), 500
+
+@app.route('/stations/batch', methods=['POST'])
+def batch_stations():
+    """
+    Look up many stations by id or code in one request.
+    
+    Request Body (JSON object with exactly one of):
+        ids (list of str): Station ids to resolve (exact match)
+        codes (list of str): Station codes to resolve (case-insensitive)
+        
+    Returns:
+        JSON list with one entry per requested key, in request order. Each
+        entry echoes the key and has ``found``; id lookups carry the
+        ``station`` (null on a miss), code lookups carry every ``stations``
+        entry holding the code (empty on a miss).
+    
+    Response Format:
+        200 OK: List of lookup results
+        400 Bad Request: Body is not an object with one list of strings
+        500 Internal Server Error: Server error occurred
+    
+    Example Request:
+        POST /stations/batch {"codes": ["NYS", "ZZZ"]}
+    
+    Example Response:
+        [
+            {"code": "NYS", "found": true, "stations": [{"id": "st001", ...}]},
+            {"code": "ZZZ", "found": false, "stations": []}
+        ]
+    """
+    try:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or len(set(body) & {'ids', 'codes'}) != 1:
+            return _bad_request("body must be a JSON object with either 'ids' or 'codes'")
+        field = 'ids' if 'ids' in body else 'codes'
+        keys = body[field]
+        if not isinstance(keys, list) or not all(isinstance(key, str) for key in keys):
+            return _bad_request(f"{field} must be a list of strings")
+        if len(keys) > BATCH_MAX_KEYS:
+            return _bad_request(f"{field} may hold at most {BATCH_MAX_KEYS} entries")
+        
+        store = _get_station_store()
+        if field == 'ids':
+            results = [
+                {'id': key, 'found': record is not None, 'station': None if record is None else record.to_dict()}
+                for key, record in zip(keys, store.lookup_ids(keys))
+            ]
+        else:
+            results = [
+                {'code': key, 'found': bool(records), 'stations': [record.to_dict() for record in records]}
+                for key, records in zip(keys, store.lookup_codes(keys))
+            ]
+        logger.info("Batch lookup of %d %s found %d", len(keys), field, sum(r['found'] for r in results))
+        return Response(app.json.dumps_bytes(results), status=200, mimetype='application/json')
+        
+    except Exception as e:
+        logger.error("Error in batch station lookup: %s", e)
+        return jsonify({
+            "error": "Internal server error",
+            "message": "Failed to look up stations"
+        }), 500
+
+@app.route('/stations/nearby', methods=['GET'])
+def nearby_stations():
+    """
+    Find the stations nearest a point.
+    
+    Query Parameters:
+        lat (float): Latitude of the point, -90 to 90 (required)
+        lon (float): Longitude of the point, -180 to 180 (required)
+        radius (float, optional): Only stations within this many kilometres
+        k (int, optional): Maximum results (default 10, capped at 1000)
+        
+    Returns:
+        JSON list of station objects, nearest first, each with a
+        distance_km field. Stations without coordinates are never returned.
+    
+    Response Format:
+        200 OK: List of station objects with distances
+        400 Bad Request: Missing or invalid parameters
+        500 Internal Server Error: Server error occurred
+    
+    Example Requests:
+        GET /stations/nearby?lat=40.75&lon=-73.99 - The 10 nearest stations
+        GET /stations/nearby?lat=40.75&lon=-73.99&radius=5&k=3 - Up to 3 within 5 km
+    """
+    try:
+        try:
+            lat = parse_coordinate(request.args.get('lat'), 'lat')
+            lon = parse_coordinate(request.args.get('lon'), 'lon')
+            radius = _parse_radius(request.args.get('radius'))
+            k = parse_limit(request.args.get('k')) or NEARBY_DEFAULT_K
+        except ValueError as e:
+            return _bad_request(str(e))
+        if lat is None or lon is None:
+            return _bad_request("lat and lon are required")
+        
+        results = _get_station_store().nearby(lat, lon, radius, k)
+        return Response(app.json.dumps_bytes([
+            {**station.to_dict(), 'distance_km': round(distance, 3)} for station, distance in results
+        ]), status=200, mimetype='application/json')
+        
+    except Exception as e:
+        logger.error("Error finding nearby stations: %s", e)
+        return jsonify({
+            "error": "Internal server error",
+            "message": "Failed to find nearby stations"
+        }), 500
+
+def _parse_radius(value: Optional[str]) -> Optional[float]:
+    """
+    Parse the ``radius`` query parameter.
+    
+    Args:
+        value: Raw parameter value, or None when absent
+        
+    Returns:
+        Radius in kilometres, or None for no radius
+        
+    Raises:
+        ValueError: If the value is not a finite, positive number
+    """
+    if value is None or not value.strip():
+        return None
+    try:
+        radius = float(value)
+    except ValueError:
+        radius = None
+    if radius is None or not math.isfinite(radius) or radius <= 0:
+        raise ValueError("radius must be a positive number of kilometres")
+    return radius
+
+def _upstream_stations_response(filters: Dict[str, Tuple[str, ...]], fields: Optional[Tuple[str, ...]],
+                                cursor: str, stream_format: str):
+    """
+    Serve a /stations page from the upstream station API.
+    
+    Filters, limit and cursor are forwarded; the cursor is the upstream's
+    own. Pages come from the upstream client's TTL cache when fresh, and
+    records are validated, then projected to ``fields``, before they are
+    returned.
+    
+    Returns:
+        Response, or a tuple of JSON error response and status code:
+        400 for an invalid limit, 502 if the upstream fails, 504 if it times out
+    """
+    try:
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError as e:
+        return _bad_request(str(e))
+    
+    params = _upstream_params(filters, cursor, limit)
+    try:
+        records, next_cursor, source = _station_upstream.get_stations(params)
+    except UpstreamTimeout as e:
+        metrics.inc('stations_upstream_requests_total', (('result', 'error'),))
+        logger.error("Station upstream timed out: %s", e)
+        return jsonify({
+            "error": "Gateway timeout",
+            "message": "Station upstream timed out"
+        }), 504
+    except UpstreamError as e:
+        metrics.inc('stations_upstream_requests_total', (('result', 'error'),))
+        logger.error("Station upstream failed: %s", e)
+        return jsonify({
+            "error": "Bad gateway",
+            "message": "Station upstream unavailable"
+        }), 502
+    metrics.inc('stations_upstream_requests_total', (('result', source),))
+    
+    stations = _validate_upstream_stations(records)
+    if stream_format:
+        return Response(stream_with_context(_ndjson_chunks(stations, fields)), status=200,
+                        mimetype='application/x-ndjson')
+    
+    headers = {'X-Next-Cursor': next_cursor} if next_cursor else None
+    body = app.json.dumps_bytes(_serialize_stations(stations, fields))
+    logger.info("Successfully retrieved %d stations from upstream", len(stations))
+    return _cached_json_response(CachedResponse(body, len(stations), headers))
+
+def _upstream_params(filters: Dict[str, Tuple[str, ...]], cursor: str, limit: Optional[int]) -> Dict[str, str]:
+    """Build the query forwarded to the upstream from parsed /stations parameters."""
+    params = {name: ','.join(values) for name, values in filters.items()}
+    params.update(cursor=cursor, limit=str(limit) if limit is not None else '')
+    return params
+
+def _validate_upstream_stations(records: List[Any]) -> List[StationRecord]:
+    """
+    Validate and normalize station records from the upstream, counting rejected records.
+    
+    Args:
+        records: Raw records from the upstream; not modified
+        
+    Returns:
+        List[StationRecord]: The valid records, in order
+    """
+    stations = [StationRecord.from_dict(record) for record in records if _validate_station_data(record)]
+    rejected = len(records) - len(stations)
+    if rejected:
+        logger.warning("Dropped %d invalid station records from upstream", rejected)
+        metrics.inc('stations_validation_failures_total', amount=rejected)
+    return stations
+
+def _cached_json_response(cached: CachedResponse, encode: Optional[Callable[[str], bytes]] = None) -> Response:
+    """
+    Build a JSON response from a cached body, honouring Accept-Encoding and If-None-Match.
+    
+    Each content encoding is a separate representation with its own ETag.
+    
+    Args:
+        cached: Serialized body and ETag
+        encode: Returns the body compressed with an encoding, e.g. a stored
+            variant; by default the body is compressed for this response
+        
+    Returns:
+        Response: 304 with no body if the client already has this ETag, otherwise 200
+    """
+    encoding, etag = _json_representation(cached)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    elif encoding is None:
+        response = Response(cached.body, status=200, mimetype='application/json')
+    else:
+        body = encode(encoding) if encode is not None else compress(cached.body, encoding)
+        response = Response(body, status=200, mimetype='application/json')
+        response.headers['Content-Encoding'] = encoding
+    if _varies_by_encoding(len(cached.body)):
+        response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    response.headers.update(cached.headers)
+    return response
+
+def _json_representation(cached: CachedResponse, accept_encoding: Optional[str] = None) -> Tuple[Optional[str], str]:
+    """
+    Pick the content encoding for a cached body and the ETag of that representation.
+    
+    Args:
+        cached: Serialized body and ETag
+        accept_encoding: Accept-Encoding header; defaults to the current request's
+        
+    Returns:
+        Tuple of (encoding or None to send the body as is, ETag)
+    """
+    encoding = _negotiate_encoding(len(cached.body), accept_encoding)
+    return encoding, cached.etag if encoding is None else f"{cached.etag}-{encoding}"
+
+def _varies_by_encoding(size: int) -> bool:
+    """Whether a JSON body of this size may be sent compressed, so caches must vary on Accept-Encoding."""
+    return size >= COMPRESSION_MIN_BYTES and bool(COMPRESSION_ENCODINGS)
+
+def _negotiate_encoding(size: int, accept_encoding: Optional[str] = None) -> Optional[str]:
+    """
+    Pick the content encoding for a JSON body.
+    
+    Args:
+        size: Uncompressed body size in bytes
+        accept_encoding: Accept-Encoding header; defaults to the current request's
+        
+    Returns:
+        str: Enabled encoding the client accepts, or None to send the body as is
+    """
+    if size < COMPRESSION_MIN_BYTES:
+        return None
+    if accept_encoding is None:
+        accept_encoding = request.headers.get('Accept-Encoding')
+    return negotiate_encoding(accept_encoding, COMPRESSION_ENCODINGS)
+
+def _ndjson_chunks(stations: Iterable[StationRecord], fields: Optional[Tuple[str, ...]] = None) -> Iterator[bytes]:
+    """
+    Serialize stations as NDJSON, yielding roughly NDJSON_CHUNK_BYTES at a time.
+    
+    Args:
+        stations: Station records to stream, in order
+        fields: Fields to include, or None for every field
+        
+    Yields:
+        bytes: Chunks of newline-delimited JSON objects
+    """
+    dumps_bytes = app.json.dumps_bytes
+    buffer = []
+    size = 0
+    for station in stations:
+        line = dumps_bytes(station.to_dict() if fields is None else station.project(fields))
+        buffer.append(line)
+        size += len(line)
+        if size >= NDJSON_CHUNK_BYTES:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+def _filter_param(name: str, args: Optional[MultiDict] = None) -> Tuple[str, ...]:
+    """
+    Read a /stations filter parameter.
+    
+    Alternatives may be comma-separated or given as repeated parameters.
+    
+    Args:
+        name: Query parameter name
+        args: Query parameters; defaults to the current request's
+        
+    Returns:
+        Tuple of trimmed, distinct values; empty when the filter is absent
+        
+    Raises:
+        ValueError: If more than MAX_FILTER_VALUES values are given
+    """
+    if args is None:
+        args = request.args
+    values = filter_values([value for raw in args.getlist(name) for value in raw.split(',')])
+    if len(values) > MAX_FILTER_VALUES:
+        raise ValueError(f"{name} accepts at most {MAX_FILTER_VALUES} values")
+    return values
+
+def _filter_cache_key(filters: Dict[str, Tuple[str, ...]]) -> Tuple[Tuple[str, ...], ...]:
+    """Normalize filters into a response cache key, so equivalent filters share one body."""
+    return (
+        tuple(sorted({fold_key(value) for value in filters['city']})),
+        tuple(sorted({fold_key(value) for value in filters['code']})),
+        tuple(sorted({normalize(value) for value in filters['name']})),
+        tuple(sorted(filters['id']))
+    )
+
+def _parse_fields(value: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Parse the ``fields`` projection parameter.
+    
+    Args:
+        value: Raw parameter value, or None when absent
+        
+    Returns:
+        Tuple of distinct field names in request order, or None for every field
+        
+    Raises:
+        ValueError: If the parameter is present but names no field, or names
+            a field outside PROJECTABLE_FIELDS
+    """
+    if value is None:
+        return None
+    fields = filter_values(value.split(','))
+    if not fields:
+        raise ValueError("fields must name at least one field")
+    unknown = [field for field in fields if field not in PROJECTABLE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}; "
+                         f"fields accepts {', '.join(PROJECTABLE_FIELDS)}")
+    return fields
+
+def _serialize_stations(stations: Iterable[StationRecord], fields: Optional[Tuple[str, ...]]) -> List[Dict[str, Any]]:
+    """Convert stations to response dicts with every field, or only ``fields``."""
+    if fields is None:
+        return [station.to_dict() for station in stations]
+    return [station.project(fields) for station in stations]
+
+def _bad_request(message: str):
+    """
+    Build a 400 response for invalid query parameters.
+    
+    Args:
+        message: Description of the problem
+        
+    Returns:
+        Tuple of JSON error response and status code
+    """
+    return jsonify({
+        "error": "Bad request",
+        "message": message
+    }), 400
+
 def _validate_station_data(station: Dict[str, Any]) -> bool:
     """
     Validate station data structure.
@@ -126,17 +744,184 @@ def _validate_station_data(station: Dict[str, Any]) -> bool:
     Returns:
         bool: True if valid, False otherwise
     """
-    required_fields = ['id', 'name', 'city', 'code']
-    
     if not isinstance(station, dict):
         return False
     
-    for field in required_fields:
+    for field in REQUIRED_FIELDS:
         if field not in station or not isinstance(station[field], str) or not station[field].strip():
             return False
     
+    # Coordinates are optional, but a station with one must have both
+    try:
+        lat = parse_coordinate(station.get('lat'), 'lat')
+        lon = parse_coordinate(station.get('lon'), 'lon')
+    except ValueError:
+        return False
+    if (lat is None) != (lon is None):
+        return False
+    
     return True
 
+def _build_station_store(stations: Optional[List[Dict[str, Any]]] = None) -> StationStore:
+    """
+    Validate and index station records, counting rejected records.
+    
+    Args:
+        stations: Raw station records; defaults to STATIONS_DATA
+    
+    Returns:
+        StationStore: Snapshot of the station data
+    """
+    store = StationStore(STATIONS_DATA if stations is None else stations, _validate_station_data)
+    if store.quarantine_count:
+        metrics.inc('stations_validation_failures_total', amount=store.quarantine_count)
+    return store
+
+# Validated, indexed snapshot of STATIONS_DATA, built once at load time
+_station_store = _build_station_store()
+
+def _open_station_database() -> Optional[StationRepository]:
+    """
+    Open the SQLite station database named by STATIONS_DATABASE, if any.
+    
+    Returns:
+        StationRepository for the database, or None to serve STATIONS_DATA
+    """
+    path = os.environ.get('STATIONS_DATABASE', '').strip()
+    if not path:
+        return None
+    pool_size = int(os.environ.get('STATIONS_DATABASE_POOL_SIZE', 4))
+    logger.info("Serving stations from SQLite database %s (pool size %d)", path, pool_size)
+    return open_sqlite_repository(path, pool_size=pool_size,
+                                  check_interval=float(os.environ.get('STATIONS_DATABASE_CHECK_INTERVAL', 1)))
+
+def _open_station_file() -> Optional[StationFileSource]:
+    """
+    Load and watch the station file named by STATIONS_FILE, if any.
+    
+    Returns:
+        StationFileSource reloaded in the background, or None to serve STATIONS_DATA
+    """
+    path = os.environ.get('STATIONS_FILE', '').strip()
+    if not path:
+        return None
+    source = StationFileSource(path, _build_station_store,
+                               interval=float(os.environ.get('STATIONS_FILE_POLL_INTERVAL', 2)))
+    source.start()
+    return source
+
+def _open_station_upstream() -> Optional[StationUpstream]:
+    """
+    Create the client for the upstream station API named by STATIONS_UPSTREAM_URL, if any.
+    
+    Returns:
+        StationUpstream serving /stations, or None to serve local station data
+    """
+    url = os.environ.get('STATIONS_UPSTREAM_URL', '').strip()
+    if not url:
+        return None
+    logger.info("Serving /stations from upstream %s", url)
+    return StationUpstream(
+        url,
+        pool_size=int(os.environ.get('STATIONS_UPSTREAM_POOL_SIZE', 100)),
+        timeout=float(os.environ.get('STATIONS_UPSTREAM_TIMEOUT', 5)),
+        cache_ttl=float(os.environ.get('STATIONS_UPSTREAM_CACHE_TTL', 10))
+    )
+
+# Upstream station API; when set, /stations proxies it instead of the local data
+_station_upstream = _open_station_upstream()
+
+# Database backend; when set it replaces the in-memory STATIONS_DATA store
+_station_repository = _open_station_database()
+
+# Hot-reloaded station file; used when no database is configured
+_station_file = None if _station_repository is not None else _open_station_file()
+
+def _get_station_store() -> StationRepository:
+    """
+    Return the station repository serving requests.
+    
+    The in-memory store is rebuilt if STATIONS_DATA has been replaced.
+    
+    Returns:
+        StationRepository: The database backend, or a validated snapshot of
+        the station file or STATIONS_DATA
+    """
+    global _station_store
+    if _station_repository is not None:
+        return _station_repository
+    if _station_file is not None:
+        # Swapped by the watcher thread; read once so a request keeps one snapshot
+        return _station_file.store
+    store = _station_store
+    if store.source is not STATIONS_DATA:
+        store = _build_station_store()
+        _station_store = store
+    return store
+
+def reload_station_data() -> StationRepository:
+    """
+    Re-ingest STATIONS_DATA after it has been modified in place.
+    
+    With a station file, re-read it now. With a database backend, start a
+    new data version instead so cached responses reflect writes made to
+    the database without bumping its generation row.
+    
+    Returns:
+        StationRepository: The repository now serving requests
+    """
+    global _station_store
+    if _station_repository is not None:
+        _station_repository.refresh()
+        return _station_repository
+    if _station_file is not None:
+        return _station_file.reload()
+    _station_store = _build_station_store()
+    return _station_store
+
+# Import-to-ready time once warm_up() has finished, otherwise None
+_ready_seconds: Optional[float] = None
+_warmup_lock = threading.Lock()
+
+def warm_up() -> float:
+    """
+    Prepare this process for traffic, then report it ready on /ready.
+    
+    Loads the station data and serves each of WARMUP_PATHS in-process,
+    uncompressed and with each enabled content encoding, so the lazily built
+    indexes exist and the hot /stations bodies and their compressed variants
+    are cached before the first real request. Run it before forking workers
+    to share the warmed state. Later calls return at once.
+    
+    With STATIONS_UPSTREAM_URL set, /stations paths are skipped: nothing
+    local is cached for them, and an upstream call here would only fill a
+    page cache that forked workers start without.
+    
+    Returns:
+        Seconds from the start of the app import until ready
+    """
+    global _ready_seconds
+    with _warmup_lock:
+        if _ready_seconds is not None:
+            return _ready_seconds
+        started = time.perf_counter()
+        _get_station_store()
+        client = app.test_client()
+        paths = WARMUP_PATHS
+        if _station_upstream is not None:
+            paths = tuple(path for path in paths if urlsplit(path).path != '/stations')
+        for path in paths:
+            for encoding in (None,) + COMPRESSION_ENCODINGS:
+                headers = {'Accept-Encoding': encoding} if encoding else {}
+                response = client.get(path, headers=headers, environ_overrides={WARMUP_ENVIRON_KEY: True})
+                if response.status_code >= 400:
+                    logger.warning("Warm-up request %s returned %d", path, response.status_code)
+                    break
+        _ready_seconds = time.perf_counter() - _IMPORT_STARTED
+        logger.info("Ready %.3fs after import (warm-up %.3fs, %d paths)",
+                    _ready_seconds, time.perf_counter() - started, len(paths))
+        return _ready_seconds
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors."""
@@ -148,11 +933,14 @@ def not_found(error):
 @app.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors."""
-    logger.error(f"Internal server error: {str(error)}")
+    logger.error("Internal server error: %s", error)
     return jsonify({
         "error": "Internal server error",
         "message": "An unexpected error occurred"
     }), 500
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=80) 
\ No newline at end of file
+    # Development server only; production runs under gunicorn via src/server.py
+    warm_up()
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', host='0.0.0.0',
+            port=int(os.environ.get('PORT', 80))) 
\ No newline at end of file
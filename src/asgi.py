@@ -0,0 +1,326 @@
+"""
+ASGI serving mode for I/O-bound station backends.
+
+Under gthread workers every in-flight request holds a thread, so a worker
+waits on at most GUNICORN_THREADS backend calls at a time. In ASGI mode
+(``SERVER_MODE=asgi``, see src/server.py) each worker runs one event loop:
+
+* When STATIONS_UPSTREAM_URL is set, ``GET /stations`` is served on the
+  loop. The upstream call is awaited through AsyncStationUpstream, whose
+  pool keeps upstream connections alive, so one worker overlaps as many
+  calls as that pool allows. Parameters, errors, ETags and compression
+  are handled by the same helpers as the Flask route, so the response
+  matches what the route would send.
+* Every other request, including streamed ``/stations?stream=...``
+  requests, runs the Flask app on a bounded thread pool through a WSGI
+  bridge, so existing routes behave as they do under gthread.
+"""
+
+import asyncio
+import io
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from werkzeug.wrappers import Request
+
+from src.app import (app as flask_app, metrics, FILTER_PARAMS, _filter_param, _json_representation, _parse_fields,
+                     _serialize_stations, _upstream_params, _validate_upstream_stations, _varies_by_encoding)
+from src.compression import compress
+from src.logging_config import begin_request_sampling, end_request_sampling
+from src.pagination import parse_limit
+from src.response_cache import CachedResponse
+from src.upstream import AsyncStationUpstream, UpstreamError, UpstreamTimeout
+
+logger = logging.getLogger(__name__)
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+Headers = List[Tuple[bytes, bytes]]
+
+
+def build_environ(scope: Scope, body: bytes) -> Dict[str, Any]:
+    """
+    Translate an ASGI HTTP scope and request body into a WSGI environ.
+
+    Repeated headers are joined with commas, as WSGI servers do. The body
+    has already been read in full, so its length is always known.
+    """
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client')
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0] if client else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'wsgi.input_terminated': True,
+    }
+    for raw_name, raw_value in scope.get('headers', ()):
+        key = raw_name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        value = raw_value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    if body:
+        environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] != 'http.request':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def _send_all(send: Send, messages: Tuple[Dict[str, Any], ...]) -> None:
+    for message in messages:
+        await send(message)
+
+
+def _error_body(error: str, message: str) -> bytes:
+    return flask_app.json.dumps_bytes({"error": error, "message": message})
+
+
+class StationsAsgiApp:
+    """
+    ASGI application serving upstream-backed /stations natively and
+    everything else through the Flask app.
+    """
+
+    def __init__(self, wsgi_app: Callable, upstream: Optional[AsyncStationUpstream] = None,
+                 threads: int = 8):
+        """
+        Args:
+            wsgi_app: WSGI application for requests not served on the loop
+            upstream: Client for upstream-backed /stations, or None to send /stations to ``wsgi_app``
+            threads: Threads running ``wsgi_app``
+        """
+        self.wsgi_app = wsgi_app
+        self.upstream = upstream
+        self.threads = threads
+        # Created on first use, in the worker process that serves requests
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            request = self._native_request(scope)
+            if request is not None:
+                await self._upstream_stations(request, send)
+            else:
+                await self._call_wsgi(scope, receive, send)
+        elif scope['type'] == 'websocket':
+            await send({'type': 'websocket.close'})
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def aclose(self) -> None:
+        """Close upstream connections and stop the WSGI threads."""
+        if self.upstream is not None:
+            await self.upstream.aclose()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _native_request(self, scope: Scope) -> Optional[Request]:
+        """
+        Return the request if it is served on the loop, or None to send it to the WSGI app.
+
+        Streamed responses are left to the Flask route, which also rejects
+        unknown ``stream`` values.
+        """
+        if self.upstream is None or scope['path'] != '/stations' or scope['method'] != 'GET':
+            return None
+        request = Request(build_environ(scope, b''))
+        return None if 'stream' in request.args else request
+
+    async def _upstream_stations(self, request: Request, send: Send) -> None:
+        """Serve GET /stations from the upstream without holding a thread."""
+        start = time.perf_counter()
+        status, body = 500, b''
+        token = begin_request_sampling('/stations')
+        try:
+            status, headers, body = await self._upstream_response(request)
+            # A 304 has no body, and its length would describe the 200 it stands for
+            if status != 304:
+                headers.append((b'content-length', str(len(body)).encode('ascii')))
+            await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': body})
+        finally:
+            end_request_sampling(token)
+            metrics.observe('http_request_duration_seconds', time.perf_counter() - start,
+                            (('route', '/stations'), ('method', 'GET'), ('status', str(status))))
+            metrics.observe('http_response_size_bytes', len(body), (('route', '/stations'),))
+
+    async def _upstream_response(self, request: Request) -> Tuple[int, Headers, bytes]:
+        """Build the status, headers and body the Flask /stations route would send for an upstream page."""
+        headers: Headers = [(b'content-type', b'application/json')]
+        try:
+            args = request.args
+            try:
+                filters = {name: _filter_param(name, args) for name in FILTER_PARAMS}
+                fields = _parse_fields(args.get('fields'))
+                limit = parse_limit(args.get('limit'))
+            except ValueError as e:
+                return 400, headers, _error_body("Bad request", str(e))
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Fetching stations with filters - city: '%s', code: '%s', name: '%s', id: '%s'",
+                            *(','.join(filters[name]) for name in FILTER_PARAMS))
+            params = _upstream_params(filters, args.get('cursor', '').strip(), limit)
+            records, next_cursor, source = await self.upstream.get_stations(params)
+            metrics.inc('stations_upstream_requests_total', (('result', source),))
+
+            # Upstream records are untrusted: validate and normalize each one
+            stations = _validate_upstream_stations(records)
+            cached = CachedResponse(flask_app.json.dumps_bytes(_serialize_stations(stations, fields)),
+                                    len(stations), {'X-Next-Cursor': next_cursor} if next_cursor else None)
+            logger.info("Successfully retrieved %d stations from upstream", len(stations))
+            return self._cached_response(request, cached)
+
+        except UpstreamTimeout as e:
+            metrics.inc('stations_upstream_requests_total', (('result', 'error'),))
+            logger.error("Station upstream timed out: %s", e)
+            return 504, headers, _error_body("Gateway timeout", "Station upstream timed out")
+        except UpstreamError as e:
+            metrics.inc('stations_upstream_requests_total', (('result', 'error'),))
+            logger.error("Station upstream failed: %s", e)
+            return 502, headers, _error_body("Bad gateway", "Station upstream unavailable")
+        except Exception as e:
+            logger.error("Error retrieving stations: %s", e)
+            return 500, headers, _error_body("Internal server error", "Failed to retrieve stations")
+
+    @staticmethod
+    def _cached_response(request: Request, cached: CachedResponse) -> Tuple[int, Headers, bytes]:
+        """Encode a serialized body for the request, answering 304 when the client has its ETag."""
+        encoding, etag = _json_representation(cached, request.headers.get('Accept-Encoding'))
+        headers: Headers = []
+        if request.if_none_match.contains_weak(etag):
+            status, body = 304, b''
+        else:
+            status, body = 200, cached.body
+            headers.append((b'content-type', b'application/json'))
+            if encoding is not None:
+                body = compress(body, encoding)
+                headers.append((b'content-encoding', encoding.encode('ascii')))
+        if _varies_by_encoding(len(cached.body)):
+            headers.append((b'vary', b'Accept-Encoding'))
+        headers.append((b'etag', f'"{etag}"'.encode('ascii')))
+        headers += [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in cached.headers.items()]
+        return status, headers, body
+
+    async def _call_wsgi(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Run the WSGI app for one request on the thread pool."""
+        body = await _read_body(receive)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix='asgi-wsgi')
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._run_wsgi, loop, scope, body, send)
+
+    def _run_wsgi(self, loop: asyncio.AbstractEventLoop, scope: Scope, body: bytes, send: Send) -> None:
+        """
+        Call the WSGI app and relay its response through the event loop.
+
+        The whole request, including iterating a streamed body, stays on
+        one pool thread, which context-bound generators such as Flask's
+        stream_with_context rely on. Each send waits for the loop to accept
+        the message, so a slow client applies backpressure. One chunk is
+        held back so the last can be flagged as final without an extra
+        empty message.
+        """
+        def emit(*messages: Dict[str, Any]) -> None:
+            asyncio.run_coroutine_threadsafe(_send_all(send, messages), loop).result()
+
+        start: Dict[str, Any] = {}
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            if exc_info and start.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            start.update(type='http.response.start', status=int(status.split(' ', 1)[0]),
+                         headers=[(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                  for name, value in headers])
+
+        result = None
+        try:
+            result = self.wsgi_app(build_environ(scope, body), start_response)
+            pending = None
+            for chunk in result:
+                if not chunk:
+                    continue
+                if pending is not None:
+                    message = {'type': 'http.response.body', 'body': pending, 'more_body': True}
+                    if start.get('sent'):
+                        emit(message)
+                    else:
+                        emit(dict(start), message)
+                        start['sent'] = True
+                pending = chunk
+            final = {'type': 'http.response.body', 'body': pending or b''}
+            if start.get('sent'):
+                emit(final)
+            else:
+                emit(dict(start), final)
+        except Exception:
+            if start.get('sent'):
+                raise
+            logger.exception("Unhandled error in WSGI application")
+            emit({'type': 'http.response.start', 'status': 500,
+                  'headers': [(b'content-type', b'application/json')]},
+                 {'type': 'http.response.body', 'body': _error_body("Internal server error", "Request failed")})
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
+
+
+def create_asgi_app() -> StationsAsgiApp:
+    """
+    Build the ASGI application from the environment.
+
+    Settings:
+        STATIONS_UPSTREAM_URL        Upstream station API; unset serves /stations from local data
+        STATIONS_UPSTREAM_POOL_SIZE  Most upstream connections per worker (default 100)
+        STATIONS_UPSTREAM_TIMEOUT    Seconds allowed per upstream call (default 5)
+        STATIONS_UPSTREAM_CACHE_TTL  Seconds an upstream page is reused (default 10; 0 disables)
+        ASGI_WSGI_THREADS            Threads per worker running the Flask app (default 8)
+    """
+    url = os.environ.get('STATIONS_UPSTREAM_URL', '').strip()
+    upstream = None
+    if url:
+        upstream = AsyncStationUpstream(
+            url,
+            max_connections=int(os.environ.get('STATIONS_UPSTREAM_POOL_SIZE', 100)),
+            timeout=float(os.environ.get('STATIONS_UPSTREAM_TIMEOUT', 5)),
+            cache_ttl=float(os.environ.get('STATIONS_UPSTREAM_CACHE_TTL', 10))
+        )
+        logger.info("Serving /stations from upstream %s", url)
+    return StationsAsgiApp(flask_app, upstream, threads=int(os.environ.get('ASGI_WSGI_THREADS', 8)))
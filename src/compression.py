@@ -0,0 +1,97 @@
+"""
+HTTP response compression.
+
+Station JSON repeats the same keys in every object, so it compresses
+well. ``negotiate_encoding`` picks the encoding to send from the client's
+Accept-Encoding header: brotli when the brotli package is installed, then
+gzip. ``compress`` encodes a body; ResponseCache keeps the result next to
+the serialized body, so each cached variant is compressed once per data
+version rather than once per request.
+"""
+
+import gzip
+import logging
+import os
+from typing import Optional, Sequence, Tuple
+
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - exercised when brotli is absent
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ENCODINGS_ENV_VAR = 'RESPONSE_COMPRESSION'
+
+# Moderate levels: most of the size reduction for a fraction of the CPU of the maximums
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Supported encodings in order of preference."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def configured_encodings(setting: Optional[str] = None) -> Tuple[str, ...]:
+    """
+    Resolve the enabled encodings.
+
+    Args:
+        setting: 'auto' for every available encoding, 'off' for none, or a
+            comma-separated list such as 'gzip'; defaults to the
+            RESPONSE_COMPRESSION environment variable, then 'auto'
+
+    Returns:
+        Enabled encodings in order of preference. Unknown or unavailable
+        encodings are skipped with a warning.
+    """
+    if setting is None:
+        setting = os.environ.get(ENCODINGS_ENV_VAR, 'auto')
+    setting = setting.strip().lower() or 'auto'
+    if setting == 'auto':
+        return available_encodings()
+    if setting in ('off', 'none'):
+        return ()
+    encodings = []
+    for name in (part.strip() for part in setting.split(',')):
+        if name in available_encodings():
+            encodings.append(name)
+        elif name:
+            logger.warning("Response compression %r is not available; skipping it", name)
+    return tuple(encodings)
+
+
+def negotiate_encoding(accept_encoding: Optional[str], encodings: Sequence[str]) -> Optional[str]:
+    """
+    Pick the encoding to send.
+
+    Args:
+        accept_encoding: The request's Accept-Encoding header, or None
+        encodings: Enabled encodings in order of preference
+
+    Returns:
+        The client's highest-weighted enabled encoding, the earliest in
+        ``encodings`` on a tie, or None to send the body uncompressed
+    """
+    if not accept_encoding or not encodings:
+        return None
+    return parse_accept_header(accept_encoding).best_match(encodings)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    Compress a body.
+
+    Output is deterministic, so equal bodies produce equal variants.
+
+    Raises:
+        ValueError: If the encoding is not available
+    """
+    if encoding == 'gzip':
+        return gzip.compress(body, GZIP_LEVEL, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    raise ValueError(f"Unsupported content encoding: {encoding!r}")
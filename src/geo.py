@@ -0,0 +1,198 @@
+"""
+Nearest-station lookups over station coordinates.
+
+``GeoGridIndex`` buckets stations into a latitude/longitude grid when the
+data is loaded. A query only reads the cells overlapping the bounding box
+of its search radius, then ranks those candidates by great-circle
+distance. With no radius, the box starts at one cell and doubles until it
+holds ``k`` stations within its radius, so a query touches a small
+neighbourhood regardless of the catalogue size.
+
+Candidate ranking is vectorized with numpy when it is installed and falls
+back to a plain Python loop otherwise.
+"""
+
+import math
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - exercised only without numpy
+    numpy = None
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Half the Earth's circumference: no two points are farther apart
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Grid cell size; about 28 km of latitude
+DEFAULT_CELL_DEGREES = 0.25
+
+# Largest absolute value of each coordinate, by field name
+COORDINATE_BOUNDS = {'lat': 90.0, 'lon': 180.0}
+
+
+def parse_coordinate(value: Any, name: str) -> Optional[float]:
+    """
+    Convert a latitude or longitude to a float.
+
+    Numbers and numeric strings (as read from CSV) are accepted; None and
+    blank strings mean "not given".
+
+    Args:
+        value: Raw field value
+        name: 'lat' or 'lon'; picks the bound and names the field in errors
+
+    Returns:
+        The coordinate, or None if not given
+
+    Raises:
+        ValueError: If the value is not a finite number within the field's bound
+    """
+    bound = COORDINATE_BOUNDS[name]
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"Invalid {name}: {value!r}")
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value!r}") from None
+    if not math.isfinite(number) or abs(number) > bound:
+        raise ValueError(f"{name} out of range (-{bound:g} to {bound:g}): {value!r}")
+    return number
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoGridIndex:
+    """
+    Grid of station positions keyed by cell.
+
+    Built from (row, latitude, longitude) triples; queries return
+    (row, distance in km) pairs, nearest first. Longitude cells wrap at the
+    antimeridian and a search box that reaches a pole covers every
+    longitude.
+    """
+
+    def __init__(self, points: Sequence[Tuple[int, float, float]], cell_degrees: float = DEFAULT_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._columns = math.ceil(360 / cell_degrees)
+        self._rows = array('l')
+        self._lats = array('d')
+        self._lons = array('d')
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for row, lat, lon in points:
+            cells.setdefault(self._cell(lat, lon), []).append(len(self._rows))
+            self._rows.append(row)
+            self._lats.append(lat)
+            self._lons.append(lon)
+        # Cell -> indexes into the coordinate arrays
+        self._cells = {cell: array('l', members) for cell, members in cells.items()}
+        if numpy is not None:
+            self._lat_radians = numpy.radians(numpy.frombuffer(self._lats, dtype=numpy.float64))
+            self._lon_radians = numpy.radians(numpy.frombuffer(self._lons, dtype=numpy.float64))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor((lat + 90) / self.cell_degrees),
+                math.floor((lon + 180) / self.cell_degrees) % self._columns)
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> array:
+        """Return indexes of the points in cells overlapping the radius's bounding box."""
+        span_lat = radius_km / KM_PER_DEGREE
+        low_row = math.floor((max(-90.0, lat - span_lat) + 90) / self.cell_degrees)
+        high_row = math.floor((min(90.0, lat + span_lat) + 90) / self.cell_degrees)
+
+        # Longitude degrees shrink towards the poles; use the box's widest latitude
+        widest = min(90.0, abs(lat) + span_lat)
+        cos_widest = math.cos(math.radians(widest))
+        span_lon = 180.0 if cos_widest < 1e-9 else radius_km / (KM_PER_DEGREE * cos_widest)
+        if span_lon >= 180:
+            columns = range(self._columns)
+        else:
+            first = math.floor((lon - span_lon + 180) / self.cell_degrees)
+            last = math.floor((lon + span_lon + 180) / self.cell_degrees)
+            columns = [column % self._columns for column in range(first, min(last, first + self._columns - 1) + 1)]
+
+        found = array('l')
+        cells = self._cells
+        for row in range(low_row, high_row + 1):
+            for column in columns:
+                members = cells.get((row, column))
+                if members is not None:
+                    found.extend(members)
+        return found
+
+    def _rank(self, lat: float, lon: float, candidates: Sequence[int], radius_km: float,
+              k: Optional[int]) -> List[Tuple[int, float]]:
+        """Return candidates within the radius as (row, km), nearest first, at most k."""
+        if not candidates:
+            return []
+        if numpy is not None:
+            picks = numpy.frombuffer(candidates, dtype=numpy.dtype('l'))
+            phi = self._lat_radians[picks]
+            phi0 = math.radians(lat)
+            a = (numpy.sin((phi - phi0) / 2) ** 2
+                 + math.cos(phi0) * numpy.cos(phi) * numpy.sin((self._lon_radians[picks] - math.radians(lon)) / 2) ** 2)
+            distances = 2 * EARTH_RADIUS_KM * numpy.arcsin(numpy.minimum(1.0, numpy.sqrt(a)))
+            inside = numpy.flatnonzero(distances <= radius_km)
+            if k is not None and len(inside) > k:
+                inside = inside[numpy.argpartition(distances[inside], k - 1)[:k]]
+            ranked = sorted(zip(distances[inside].tolist(), picks[inside].tolist()))
+        else:
+            lats, lons = self._lats, self._lons
+            ranked = sorted(
+                (distance, i) for i in candidates
+                for distance in (haversine_km(lat, lon, lats[i], lons[i]),) if distance <= radius_km
+            )
+            if k is not None:
+                ranked = ranked[:k]
+        rows = self._rows
+        return [(rows[i], distance) for distance, i in ranked]
+
+    def nearby(self, lat: float, lon: float, radius_km: Optional[float] = None,
+               k: Optional[int] = 10) -> List[Tuple[int, float]]:
+        """
+        Return the stations nearest a point.
+
+        Args:
+            lat: Latitude of the point
+            lon: Longitude of the point
+            radius_km: Only return stations within this distance; None for any distance
+            k: Maximum stations to return; None for all within the radius
+
+        Returns:
+            List of (row, distance in km), nearest first
+        """
+        if radius_km is not None:
+            radius_km = min(radius_km, MAX_DISTANCE_KM)
+            return self._rank(lat, lon, self._candidates(lat, lon, radius_km), radius_km, k)
+        if k is None:
+            return self._rank(lat, lon, array('l', range(len(self._rows))), MAX_DISTANCE_KM, None)
+
+        # Grow the search box until it holds k candidates, or covers the globe
+        search_km = self.cell_degrees * KM_PER_DEGREE
+        candidates = self._candidates(lat, lon, search_km)
+        while len(candidates) < k and search_km < MAX_DISTANCE_KM:
+            search_km = min(search_km * 2, MAX_DISTANCE_KM)
+            candidates = self._candidates(lat, lon, search_km)
+        found = self._rank(lat, lon, candidates, MAX_DISTANCE_KM, k)
+        # The k-th candidate's distance bounds the answer. Anything nearer lies
+        # inside the box when the bound is within its radius; otherwise search
+        # the box of that radius once more.
+        if len(found) < k or found[-1][1] <= search_km:
+            return found
+        bound = found[-1][1]
+        return self._rank(lat, lon, self._candidates(lat, lon, bound), bound, k)
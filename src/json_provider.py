@@ -0,0 +1,110 @@
+"""
+Pluggable JSON providers for the Flask app.
+
+``configure_json_provider`` installs the fastest available encoder on an
+app: orjson when it is installed, otherwise Flask's stdlib-based provider.
+Both providers produce compact, key-sorted output and expose
+``dumps_bytes`` for callers that cache serialized bodies.
+"""
+
+import logging
+import os
+from typing import Any, Optional
+
+from flask import Flask, Response
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+ENCODER_ENV_VAR = 'JSON_ENCODER'
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's default provider, plus compact byte serialization."""
+
+    name = 'stdlib'
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """Serialize compactly to UTF-8 bytes, the same body ``response`` sends."""
+        return self.dumps(obj, separators=(",", ":")).encode('utf-8') + b"\n"
+
+
+class OrjsonJSONProvider(JSONProvider):
+    """
+    JSON provider backed by orjson.
+
+    Keys are sorted to match the stdlib provider. Dates and types orjson
+    does not handle natively go through Flask's default serializer, so
+    both providers encode them the same way.
+    """
+
+    name = 'orjson'
+    mimetype = 'application/json'
+    compact: Optional[bool] = None
+    default = staticmethod(DefaultJSONProvider.default)
+
+    def _options(self, indent: bool = False) -> int:
+        options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize to a string. Keyword arguments other than ``indent`` are ignored."""
+        return orjson.dumps(obj, default=self.default, option=self._options(bool(kwargs.get('indent')))).decode('utf-8')
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """Serialize compactly to UTF-8 bytes, the same body ``response`` sends."""
+        return orjson.dumps(obj, default=self.default, option=self._options()) + b"\n"
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        """Deserialize from a string or bytes."""
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        """Serialize the arguments and wrap them in a JSON response."""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent)) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+PROVIDERS = {
+    'orjson': OrjsonJSONProvider,
+    'stdlib': StdlibJSONProvider,
+}
+
+
+def configure_json_provider(app: Flask, encoder: Optional[str] = None) -> JSONProvider:
+    """
+    Install a JSON provider on the app.
+
+    Args:
+        app: Flask application to configure
+        encoder: 'auto', 'orjson' or 'stdlib'. Defaults to the JSON_ENCODER
+            environment variable, or 'auto'. 'auto' picks orjson when it is
+            installed; asking for orjson when it is missing falls back to
+            stdlib with a warning.
+
+    Returns:
+        JSONProvider: The installed provider
+    """
+    encoder = (encoder or os.environ.get(ENCODER_ENV_VAR, 'auto')).strip().lower()
+    if encoder not in PROVIDERS and encoder != 'auto':
+        logger.warning("Unknown JSON encoder '%s', using auto", encoder)
+        encoder = 'auto'
+
+    if encoder in ('auto', 'orjson') and orjson is None:
+        if encoder == 'orjson':
+            logger.warning("orjson is not installed, falling back to stdlib JSON encoder")
+        encoder = 'stdlib'
+    elif encoder == 'auto':
+        encoder = 'orjson'
+
+    app.json = PROVIDERS[encoder](app)
+    return app.json
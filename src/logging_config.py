@@ -0,0 +1,274 @@
+"""
+Structured, non-blocking logging for the Flask app.
+
+``configure_logging`` routes every record through a queue to a background
+listener thread, which formats records (as JSON by default) and writes
+them to stderr. Request threads only build the LogRecord and enqueue it:
+%-style arguments are formatted on the listener thread, so callers should
+pass arguments instead of pre-formatting messages.
+
+INFO and DEBUG records logged during a request can be sampled per route,
+with the decision made once per request (see ``init_request_sampling``) so
+a request's lines are kept or dropped together. Warnings and errors are
+never sampled. Loggers from ``sampled_logger`` skip calls in a sampled-out
+request before any record is built; records from other loggers are dropped
+by the handler's filter.
+
+Settings are read from the environment:
+    LOG_LEVEL         Root log level (default INFO)
+    LOG_FORMAT        'json' or 'text' (default json)
+    LOG_SAMPLE_RATES  Comma-separated route=rate pairs, e.g.
+                      '/stations=0.01,/hello=0'; '*' sets the default rate
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar, Token
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+from flask import Flask, g, request
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener: Optional[QueueListener] = None
+_sampler: Optional['RouteSampler'] = None
+
+# (route, sampled) for the request being handled in this context, if any
+_request_sampling: ContextVar[Optional[Tuple[Optional[str], bool]]] = ContextVar('request_log_sampling', default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread.
+
+    The stock QueueHandler formats each record on the calling thread before
+    enqueueing it. Here the record is enqueued as-is, so log arguments must
+    not be mutated after the logging call.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class RouteSampler(logging.Filter):
+    """
+    Keep a fraction of INFO and DEBUG records per Flask route.
+
+    The decision for each request is made once, by begin_request_sampling,
+    and read back here from a context variable. Records logged outside a
+    request, and records at WARNING or above, always pass. Records logged
+    during a request are tagged with its route.
+    """
+
+    def __init__(self, rates: Dict[str, float], default_rate: float = 1.0):
+        super().__init__()
+        self.rates = rates
+        self.default_rate = default_rate
+
+    def decide(self, route: Optional[str]) -> bool:
+        """Decide whether a request to a route keeps its INFO and DEBUG records."""
+        rate = self.rates.get(route, self.default_rate)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        state = _request_sampling.get()
+        if state is None:
+            return True
+        route, sampled = state
+        record.route = route
+        return sampled or record.levelno >= logging.WARNING
+
+
+class SampledLogger(logging.LoggerAdapter):
+    """
+    Logger that drops INFO and DEBUG calls in sampled-out requests up front.
+
+    ``isEnabledFor`` reads the request's sampling decision, so a dropped
+    call returns before a LogRecord is built, and callers can guard costly
+    arguments with it as with any logger.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        super().__init__(logger, None)
+
+    def isEnabledFor(self, level: int) -> bool:
+        if level < logging.WARNING:
+            state = _request_sampling.get()
+            if state is not None and not state[1]:
+                return False
+        return self.logger.isEnabledFor(level)
+
+    def process(self, msg, kwargs):
+        # Pass ``extra`` through instead of replacing it with the adapter's
+        return msg, kwargs
+
+    # The hot levels call the logger's own method rather than going through
+    # LoggerAdapter.log; stacklevel skips this frame so records still name
+    # the caller's file and line
+
+    def debug(self, msg, *args, stacklevel: int = 1, **kwargs) -> None:
+        if self.isEnabledFor(logging.DEBUG):
+            self.logger.debug(msg, *args, stacklevel=stacklevel + 1, **kwargs)
+
+    def info(self, msg, *args, stacklevel: int = 1, **kwargs) -> None:
+        if self.isEnabledFor(logging.INFO):
+            self.logger.info(msg, *args, stacklevel=stacklevel + 1, **kwargs)
+
+
+def sampled_logger(name: str) -> SampledLogger:
+    """Return the named logger, wrapped to skip calls request sampling would drop."""
+    return SampledLogger(logging.getLogger(name))
+
+
+def begin_request_sampling(route: Optional[str]) -> Token:
+    """
+    Make the sampling decision for a request to a route.
+
+    Args:
+        route: Matched route rule, or None if no route matched
+
+    Returns:
+        Token to pass to end_request_sampling
+    """
+    sampled = _sampler.decide(route) if _sampler is not None else True
+    return _request_sampling.set((route, sampled))
+
+
+def end_request_sampling(token: Token) -> None:
+    """Clear the sampling decision made by begin_request_sampling."""
+    _request_sampling.reset(token)
+
+
+def init_request_sampling(app: Flask) -> None:
+    """Register request hooks that make one sampling decision per request."""
+
+    @app.before_request
+    def _begin_log_sampling():
+        route = request.url_rule.rule if request.url_rule is not None else None
+        g._log_sampling_token = begin_request_sampling(route)
+
+    @app.teardown_request
+    def _end_log_sampling(error=None):
+        token = g.pop('_log_sampling_token', None)
+        if token is not None:
+            end_request_sampling(token)
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """
+    Parse LOG_SAMPLE_RATES.
+
+    Args:
+        value: Comma-separated route=rate pairs
+
+    Returns:
+        Dict of route to sampling rate; '*' holds the default rate if given
+    """
+    rates = {}
+    for pair in value.split(','):
+        if not pair.strip():
+            continue
+        route, _, rate = pair.rpartition('=')
+        rates[route.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+def configure_logging(level: Optional[str] = None, log_format: Optional[str] = None,
+                      sample_rates: Optional[Dict[str, float]] = None, stream=None) -> QueueListener:
+    """
+    Install the queue-based root handler and return the listener.
+
+    Calling this again replaces the previous configuration.
+
+    Args:
+        level: Root log level; defaults to LOG_LEVEL or INFO
+        log_format: 'json' or 'text'; defaults to LOG_FORMAT or json
+        sample_rates: Route sampling rates; defaults to LOG_SAMPLE_RATES
+        stream: Output stream; defaults to stderr
+
+    Returns:
+        QueueListener: The running listener
+    """
+    global _listener, _sampler
+
+    level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+    log_format = (log_format or os.environ.get('LOG_FORMAT', 'json')).lower()
+    if sample_rates is None:
+        sample_rates = parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES', ''))
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if log_format == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    rates = dict(sample_rates)
+    _sampler = RouteSampler(rates, rates.pop('*', 1.0))
+    handler = DeferredQueueHandler(queue.SimpleQueue())
+    handler.addFilter(_sampler)
+
+    root = logging.getLogger()
+    _stop_listener()
+    for existing in [h for h in root.handlers if isinstance(h, DeferredQueueHandler)]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def _stop_listener():
+    """Flush queued records and stop the listener thread."""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def _restart_listener_after_fork():
+    """
+    Give a forked child its own queue and listener thread.
+
+    Threads do not survive fork, so a worker forked from a preloaded master
+    would otherwise enqueue records that nothing ever drains.
+    """
+    if _listener is None:
+        return
+    fresh = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, DeferredQueueHandler) and handler.queue is _listener.queue:
+            handler.queue = fresh
+    _listener.queue = fresh
+    _listener._thread = None
+    _listener.start()
+
+
+atexit.register(_stop_listener)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
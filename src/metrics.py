@@ -0,0 +1,181 @@
+"""
+Low-overhead request metrics with Prometheus text exposition.
+
+Each thread records into its own shard, so the request path never takes a
+lock: a shard is registered once, the first time a thread records anything,
+and is only written by that thread. A scrape walks every shard and merges
+them. Metrics are per process; under gunicorn each worker reports its own.
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Request latency buckets in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Response payload size buckets in bytes
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+GaugeValue = Union[float, Sequence[Tuple[Labels, float]]]
+
+
+class _Shard:
+    """Metric values recorded by a single thread."""
+
+    __slots__ = ('counters', 'histograms')
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        # Histogram state: one count per bucket, then +Inf count, then sum
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}
+
+
+class MetricsRegistry:
+    """
+    Registry of counters, histograms and gauges.
+
+    Counters and histograms are declared once and then updated with
+    ``inc`` and ``observe``. Gauges are read from a callback at scrape time.
+    Labels are passed as a tuple of (name, value) pairs in a fixed order.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._lock = threading.Lock()
+        self._help: Dict[str, str] = {}
+        self._types: Dict[str, str] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._gauges: Dict[str, Callable[[], GaugeValue]] = {}
+
+    def counter(self, name: str, help_text: str) -> None:
+        """Declare a counter."""
+        self._help[name] = help_text
+        self._types[name] = 'counter'
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float]) -> None:
+        """Declare a histogram with ascending upper bucket bounds."""
+        self._help[name] = help_text
+        self._types[name] = 'histogram'
+        self._buckets[name] = tuple(buckets)
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], GaugeValue]) -> None:
+        """
+        Declare a gauge read at scrape time.
+
+        ``read`` returns either a single value or a sequence of
+        (labels, value) pairs.
+        """
+        self._help[name] = help_text
+        self._types[name] = 'gauge'
+        self._gauges[name] = read
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name: str, labels: Labels = (), amount: float = 1) -> None:
+        """Add to a counter."""
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        """Record one observation in a histogram."""
+        histograms = self._shard().histograms
+        key = (name, labels)
+        state = histograms.get(key)
+        buckets = self._buckets[name]
+        if state is None:
+            state = histograms[key] = [0] * (len(buckets) + 2)
+        state[bisect_left(buckets, value)] += 1
+        state[-1] += value
+
+    def reset(self) -> None:
+        """Drop all recorded counter and histogram values."""
+        with self._lock:
+            for shard in self._shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+
+    def _merged(self) -> Tuple[Dict[Tuple[str, Labels], float], Dict[Tuple[str, Labels], List[float]]]:
+        """Merge every thread's shard into one set of values."""
+        with self._lock:
+            shards = list(self._shards)
+        counters: Dict[Tuple[str, Labels], float] = {}
+        histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        for shard in shards:
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, state in list(shard.histograms.items()):
+                merged = histograms.get(key)
+                if merged is None:
+                    histograms[key] = list(state)
+                else:
+                    for i, value in enumerate(state):
+                        merged[i] += value
+        return counters, histograms
+
+    def value(self, name: str, labels: Labels = ()) -> float:
+        """Return the merged value of a counter, or the count of a histogram."""
+        counters, histograms = self._merged()
+        if (name, labels) in histograms:
+            return sum(histograms[(name, labels)][:-1])
+        return counters.get((name, labels), 0)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        counters, histograms = self._merged()
+        lines: List[str] = []
+        for name in sorted(self._types):
+            metric_type = self._types[name]
+            lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            if metric_type == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            elif metric_type == 'histogram':
+                for (metric, labels), state in sorted(histograms.items()):
+                    if metric == name:
+                        lines.extend(self._render_histogram(name, labels, state))
+            else:
+                value = self._gauges[name]()
+                samples = value if isinstance(value, (list, tuple)) else [((), value)]
+                for labels, sample in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(sample)}")
+        return "\n".join(lines) + "\n"
+
+    def _render_histogram(self, name: str, labels: Labels, state: List[float]) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self._buckets[name] + (float('inf'),), state[:-1]):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else _format_value(bound)
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {_format_value(cumulative)}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(state[-1])}")
+        lines.append(f"{name}_count{_format_labels(labels)} {_format_value(cumulative)}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(str(value))}"' for key, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
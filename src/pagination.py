@@ -0,0 +1,120 @@
+"""
+Cursor pagination over the station catalogue order.
+
+A cursor is an opaque, URL-safe token naming the last station a client
+received. It records both the station id and its row position: the id keeps
+the cursor stable when rows are inserted or removed elsewhere in the
+catalogue, and the position is the fallback if that station disappears.
+"""
+
+import base64
+import binascii
+import json
+from bisect import bisect_right
+from typing import TYPE_CHECKING, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from src.repository import StationRepository
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(station_id: str, position: int) -> str:
+    """
+    Build an opaque cursor pointing just after a station.
+
+    Args:
+        station_id: Id of the last station on the page
+        position: Row position of that station
+
+    Returns:
+        str: URL-safe cursor token
+    """
+    payload = json.dumps({"id": station_id, "pos": position}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    Decode a cursor token.
+
+    Args:
+        cursor: Token produced by encode_cursor
+
+    Returns:
+        Tuple of (station id, row position)
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        station_id, position = payload['id'], payload['pos']
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if not isinstance(station_id, str) or not isinstance(position, int) or position < 0:
+        raise ValueError("Invalid cursor")
+    return station_id, position
+
+
+def resolve_cursor(store: 'StationRepository', cursor: str) -> int:
+    """
+    Return the row position a cursor resumes after.
+
+    Args:
+        store: Station snapshot being paged
+        cursor: Token produced by encode_cursor
+
+    Returns:
+        int: Position of the last row already returned
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    station_id, position = decode_cursor(cursor)
+    current = store.position_of(station_id)
+    return position if current is None else current
+
+
+def parse_limit(value: Optional[str]) -> Optional[int]:
+    """
+    Parse the ``limit`` query parameter.
+
+    Args:
+        value: Raw parameter value, or None when absent
+
+    Returns:
+        Page size clamped to MAX_PAGE_SIZE, or None for no limit
+
+    Raises:
+        ValueError: If the value is not a positive integer
+    """
+    if value is None or not value.strip():
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be a positive integer") from None
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def page_rows(rows: Sequence[int], after: Optional[int], limit: Optional[int]) -> Tuple[Sequence[int], bool]:
+    """
+    Slice one page out of an ascending sequence of row positions.
+
+    Args:
+        rows: Ascending row positions of the matching stations
+        after: Position of the last row already returned, or None to start
+        limit: Maximum rows in the page, or None for all remaining rows
+
+    Returns:
+        Tuple of (row positions in the page, whether more rows follow)
+    """
+    start = 0 if after is None else bisect_right(rows, after)
+    end = len(rows) if limit is None else min(start + limit, len(rows))
+    return rows[start:end], end < len(rows)
@@ -0,0 +1,560 @@
+"""
+Station repositories: where /stations reads its data from.
+
+Two backends serve the same read interface (``StationRepository``):
+
+* ``StationStore`` (src/stations.py) holds a validated, indexed snapshot of
+  an in-memory list. It is the default.
+* ``SqlStationRepository`` reads from a DB-API database through a bounded
+  connection pool. Filters and pagination are pushed down to the database
+  as parameterized queries against indexed, case-folded key columns, so a
+  request only fetches the rows it returns.
+
+Both order stations by catalogue position, so cursors issued by one work
+with the other.
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Protocol, Sequence, Tuple
+
+from src.geo import GeoGridIndex
+from src.search import NameSearchIndex, normalize
+from src.stations import FilterValues, StationPage, StationRecord, filter_values, fold_key, next_version
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip when streaming
+STREAM_FETCH_SIZE = 500
+
+# Most values bound in one IN (...) list; SQLite allows 999 parameters by default
+LOOKUP_CHUNK_SIZE = 500
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS stations (
+        pos INTEGER PRIMARY KEY,
+        id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        city TEXT NOT NULL,
+        code TEXT NOT NULL,
+        city_key TEXT NOT NULL,
+        code_key TEXT NOT NULL,
+        extra TEXT,
+        lat REAL,
+        lon REAL
+    )""",
+    "CREATE INDEX IF NOT EXISTS stations_id ON stations (id, pos)",
+    "CREATE INDEX IF NOT EXISTS stations_city_key ON stations (city_key, pos)",
+    "CREATE INDEX IF NOT EXISTS stations_code_key ON stations (code_key, pos)",
+    # One row counting writes to the stations table, so every process
+    # reading the database can tell when its data changed
+    "CREATE TABLE IF NOT EXISTS stations_generation (generation INTEGER NOT NULL)",
+    "INSERT INTO stations_generation (generation) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM stations_generation)",
+)
+
+_COLUMNS = "pos, id, name, city, code, extra, lat, lon"
+
+
+class StationRepository(Protocol):
+    """Read interface the /stations endpoint uses, implemented by every backend."""
+
+    version: int
+
+    @property
+    def quarantine_count(self) -> int: ...
+
+    def __len__(self) -> int: ...
+
+    def position_of(self, station_id: str) -> Optional[int]: ...
+
+    def page(self, city: FilterValues = '', code: FilterValues = '', after: Optional[int] = None,
+             limit: Optional[int] = None, name: FilterValues = '', id: FilterValues = '') -> StationPage: ...
+
+    def stream(self, city: FilterValues = '', code: FilterValues = '', after: Optional[int] = None,
+               limit: Optional[int] = None, name: FilterValues = '',
+               id: FilterValues = '') -> Iterator[StationRecord]: ...
+
+    def lookup_ids(self, station_ids: Sequence[str]) -> List[Optional[StationRecord]]: ...
+
+    def lookup_codes(self, codes: Sequence[str]) -> List[List[StationRecord]]: ...
+
+    def search(self, query: str, limit: int = 10) -> List[StationRecord]: ...
+
+    def nearby(self, lat: float, lon: float, radius_km: Optional[float] = None,
+               k: int = 10) -> List[Tuple[StationRecord, float]]: ...
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no pooled connection becomes free in time."""
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of DB-API connections.
+
+    Connections are opened lazily, up to ``max_size``, and reused most
+    recently used first. A borrower that finds every connection in use waits
+    up to ``timeout`` seconds. Any transaction a borrower leaves open is
+    rolled back when the connection is returned, and a connection that
+    cannot be rolled back is discarded. A forked child (a gunicorn worker)
+    never reuses its parent's connections.
+    """
+
+    def __init__(self, connect: Callable[[], Any], max_size: int = 4, timeout: float = 5.0):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._idle: 'queue.LifoQueue[Any]' = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Borrow a connection for the duration of a ``with`` block.
+
+        Raises:
+            PoolTimeout: If every connection stays busy for ``timeout`` seconds
+        """
+        if self._pid != os.getpid():
+            self._reset()
+        slots = self._slots
+        if not slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No database connection free after {self.timeout}s")
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                self._release(conn)
+        finally:
+            slots.release()
+
+    def _release(self, conn: Any) -> None:
+        """Return a connection to the pool, or close it if it is unusable."""
+        try:
+            conn.rollback()
+        except Exception:
+            logger.warning("Discarding pooled database connection", exc_info=True)
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return
+        self._idle.put(conn)
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+
+
+class SqlStationRepository:
+    """
+    Station data in a DB-API database.
+
+    Every query is a fixed SQL string with bound parameters, so drivers
+    that cache prepared statements per connection (sqlite3 does) prepare
+    each one once per filter shape and pooled connection. Filters match the
+    ``city_key`` and ``code_key`` columns, which hold fold_key() of the city
+    and code and are indexed together with the catalogue position, and the
+    indexed ``id`` column. Name filters are resolved to positions through
+    the name search index. ``pos`` numbers valid
+    stations from 0 in catalogue order, like StationStore row positions.
+
+    Rows are validated when written with ``replace_stations``, which also
+    bumps the ``stations_generation`` row in the same transaction. Reading
+    ``version`` checks that row at most every ``check_interval`` seconds and
+    starts a new data version when another process changed it, so cached
+    responses and indexes are rebuilt. Writers that bypass
+    ``replace_stations`` must bump the row themselves, or the server must
+    call ``refresh``.
+
+    Name search and nearest-station queries have no portable SQL
+    equivalent, so they use a NameSearchIndex over the stored names and a
+    GeoGridIndex over the stored coordinates, rebuilt for each data version.
+    """
+
+    def __init__(self, pool: ConnectionPool, paramstyle: str = 'qmark', check_interval: float = 1.0):
+        if paramstyle not in ('qmark', 'format', 'pyformat'):
+            raise ValueError(f"Unsupported paramstyle: {paramstyle}")
+        self.pool = pool
+        self.paramstyle = paramstyle
+        self.check_interval = check_interval
+        self._version = next_version()
+        # Last stations_generation value seen, and when it was read
+        self._generation: Optional[int] = None
+        self._checked_at = float('-inf')
+        self._check_lock = threading.Lock()
+        self.quarantined: List[Any] = []
+        # Indexes built from the stored rows: name -> (version, index)
+        self._indexes: Dict[str, Tuple[int, Any]] = {}
+        self._index_lock = threading.Lock()
+
+    def _sql(self, statement: str) -> str:
+        """Convert a qmark statement to the driver's placeholder style."""
+        return statement if self.paramstyle == 'qmark' else statement.replace('?', '%s')
+
+    def _page_params(self, city: FilterValues, code: FilterValues, name: FilterValues, id: FilterValues,
+                     after: Optional[int], limit: Optional[int]) -> Optional[Tuple[str, List[Any]]]:
+        """
+        Build the query for a set of filters and bind its parameters.
+
+        Returns:
+            Tuple of (SQL, parameters), or None when a name filter matches no station
+        """
+        conditions = ["pos > ?"]
+        params: List[Any] = [-1 if after is None else after]
+
+        def match(column: str, values: List[Any]) -> None:
+            if len(values) == 1:
+                conditions.append(f"{column} = ?")
+            elif values:
+                conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+
+        match('city_key', sorted({fold_key(value) for value in filter_values(city)}))
+        match('code_key', sorted({fold_key(value) for value in filter_values(code)}))
+        ids = filter_values(id)
+        if ids:
+            # Like position_of, an id matches the first station holding it
+            conditions.append(f"pos IN (SELECT MIN(pos) FROM stations WHERE id IN "
+                              f"({', '.join('?' * len(ids))}) GROUP BY id)")
+            params.extend(ids)
+        names = filter_values(name)
+        if names:
+            positions = self._name_positions(names)
+            if not positions:
+                return None
+            match('pos', positions)
+
+        statement = f"SELECT {_COLUMNS} FROM stations WHERE {' AND '.join(conditions)} ORDER BY pos"
+        if limit is not None:
+            statement += " LIMIT ?"
+            params.append(limit)
+        return self._sql(statement), params
+
+    def _name_positions(self, names: Sequence[str]) -> List[int]:
+        """Return the ascending positions of stations whose normalized name is one of ``names``."""
+        index, positions = self._search_index()
+        return sorted({positions[row] for name in {normalize(name) for name in names} for row in index.exact(name)})
+
+    @staticmethod
+    def _record(row: Tuple[Any, ...]) -> StationRecord:
+        _, station_id, name, city, code, extra, lat, lon = row
+        return StationRecord(station_id, name, sys.intern(city), sys.intern(code),
+                             json.loads(extra) if extra else None, lat, lon)
+
+    def create_schema(self) -> None:
+        """Create the stations table and its indexes if they do not exist."""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            for statement in SCHEMA:
+                cursor.execute(statement)
+            conn.commit()
+
+    def replace_stations(self, stations: Iterable[Any], validator: Callable[[Any], bool]) -> int:
+        """
+        Replace the stored stations in one transaction.
+
+        Invalid records are quarantined instead of written.
+
+        Args:
+            stations: Station dicts in catalogue order
+            validator: Returns True for records that may be stored
+
+        Returns:
+            int: Number of stations written
+        """
+        quarantined = []
+        rows = []
+        for station in stations:
+            if not validator(station):
+                logger.warning("Quarantined invalid station data: %s", station)
+                quarantined.append(station)
+                continue
+            record = StationRecord.from_dict(station)
+            rows.append((len(rows), record.id, record.name, record.city, record.code,
+                         fold_key(record.city), fold_key(record.code),
+                         json.dumps(record.extra) if record.extra else None,
+                         record.lat, record.lon))
+
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM stations")
+            cursor.executemany(self._sql(
+                "INSERT INTO stations (pos, id, name, city, code, city_key, code_key, extra, lat, lon) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            ), rows)
+            cursor.execute("UPDATE stations_generation SET generation = generation + 1")
+            cursor.execute("SELECT generation FROM stations_generation")
+            generation = cursor.fetchone()[0]
+            conn.commit()
+
+        self.quarantined = quarantined
+        with self._check_lock:
+            # This write needs no second version bump when the check sees it
+            self._generation = generation
+            self._checked_at = time.monotonic()
+            self._version = next_version()
+        return len(rows)
+
+    @property
+    def version(self) -> int:
+        """Current data version, re-checked against the database every ``check_interval`` seconds."""
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._check_generation()
+        return self._version
+
+    def _check_generation(self) -> None:
+        """Start a new data version if the stations_generation row changed since it was last read."""
+        with self._check_lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                # Another thread checked while this one waited
+                return
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT generation FROM stations_generation")
+                row = cursor.fetchone()
+            generation = row[0] if row else None
+            if generation != self._generation:
+                self._generation = generation
+                self._version = next_version()
+            self._checked_at = time.monotonic()
+
+    def refresh(self) -> None:
+        """Start a new data version after the database was changed elsewhere."""
+        with self._check_lock:
+            self._version = next_version()
+            self._checked_at = float('-inf')
+
+    @property
+    def quarantine_count(self) -> int:
+        """Number of records rejected by the last ``replace_stations``."""
+        return len(self.quarantined)
+
+    def __len__(self) -> int:
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM stations")
+            return cursor.fetchone()[0]
+
+    def position_of(self, station_id: str) -> Optional[int]:
+        """Return the position of a station id, or None if it is not present."""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self._sql("SELECT MIN(pos) FROM stations WHERE id = ?"), (station_id,))
+            return cursor.fetchone()[0]
+
+    def page(self, city: FilterValues = '', code: FilterValues = '', after: Optional[int] = None,
+             limit: Optional[int] = None, name: FilterValues = '', id: FilterValues = '') -> StationPage:
+        """
+        Return one page of stations matching all filters.
+
+        One extra row is fetched to tell whether more pages follow.
+
+        Args:
+            city: City name, or any of several, to match (case-insensitive); empty means no filter
+            code: Station code, or any of several, to match (case-insensitive); empty means no filter
+            after: Position of the last row already returned, or None to start
+            limit: Maximum stations in the page, or None for all remaining
+            name: Full station name, or any of several, to match; empty means no filter
+            id: Station id, or any of several, to match (exact); empty means no filter
+
+        Returns:
+            StationPage with the records, their positions and whether more follow.
+        """
+        query = self._page_params(city, code, name, id, after, None if limit is None else limit + 1)
+        if query is None:
+            return StationPage([], [], False)
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(*query)
+            rows = cursor.fetchall()
+
+        has_more = limit is not None and len(rows) > limit
+        if has_more:
+            rows = rows[:limit]
+        return StationPage([self._record(row) for row in rows], [row[0] for row in rows], has_more)
+
+    def stream(self, city: FilterValues = '', code: FilterValues = '', after: Optional[int] = None,
+               limit: Optional[int] = None, name: FilterValues = '',
+               id: FilterValues = '') -> Iterator[StationRecord]:
+        """
+        Yield matching stations without loading them all at once.
+
+        A pooled connection is held until the iterator is exhausted or closed.
+        """
+        query = self._page_params(city, code, name, id, after, limit)
+        if query is None:
+            return
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(*query)
+            while True:
+                rows = cursor.fetchmany(STREAM_FETCH_SIZE)
+                if not rows:
+                    return
+                for row in rows:
+                    yield self._record(row)
+
+    def _select_in(self, column: str, values: List[Any]) -> List[Tuple[Any, ...]]:
+        """Fetch the rows whose ``column`` is one of ``values``, in catalogue order per chunk."""
+        rows: List[Tuple[Any, ...]] = []
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+                chunk = values[start:start + LOOKUP_CHUNK_SIZE]
+                placeholders = ', '.join('?' * len(chunk))
+                cursor.execute(self._sql(
+                    f"SELECT {_COLUMNS}, {column} FROM stations WHERE {column} IN ({placeholders}) ORDER BY pos"
+                ), chunk)
+                rows.extend(cursor.fetchall())
+        return rows
+
+    def lookup_ids(self, station_ids: Sequence[str]) -> List[Optional[StationRecord]]:
+        """
+        Resolve many station ids with one query per LOOKUP_CHUNK_SIZE distinct ids.
+
+        Args:
+            station_ids: Ids to look up (exact match)
+
+        Returns:
+            The record for each id, in input order, or None where an id is not present.
+        """
+        found: Dict[str, Tuple[int, StationRecord]] = {}
+        for row in self._select_in('id', list(dict.fromkeys(station_ids))):
+            # Like position_of, a repeated id resolves to its first position
+            if row[1] not in found or row[0] < found[row[1]][0]:
+                found[row[1]] = (row[0], self._record(row[:-1]))
+        return [found[station_id][1] if station_id in found else None for station_id in station_ids]
+
+    def lookup_codes(self, codes: Sequence[str]) -> List[List[StationRecord]]:
+        """
+        Resolve many station codes with one query per LOOKUP_CHUNK_SIZE distinct codes.
+
+        Args:
+            codes: Codes to look up (case-insensitive)
+
+        Returns:
+            The stations holding each code, in input order; an empty list where none do.
+        """
+        keys = [fold_key(code) for code in codes]
+        found: Dict[str, List[StationRecord]] = {}
+        for row in self._select_in('code_key', list(dict.fromkeys(key for key in keys if key))):
+            found.setdefault(row[-1], []).append(self._record(row[:-1]))
+        return [list(found.get(key, ())) for key in keys]
+
+    def _versioned_index(self, name: str, query: str, build: Callable[[List[Tuple[Any, ...]]], Any]) -> Any:
+        """Return an index over the rows of ``query`` for the current version, building it if needed."""
+        entry = self._indexes.get(name)
+        if entry is None or entry[0] != self.version:
+            with self._index_lock:
+                entry = self._indexes.get(name)
+                if entry is None or entry[0] != self.version:
+                    version = self.version
+                    with self.pool.connection() as conn:
+                        cursor = conn.cursor()
+                        cursor.execute(query)
+                        rows = cursor.fetchall()
+                    entry = self._indexes[name] = (version, build(rows))
+        return entry[1]
+
+    def _records_at(self, positions: List[int]) -> Dict[int, StationRecord]:
+        """Fetch the records at the given positions, keyed by position."""
+        if not positions:
+            return {}
+        placeholders = ', '.join('?' * len(positions))
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(f"SELECT {_COLUMNS} FROM stations WHERE pos IN ({placeholders})"), positions)
+            return {row[0]: self._record(row) for row in cursor.fetchall()}
+
+    def _search_index(self) -> Tuple[NameSearchIndex, List[int]]:
+        """Return the name index for the current version and the position of each indexed name."""
+        return self._versioned_index(
+            'search', "SELECT pos, name FROM stations ORDER BY pos",
+            lambda rows: (NameSearchIndex([name for _, name in rows]), [pos for pos, _ in rows])
+        )
+
+    def search(self, query: str, limit: int = 10) -> List[StationRecord]:
+        """
+        Return stations whose names best match a typeahead query.
+
+        Args:
+            query: Text typed by the user
+            limit: Maximum results
+
+        Returns:
+            Up to ``limit`` station records, best match first.
+        """
+        index, positions = self._search_index()
+        ranked = [positions[i] for i in index.search(query, limit)]
+        records = self._records_at(ranked)
+        return [records[pos] for pos in ranked if pos in records]
+
+    def _geo_index(self) -> GeoGridIndex:
+        """Return the coordinate index for the current version; its rows are positions."""
+        return self._versioned_index(
+            'geo', "SELECT pos, lat, lon FROM stations WHERE lat IS NOT NULL AND lon IS NOT NULL ORDER BY pos",
+            GeoGridIndex
+        )
+
+    def nearby(self, lat: float, lon: float, radius_km: Optional[float] = None,
+               k: int = 10) -> List[Tuple[StationRecord, float]]:
+        """
+        Return the stations nearest a point.
+
+        Args:
+            lat: Latitude of the point
+            lon: Longitude of the point
+            radius_km: Only return stations within this distance; None for any distance
+            k: Maximum results
+
+        Returns:
+            Up to ``k`` (station record, distance in km) pairs, nearest first.
+        """
+        ranked = self._geo_index().nearby(lat, lon, radius_km, k)
+        records = self._records_at([pos for pos, _ in ranked])
+        return [(records[pos], distance) for pos, distance in ranked if pos in records]
+
+def open_sqlite_repository(path: str, pool_size: int = 4, timeout: float = 5.0,
+                           check_interval: float = 1.0) -> SqlStationRepository:
+    """
+    Open a SQLite station repository, creating the schema if needed.
+
+    Args:
+        path: Database file path
+        pool_size: Maximum open connections
+        timeout: Seconds to wait for a free connection
+        check_interval: Seconds between checks for writes by other processes
+
+    Returns:
+        SqlStationRepository: Repository backed by the file
+    """
+    def connect():
+        # Pooled connections move between request threads
+        return sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+
+    repository = SqlStationRepository(ConnectionPool(connect, pool_size, timeout), check_interval=check_interval)
+    repository.create_schema()
+    return repository
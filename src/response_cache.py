@@ -0,0 +1,168 @@
+"""
+Pre-serialized response cache for the /stations endpoint.
+
+Station data only changes when a new StationStore is built, so serialized
+response bodies can be reused across requests. Entries are keyed by the
+normalized filter values, tagged with the data version they were built
+from, and evicted least-recently-used once the cache exceeds its size
+bounds. Compressed variants of a body are kept with its entry and count
+towards the byte budget.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+from src.compression import compress
+
+
+class CachedResponse:
+    """
+    Serialized response body with its strong ETag, extra response headers
+    and compressed variants by content encoding.
+    """
+
+    __slots__ = ('body', 'etag', 'item_count', 'headers', 'variants')
+
+    def __init__(self, body: bytes, item_count: int = 0, headers: Optional[Dict[str, str]] = None):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.item_count = item_count
+        self.headers = headers or {}
+        self.variants: Dict[str, bytes] = {}
+
+    @property
+    def size(self) -> int:
+        """Bytes held by the body and its variants."""
+        return len(self.body) + sum(len(data) for data in self.variants.values())
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of serialized responses for one data version.
+
+    Looking up or storing an entry for a different version than the one the
+    cache currently holds drops every existing entry, so stale bodies are
+    never served after the station data changes.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Hashable, CachedResponse]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size of the cached bodies."""
+        return self._size
+
+    def _switch_version(self, version: int) -> None:
+        """Drop all entries if they belong to another data version. Caller holds the lock."""
+        if version != self.version:
+            self._entries.clear()
+            self._size = 0
+            self.version = version
+
+    def get(self, version: int, key: Hashable) -> Optional[CachedResponse]:
+        """
+        Return the cached response for a key, or None on a miss.
+
+        Args:
+            version: Version of the data the caller is serving
+            key: Normalized request key
+
+        Returns:
+            CachedResponse if present for this version, otherwise None.
+        """
+        with self._lock:
+            self._switch_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, version: int, key: Hashable, body: bytes, item_count: int = 0,
+            headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        """
+        Store a serialized body and return its cache entry.
+
+        Bodies larger than the whole byte budget are returned uncached.
+
+        Args:
+            version: Version of the data the body was built from
+            key: Normalized request key
+            body: Serialized response body
+            item_count: Number of items in the body, for logging
+            headers: Extra headers to send with the body
+
+        Returns:
+            CachedResponse wrapping the body.
+        """
+        entry = CachedResponse(body, item_count, headers)
+        if len(body) > self.max_bytes:
+            return entry
+
+        with self._lock:
+            self._switch_version(version)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous.size
+            self._entries[key] = entry
+            self._size += len(body)
+            self._evict()
+
+        return entry
+
+    def encoded(self, version: int, key: Hashable, entry: CachedResponse, encoding: str) -> bytes:
+        """
+        Return an entry's body compressed with an encoding, compressing it on first use.
+
+        The variant is stored on the entry, so later requests for the same
+        version and encoding reuse it.
+
+        Args:
+            version: Version of the data the entry was built from
+            key: Normalized request key the entry is stored under
+            entry: Entry returned by ``get`` or ``put``
+            encoding: Content encoding, e.g. 'gzip'
+
+        Returns:
+            The compressed body.
+        """
+        data = entry.variants.get(encoding)
+        if data is not None:
+            return data
+        # Compress outside the lock; concurrent misses may both compress, and the first stored wins
+        data = compress(entry.body, encoding)
+        with self._lock:
+            if encoding in entry.variants:
+                return entry.variants[encoding]
+            entry.variants[encoding] = data
+            if self.version == version and self._entries.get(key) is entry:
+                self._size += len(data)
+                self._evict()
+        return data
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until within both bounds. Caller holds the lock."""
+        while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
@@ -0,0 +1,253 @@
+"""
+Typeahead search over station names.
+
+``NameSearchIndex`` is built once per snapshot and answers a query in
+ranked tiers:
+
+1. Names that start with the query, alphabetically.
+2. Names with a later word that starts with the query, alphabetically.
+3. Only if nothing matched so far, typo-tolerant matches: every query word
+   is within trigram similarity ``FUZZY_THRESHOLD`` of a word in the name
+   (or is a prefix of one), closest matches first.
+
+Tiers 1 and 2 use sorted arrays of name keys and word suffixes: a sorted
+array is a flattened prefix trie, and one binary search finds the start of
+the matching range, so those tiers cost O(log n + limit). Tier 3 uses a
+trigram index over the distinct name words. Trigrams shared by a large
+share of the vocabulary (like "sta" or "ion") say little about a word and
+have long posting lists, so similarity is computed over the remaining,
+informative trigrams.
+"""
+
+import heapq
+import re
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+# Minimum trigram Jaccard similarity for a typo-tolerant word match
+FUZZY_THRESHOLD = 0.3
+
+# Trigrams found in more than this share of the vocabulary are not indexed
+STOP_GRAM_SHARE = 0.01
+
+# Most rows scored by one typo-tolerant query, to bound its latency
+FUZZY_SCAN_LIMIT = 2000
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Case-fold a name or query and collapse it to space-separated words."""
+    return ' '.join(_WORD.findall(text.casefold()))
+
+
+def trigrams(word: str) -> Set[str]:
+    """Return the trigrams of a word, padded so short words still have some."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    """Jaccard similarity of two trigram sets."""
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) if shared else 0.0
+
+
+class NameSearchIndex:
+    """
+    Prefix and trigram indexes over a list of names.
+
+    Results are row positions into the list the index was built from.
+    """
+
+    def __init__(self, names: Sequence[str]):
+        keys = [normalize(name) for name in names]
+        self._keys = keys
+
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._name_keys = [keys[row] for row in order]
+        self._name_rows = array('l', order)
+
+        # Every suffix of a name that starts at its second or later word
+        suffixes: List[Tuple[str, int]] = []
+        vocabulary: Dict[str, List[int]] = {}
+        for row, key in enumerate(keys):
+            words = key.split(' ')
+            offset = 0
+            for i, word in enumerate(words):
+                if i:
+                    suffixes.append((key[offset:], row))
+                offset += len(word) + 1
+                if word:
+                    vocabulary.setdefault(sys.intern(word), []).append(row)
+        suffixes.sort()
+        self._suffix_keys = [suffix for suffix, _ in suffixes]
+        self._suffix_rows = array('l', (row for _, row in suffixes))
+
+        # Trigram -> ids of the distinct words containing it
+        self._words = list(vocabulary)
+        self._word_ids = {word: word_id for word_id, word in enumerate(self._words)}
+        self._sorted_words = sorted(self._words)
+        self._word_rows = [
+            rows[0] if len(rows) == 1 else array('l', dict.fromkeys(rows)) for rows in vocabulary.values()
+        ]
+        grams: Dict[str, array] = {}
+        for word_id, word in enumerate(self._words):
+            for gram in trigrams(word):
+                postings = grams.get(gram)
+                if postings is None:
+                    postings = grams[gram] = array('l')
+                postings.append(word_id)
+        stop_size = max(64, int(len(self._words) * STOP_GRAM_SHARE))
+        self._stop_grams = frozenset(gram for gram, postings in grams.items() if len(postings) > stop_size)
+        self._grams = {gram: postings for gram, postings in grams.items() if gram not in self._stop_grams}
+        # Informative trigrams per word, the denominator of its similarity
+        self._gram_counts = array('H', (len(trigrams(word) - self._stop_grams) for word in self._words))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def key(self, row: int) -> str:
+        """Return the normalized name of a row."""
+        return self._keys[row]
+
+    def exact(self, name: str) -> Sequence[int]:
+        """
+        Return the rows whose name equals ``name`` after normalization.
+
+        Args:
+            name: Full station name; case, punctuation and spacing are ignored
+
+        Returns:
+            Ascending row positions; empty if the name has no words.
+        """
+        key = normalize(name)
+        if not key:
+            return ()
+        # The sort placing rows by key is stable, so equal keys hold ascending rows
+        return self._name_rows[bisect_left(self._name_keys, key):bisect_right(self._name_keys, key)]
+
+    def search(self, query: str, limit: int = 10) -> List[int]:
+        """
+        Return up to ``limit`` matching row positions, best first.
+
+        Args:
+            query: Text typed by the user
+            limit: Maximum results
+
+        Returns:
+            List of row positions; empty if the query has no words.
+        """
+        key = normalize(query)
+        if not key or limit < 1:
+            return []
+
+        results: List[int] = []
+        seen: Set[int] = set()
+        self._collect_prefix(self._name_keys, self._name_rows, key, limit, results, seen)
+        if len(results) < limit:
+            self._collect_prefix(self._suffix_keys, self._suffix_rows, key, limit, results, seen)
+        if not results:
+            self._collect_fuzzy(key.split(' '), limit, results)
+        return results
+
+    @staticmethod
+    def _collect_prefix(keys: List[str], rows: array, prefix: str, limit: int,
+                        results: List[int], seen: Set[int]) -> None:
+        """Append rows whose key starts with ``prefix``, in key order."""
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and len(results) < limit and keys[i].startswith(prefix):
+            row = rows[i]
+            if row not in seen:
+                seen.add(row)
+                results.append(row)
+            i += 1
+
+    def _similar_words(self, word: str) -> Dict[str, float]:
+        """Return vocabulary words similar to ``word``, with their similarity."""
+        grams = trigrams(word) - self._stop_grams
+        if len(grams) < 2:
+            # Too little left to compare on; only exact vocabulary words match
+            return {word: 1.0} if word in self._word_ids else {}
+        shared: Counter = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        size = len(grams)
+        # Similarity is at most shared / size, so most candidates are
+        # rejected on their shared count alone
+        need = FUZZY_THRESHOLD * size
+        counts = self._gram_counts
+        words = self._words
+        matches = {}
+        for word_id, common in [item for item in shared.items() if item[1] >= need]:
+            score = common / (size + counts[word_id] - common)
+            if score >= FUZZY_THRESHOLD:
+                matches[words[word_id]] = score
+        return matches
+
+    def _is_word_prefix(self, prefix: str) -> bool:
+        """Return True if some vocabulary word starts with ``prefix``."""
+        i = bisect_left(self._sorted_words, prefix)
+        return i < len(self._sorted_words) and self._sorted_words[i].startswith(prefix)
+
+    def _rows_of(self, word: str) -> Sequence[int]:
+        rows = self._word_rows[self._word_ids[word]]
+        return (rows,) if isinstance(rows, int) else rows
+
+    def _collect_fuzzy(self, words: List[str], limit: int, results: List[int]) -> None:
+        """
+        Append typo-tolerant matches, ranked by total word similarity.
+
+        Rows are drawn from the words similar to one "driver" query word,
+        best first. A row's total is at most its driver similarity plus 1.0
+        for every other query word, so scanning stops once that bound can
+        no longer beat the current top ``limit``, or after
+        FUZZY_SCAN_LIMIT rows.
+        """
+        similar = [self._similar_words(word) for word in words]
+        # A word with no similar words can still match as a prefix, but not drive
+        drivers = [i for i in range(len(words)) if similar[i]]
+        if not drivers or not all(similar[i] or self._is_word_prefix(words[i]) for i in range(len(words))):
+            return
+        driver = min(drivers, key=lambda i: sum(len(self._rows_of(word)) for word in similar[i]))
+        others = [(word, matches) for i, (word, matches) in enumerate(zip(words, similar)) if i != driver]
+
+        # Min-heap of the best (total, -row) so far; ties go to the earlier row
+        top: List[Tuple[float, int]] = []
+        seen: Set[int] = set()
+        for word, score in sorted(similar[driver].items(), key=lambda item: (-item[1], item[0])):
+            bound = score + len(others)
+            if len(seen) >= FUZZY_SCAN_LIMIT or (len(top) >= limit and (bound, 0) < top[0]):
+                break
+            for row in self._rows_of(word):
+                if len(seen) >= FUZZY_SCAN_LIMIT or (len(top) >= limit and (bound, -row) < top[0]):
+                    break
+                if row in seen:
+                    continue
+                seen.add(row)
+                total = self._row_score(row, others, score)
+                if total is None:
+                    continue
+                if len(top) < limit:
+                    heapq.heappush(top, (total, -row))
+                elif (total, -row) > top[0]:
+                    heapq.heapreplace(top, (total, -row))
+        results.extend(-row for _, row in sorted(top, reverse=True))
+
+    def _row_score(self, row: int, others: List[Tuple[str, Dict[str, float]]], total: float) -> Optional[float]:
+        """Add the best match of each other query word in a row's name, or None if one has none."""
+        name_words = self._keys[row].split(' ')
+        for query_word, matches in others:
+            best = 0.0
+            for name_word in name_words:
+                if name_word.startswith(query_word):
+                    best = 1.0
+                    break
+                best = max(best, matches.get(name_word, 0.0))
+            if best < FUZZY_THRESHOLD:
+                return None
+            total += best
+        return total
@@ -0,0 +1,126 @@
+"""
+Production server entry point.
+
+Runs the Flask app under gunicorn with a configurable number of worker
+processes and threads:
+
+    python -m src.server
+
+Settings are read from the environment:
+    SERVER_MODE          'wsgi' (default) serves the Flask app on gthread
+                         workers; 'asgi' serves src.asgi on asyncio workers,
+                         for I/O-bound backends such as STATIONS_UPSTREAM_URL
+    PORT                 Port to bind (default 80)
+    WEB_CONCURRENCY      Worker processes (default 2 x CPU cores + 1)
+    GUNICORN_THREADS     Threads per worker (default 4; 1 uses sync workers;
+                         not used in asgi mode)
+    GUNICORN_WORKER_CONNECTIONS
+                         Most open client connections per asgi worker
+                         (default 1000)
+    GUNICORN_KEEPALIVE   Seconds to keep idle client connections open (default 65)
+    GUNICORN_TIMEOUT     Seconds before a silent worker is restarted (default 30)
+    GUNICORN_GRACEFUL_TIMEOUT
+                         Seconds workers get to finish in-flight requests
+                         after SIGTERM (default 25)
+    GUNICORN_MAX_REQUESTS
+                         Recycle a worker after this many requests, 0 to
+                         disable (default 0)
+"""
+
+import multiprocessing
+import os
+from typing import Any, Callable, Dict, Optional
+
+from gunicorn.app.base import BaseApplication
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment."""
+    value = os.environ.get(name, '').strip()
+    return int(value) if value else default
+
+
+def server_mode() -> str:
+    """
+    Read SERVER_MODE.
+
+    Raises:
+        ValueError: If the mode is not 'wsgi' or 'asgi'
+    """
+    mode = os.environ.get('SERVER_MODE', '').strip().lower() or 'wsgi'
+    if mode not in ('wsgi', 'asgi'):
+        raise ValueError(f"SERVER_MODE must be 'wsgi' or 'asgi', not {mode!r}")
+    return mode
+
+
+def build_options() -> Dict[str, Any]:
+    """
+    Build gunicorn settings from the environment.
+
+    Returns:
+        Dict of gunicorn setting names to values
+    """
+    asgi = server_mode() == 'asgi'
+    threads = 1 if asgi else max(1, _env_int('GUNICORN_THREADS', 4))
+    max_requests = _env_int('GUNICORN_MAX_REQUESTS', 0)
+    return {
+        'bind': f"0.0.0.0:{_env_int('PORT', 80)}",
+        'workers': max(1, _env_int('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)),
+        'threads': threads,
+        'worker_class': 'asgi' if asgi else 'gthread' if threads > 1 else 'sync',
+        'worker_connections': _env_int('GUNICORN_WORKER_CONNECTIONS', 1000),
+        # Keep idle connections open longer than a fronting load balancer's
+        # 60s idle timeout, so the balancer closes them first
+        'keepalive': _env_int('GUNICORN_KEEPALIVE', 65),
+        'timeout': _env_int('GUNICORN_TIMEOUT', 30),
+        # ECS waits 30s between SIGTERM and SIGKILL by default
+        'graceful_timeout': _env_int('GUNICORN_GRACEFUL_TIMEOUT', 25),
+        'max_requests': max_requests,
+        'max_requests_jitter': max_requests // 10,
+        # Import and warm up the app once in the master, before the socket
+        # opens, so workers share the loaded data and caches copy-on-write
+        'preload_app': True,
+        'errorlog': '-',
+    }
+
+
+class ProductionServer(BaseApplication):
+    """
+    Gunicorn application that serves an already-imported WSGI or ASGI app.
+
+    ``warm_up`` runs when gunicorn loads the app: once in the master before
+    the listening socket opens when the app is preloaded, otherwise in each
+    worker before it accepts connections.
+    """
+
+    def __init__(self, application, options: Dict[str, Any], warm_up: Optional[Callable[[], Any]] = None):
+        self.application = application
+        self.options = options
+        self.warm_up = warm_up
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        if self.warm_up is not None:
+            self.warm_up()
+        return self.application
+
+
+def main():
+    options = build_options()
+    if options['worker_class'] == 'asgi':
+        from src.asgi import create_asgi_app
+        application = create_asgi_app()
+    else:
+        from src.app import app as application
+    from src.app import warm_up
+
+    ProductionServer(application, options, warm_up).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+File-backed station data with hot reload.
+
+``StationFileSource`` loads stations from a JSON, CSV or NDJSON file and
+polls the file for changes. When it changes, a new StationStore is parsed,
+validated and indexed on the watcher thread and then published by
+replacing a single reference. Requests read that reference once and keep
+using the snapshot they got, so they never wait for a rebuild and never see
+a partly built store. A file that fails to load leaves the current
+snapshot in place.
+"""
+
+import csv
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.stations import StationStore
+
+logger = logging.getLogger(__name__)
+
+
+def _read_json(handle) -> List[Dict[str, Any]]:
+    stations = json.load(handle)
+    if not isinstance(stations, list):
+        raise ValueError("JSON station file must contain a list")
+    return stations
+
+
+def _read_ndjson(handle) -> List[Dict[str, Any]]:
+    return [json.loads(line) for line in handle if line.strip()]
+
+
+def _read_csv(handle) -> List[Dict[str, Any]]:
+    return list(csv.DictReader(handle))
+
+
+# Readers by file extension
+READERS: Dict[str, Callable[[Any], List[Dict[str, Any]]]] = {
+    '.json': _read_json,
+    '.ndjson': _read_ndjson,
+    '.jsonl': _read_ndjson,
+    '.csv': _read_csv,
+}
+
+
+def read_station_file(path: str) -> List[Dict[str, Any]]:
+    """
+    Read station records from a file, choosing the format by extension.
+
+    Args:
+        path: Path to a .json, .ndjson, .jsonl or .csv file
+
+    Returns:
+        List of raw station records, not yet validated
+
+    Raises:
+        ValueError: If the extension is not supported or the content is malformed
+        csv.Error: If a CSV file is malformed
+        OSError: If the file cannot be read
+    """
+    reader = READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise ValueError(f"Unsupported station file type: {path}")
+    with open(path, encoding='utf-8', newline='') as handle:
+        return reader(handle)
+
+
+# Sources with a running watcher, restarted in forked children
+_watching: 'weakref.WeakSet[StationFileSource]' = weakref.WeakSet()
+
+
+class StationFileSource:
+    """
+    Station snapshot loaded from a file and rebuilt when the file changes.
+
+    ``store`` always holds a complete snapshot. The file is considered
+    changed when its modification time, size or inode differ from the last
+    successful load, which also catches files replaced by an atomic rename.
+    """
+
+    def __init__(self, path: str, build: Callable[[List[Dict[str, Any]]], StationStore],
+                 interval: float = 2.0):
+        """
+        Load the file once; later changes are picked up by ``check`` or ``start``.
+
+        Args:
+            path: Station file path
+            build: Builds a validated store from raw records
+            interval: Seconds between checks once watching
+
+        Raises:
+            ValueError, csv.Error, OSError: If the initial load fails
+        """
+        self.path = path
+        self.interval = interval
+        self._build = build
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.store = self.reload()
+
+    def _stat(self) -> Tuple[int, int, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def reload(self) -> StationStore:
+        """
+        Read and index the file, then publish the new snapshot.
+
+        Returns:
+            StationStore: The published snapshot
+        """
+        signature = self._stat()
+        start = time.perf_counter()
+        store = self._build(read_station_file(self.path))
+        # The store keeps its own records; let the raw parsed list be freed
+        store.source = None
+        # The only write readers can observe: one reference assignment
+        self.store = store
+        self._signature = signature
+        logger.info("Loaded %d stations from %s in %.1f ms", len(store), self.path,
+                    (time.perf_counter() - start) * 1000)
+        return store
+
+    def check(self) -> bool:
+        """
+        Reload if the file changed since the last successful load.
+
+        Failures are logged and the current snapshot is kept.
+
+        Returns:
+            bool: True if a new snapshot was published
+        """
+        try:
+            if self._stat() == self._signature:
+                return False
+            self.reload()
+            return True
+        except (OSError, ValueError, csv.Error) as e:
+            logger.error("Keeping current stations; failed to reload %s: %s", self.path, e)
+            return False
+
+    def start(self) -> None:
+        """Start watching the file on a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='station-file-watcher', daemon=True)
+        self._thread.start()
+        _watching.add(self)
+
+    def stop(self) -> None:
+        """Stop the watcher thread."""
+        _watching.discard(self)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+
+def _restart_watchers_after_fork():
+    """Threads do not survive fork, so each forked worker starts its own watchers."""
+    for source in list(_watching):
+        source._thread = None
+        source._stop = threading.Event()
+        source.start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_watchers_after_fork)
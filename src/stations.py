@@ -0,0 +1,511 @@
+"""
+Station storage and lookup indexes for the /stations endpoint.
+
+Records are validated, normalized and indexed once when station data is
+loaded, so the request path only touches records already known to be valid
+and filtered lookups cost O(result size) instead of a catalogue scan.
+Valid records are held as slotted StationRecord objects with interned city
+and code strings, and posting lists are packed integer arrays, which keeps
+per-station memory well below that of a list of dicts.
+"""
+
+import heapq
+import itertools
+import logging
+import sys
+import threading
+from array import array
+from typing import List, Dict, Any, Iterable, Iterator, NamedTuple, Optional, Callable, Sequence, Tuple, Union
+
+from src.geo import GeoGridIndex, parse_coordinate
+from src.pagination import page_rows
+from src.search import NameSearchIndex, normalize
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ['id', 'name', 'city', 'code']
+
+# Optional position fields, held as floats on the record
+COORDINATE_FIELDS = ('lat', 'lon')
+
+# Source of data version numbers, unique for the life of the process
+_store_versions = itertools.count(1)
+
+
+def next_version() -> int:
+    """Return a new data version number, for caches to tell snapshots apart."""
+    return next(_store_versions)
+
+
+def fold_key(value: str) -> str:
+    """Normalize a filter value or station field for case-insensitive matching."""
+    return value.strip().casefold()
+
+
+# A filter: one value or a sequence of alternatives; empty means no filter
+FilterValues = Union[str, Sequence[str]]
+
+
+def filter_values(values: FilterValues) -> Tuple[str, ...]:
+    """Return the non-blank values of a filter, trimmed, without duplicates."""
+    if isinstance(values, str):
+        values = (values,)
+    return tuple(dict.fromkeys(value.strip() for value in values if value and value.strip()))
+
+
+class RowFilter(NamedTuple):
+    """
+    One filter's candidate rows and membership test.
+
+    ``size`` is known before the candidates are materialized, so
+    intersect_rows only builds the shortest candidate list.
+    """
+
+    size: int
+    rows: Callable[[], Sequence[int]]
+    test: Callable[[int], bool]
+
+
+def intersect_rows(filters: Sequence[RowFilter], count: int) -> Sequence[int]:
+    """
+    Return the ascending rows matching every filter.
+
+    The filter with the fewest candidates is walked and each candidate is
+    tested against the others, so the cost is O(smallest candidate list)
+    however many filters are combined.
+
+    Args:
+        filters: Filters to combine
+        count: Rows in the catalogue, all of which match when there are no filters
+
+    Returns:
+        Sequence of row positions; callers must treat it as read-only.
+    """
+    if not filters:
+        return range(count)
+    smallest = min(filters, key=lambda f: f.size)
+    rows = smallest.rows()
+    tests = [f.test for f in filters if f is not smallest]
+    if not tests:
+        return rows
+    return [p for p in rows if all(test(p) for test in tests)]
+
+
+_MISSING = object()
+
+
+class StationRecord:
+    """
+    Compact, read-only view of one valid station.
+
+    Supports the read side of the dict interface (``record['city']``,
+    ``record.get('code')``) and compares equal to the equivalent dict, so
+    code written against plain station dicts keeps working. Fields outside
+    the required set are kept in ``extra``, which is None for most records.
+    ``lat`` and ``lon`` are floats, or None for stations without a position.
+    """
+
+    __slots__ = ('id', 'name', 'city', 'code', 'extra', 'lat', 'lon')
+
+    def __init__(self, id: str, name: str, city: str, code: str, extra: Optional[Dict[str, Any]] = None,
+                 lat: Optional[float] = None, lon: Optional[float] = None):
+        self.id = id
+        self.name = name
+        self.city = city
+        self.code = code
+        self.extra = extra
+        self.lat = lat
+        self.lon = lon
+
+    @classmethod
+    def from_dict(cls, station: Dict[str, Any]) -> 'StationRecord':
+        """
+        Build a record from a validated station dict.
+
+        Required fields are trimmed; city and code repeat across many
+        stations, so they are interned to share one string per value.
+        Coordinates are converted to floats; numeric strings, as read from
+        CSV files, are accepted.
+        """
+        extra = {
+            k: v for k, v in station.items() if k not in REQUIRED_FIELDS and k not in COORDINATE_FIELDS
+        } or None
+        return cls(
+            station['id'].strip(),
+            station['name'].strip(),
+            sys.intern(station['city'].strip()),
+            sys.intern(station['code'].strip()),
+            extra,
+            parse_coordinate(station.get('lat'), 'lat'),
+            parse_coordinate(station.get('lon'), 'lon')
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the record as a plain dict, as served to clients."""
+        result = {'id': self.id, 'name': self.name, 'city': self.city, 'code': self.code}
+        if self.lat is not None:
+            result['lat'] = self.lat
+            result['lon'] = self.lon
+        if self.extra:
+            result.update(self.extra)
+        return result
+
+    def project(self, fields: Sequence[str]) -> Dict[str, Any]:
+        """Return only the given fields as a dict, skipping fields the record does not have."""
+        result = {}
+        for field in fields:
+            value = self.get(field, _MISSING)
+            if value is not _MISSING:
+                result[field] = value
+        return result
+
+    def get(self, field: str, default: Any = None) -> Any:
+        if field in REQUIRED_FIELDS:
+            return getattr(self, field)
+        if field in COORDINATE_FIELDS:
+            value = getattr(self, field)
+            return default if value is None else value
+        if self.extra:
+            return self.extra.get(field, default)
+        return default
+
+    def __getitem__(self, field: str) -> Any:
+        if field in REQUIRED_FIELDS:
+            return getattr(self, field)
+        if field in COORDINATE_FIELDS and getattr(self, field) is not None:
+            return getattr(self, field)
+        if self.extra and field in self.extra:
+            return self.extra[field]
+        raise KeyError(field)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, StationRecord):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"StationRecord({self.to_dict()!r})"
+
+
+class StationPage(NamedTuple):
+    """One page of matching stations, with their row positions."""
+
+    records: List[StationRecord]
+    positions: Sequence[int]
+    has_more: bool
+
+
+class StationIndex:
+    """
+    Case-folded hash indexes over a list of station records.
+
+    Records are kept in their original order. The city and code indexes map
+    a folded key to the ascending row positions holding that key, so results
+    are always returned in catalogue order. A key held by a single row maps
+    straight to its position; keys shared by several rows map to a packed
+    integer array. Station ids map to the position of their first
+    occurrence. Records may be plain dicts or StationRecord objects. A list
+    passed in is indexed in place, not copied, and must not be mutated
+    afterwards.
+    """
+
+    def __init__(self, stations: Iterable[Any]):
+        # Keep the caller's list rather than a copy: a store holds one pointer array
+        self.stations: List[Any] = stations if isinstance(stations, list) else list(stations)
+        self._by_id: Dict[str, int] = {}
+        self._by_city: Dict[str, Any] = {}
+        self._by_code: Dict[str, Any] = {}
+        self._city_keys: List[Optional[str]] = []
+        self._code_keys: List[Optional[str]] = []
+
+        for position, station in enumerate(self.stations):
+            if isinstance(station, (dict, StationRecord)) and isinstance(station.get('id'), str):
+                self._by_id.setdefault(station['id'], position)
+            city_key = self._index_field(self._by_city, station, 'city', position)
+            code_key = self._index_field(self._by_code, station, 'code', position)
+            self._city_keys.append(city_key)
+            self._code_keys.append(code_key)
+
+    @staticmethod
+    def _index_field(index: Dict[str, Any], station: Any, field: str, position: int) -> Optional[str]:
+        """Add a row to a field index, skipping rows without a usable string value."""
+        if not isinstance(station, (dict, StationRecord)) or not isinstance(station.get(field), str):
+            return None
+        key = sys.intern(fold_key(station[field]))
+        rows = index.get(key)
+        if rows is None:
+            index[key] = position
+        elif isinstance(rows, int):
+            index[key] = array('l', (rows, position))
+        else:
+            rows.append(position)
+        return key
+
+    @staticmethod
+    def _postings(index: Dict[str, Any], key: str) -> Sequence[int]:
+        """Return the row positions stored under a key as a sequence."""
+        rows = index.get(key, ())
+        return (rows,) if isinstance(rows, int) else rows
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+    def position_of(self, station_id: str) -> Optional[int]:
+        """Return the row position of a station id, or None if it is not present."""
+        return self._by_id.get(station_id)
+
+    def find(self, city: FilterValues = '', code: FilterValues = '') -> List[Any]:
+        """
+        Return stations matching all of the given filters.
+
+        Args:
+            city: City name, or any of several, to match (case-insensitive); empty means no filter
+            code: Station code, or any of several, to match (case-insensitive); empty means no filter
+
+        Returns:
+            List of matching station records in catalogue order.
+        """
+        if not filter_values(city) and not filter_values(code):
+            return list(self.stations)
+        return [self.stations[p] for p in self.rows(city=city, code=code)]
+
+    def rows(self, city: FilterValues = '', code: FilterValues = '', id: FilterValues = '') -> Sequence[int]:
+        """
+        Return the ascending row positions of stations matching all filters.
+
+        The result may be a posting list owned by the index or a range over
+        the whole catalogue; callers must treat it as read-only.
+
+        Args:
+            city: City name, or any of several, to match (case-insensitive); empty means no filter
+            code: Station code, or any of several, to match (case-insensitive); empty means no filter
+            id: Station id, or any of several, to match (exact); empty means no filter
+
+        Returns:
+            Sequence of row positions into ``stations``.
+        """
+        return intersect_rows(self.filters(city=city, code=code, id=id), len(self.stations))
+
+    def filters(self, city: FilterValues = '', code: FilterValues = '', id: FilterValues = '') -> List[RowFilter]:
+        """Return a RowFilter for each given filter, for intersect_rows."""
+        filters = []
+        for index, row_keys, values in ((self._by_city, self._city_keys, city),
+                                        (self._by_code, self._code_keys, code)):
+            keys = {fold_key(value) for value in filter_values(values)}
+            if keys:
+                filters.append(self._key_filter(index, row_keys, keys))
+
+        ids = filter_values(id)
+        if ids:
+            positions = sorted({p for p in map(self._by_id.get, ids) if p is not None})
+            filters.append(RowFilter(len(positions), lambda: positions, set(positions).__contains__))
+        return filters
+
+    def _key_filter(self, index: Dict[str, Any], row_keys: List[Optional[str]], keys: set) -> RowFilter:
+        """Build the filter matching rows whose folded field is one of ``keys``."""
+        postings = [self._postings(index, key) for key in keys]
+        if len(postings) == 1:
+            rows = lambda: postings[0]
+        else:
+            # Each row holds one key, so the posting lists are disjoint
+            rows = lambda: list(heapq.merge(*postings))
+        if len(keys) == 1:
+            (key,) = keys
+            test = lambda p: row_keys[p] == key
+        else:
+            test = lambda p: row_keys[p] in keys
+        return RowFilter(sum(map(len, postings)), rows, test)
+
+
+class StationStore:
+    """
+    Validated snapshot of station data with lookup indexes.
+
+    Each record is checked once at ingest. Valid records are normalized
+    into StationRecord objects (required string fields are trimmed) and
+    indexed; invalid records are
+    quarantined and counted instead of being re-checked on every request.
+    A store is never mutated after construction: to change the data, build
+    a new store. Every store gets a new ``version`` so caches derived from
+    one snapshot can tell when the data has changed.
+    """
+
+    def __init__(self, stations: Iterable[Any], validator: Callable[[Any], bool]):
+        self.source = stations
+        self.version = next_version()
+        self.quarantined: List[Any] = []
+
+        valid: List[StationRecord] = []
+        for station in stations:
+            if not validator(station):
+                logger.warning("Quarantined invalid station data: %s", station)
+                self.quarantined.append(station)
+                continue
+            valid.append(StationRecord.from_dict(station))
+
+        self.index = StationIndex(valid)
+        self._search_index: Optional[NameSearchIndex] = None
+        self._geo_index: Optional[GeoGridIndex] = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def stations(self) -> List[StationRecord]:
+        """Valid station records in catalogue order."""
+        return self.index.stations
+
+    @property
+    def quarantine_count(self) -> int:
+        """Number of records rejected at ingest."""
+        return len(self.quarantined)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def find(self, city: FilterValues = '', code: FilterValues = '') -> List[StationRecord]:
+        """
+        Return valid stations matching all of the given filters.
+
+        Args:
+            city: City name, or any of several, to match (case-insensitive); empty means no filter
+            code: Station code, or any of several, to match (case-insensitive); empty means no filter
+
+        Returns:
+            List of matching station records in catalogue order.
+        """
+        return self.index.find(city=city, code=code)
+
+    def rows(self, city: FilterValues = '', code: FilterValues = '', name: FilterValues = '',
+             id: FilterValues = '') -> Sequence[int]:
+        """
+        Return the ascending row positions of valid stations matching all filters.
+
+        City, code and id filters use the hash indexes; name filters match
+        whole names through the name search index, ignoring case,
+        punctuation and spacing. Each filter accepts several alternatives.
+        """
+        filters = self.index.filters(city=city, code=code, id=id)
+        names = filter_values(name)
+        if names:
+            filters.append(self._name_filter(names))
+        return intersect_rows(filters, len(self))
+
+    def _name_filter(self, names: Tuple[str, ...]) -> RowFilter:
+        """Build the filter matching rows whose normalized name is one of ``names``."""
+        index = self.search_index
+        keys = {normalize(name) for name in names}
+        postings = [index.exact(key) for key in keys]
+        rows = postings[0] if len(postings) == 1 else list(heapq.merge(*postings))
+        return RowFilter(len(rows), lambda: rows, lambda p: index.key(p) in keys)
+
+    def position_of(self, station_id: str) -> Optional[int]:
+        """Return the row position of a station id, or None if it is not present."""
+        return self.index.position_of(station_id)
+
+    def lookup_ids(self, station_ids: Sequence[str]) -> List[Optional[StationRecord]]:
+        """
+        Resolve many station ids at once.
+
+        Args:
+            station_ids: Ids to look up (exact match)
+
+        Returns:
+            The record for each id, in input order, or None where an id is not present.
+        """
+        stations = self.stations
+        return [None if p is None else stations[p] for p in map(self.index.position_of, station_ids)]
+
+    def lookup_codes(self, codes: Sequence[str]) -> List[List[StationRecord]]:
+        """
+        Resolve many station codes at once.
+
+        Args:
+            codes: Codes to look up (case-insensitive)
+
+        Returns:
+            The stations holding each code, in input order; an empty list where none do.
+        """
+        stations = self.stations
+        return [[stations[p] for p in self.rows(code=code)] if code.strip() else [] for code in codes]
+
+    def page(self, city: FilterValues = '', code: FilterValues = '', after: Optional[int] = None,
+             limit: Optional[int] = None, name: FilterValues = '', id: FilterValues = '') -> StationPage:
+        """
+        Return one page of valid stations matching all filters.
+
+        Args:
+            city: City name, or any of several, to match (case-insensitive); empty means no filter
+            code: Station code, or any of several, to match (case-insensitive); empty means no filter
+            after: Position of the last row already returned, or None to start
+            limit: Maximum stations in the page, or None for all remaining
+            name: Full station name, or any of several, to match; empty means no filter
+            id: Station id, or any of several, to match (exact); empty means no filter
+
+        Returns:
+            StationPage with the records, their positions and whether more follow.
+        """
+        rows, has_more = page_rows(self.rows(city=city, code=code, name=name, id=id), after, limit)
+        return StationPage([self.stations[p] for p in rows], rows, has_more)
+
+    def stream(self, city: FilterValues = '', code: FilterValues = '', after: Optional[int] = None,
+               limit: Optional[int] = None, name: FilterValues = '', id: FilterValues = '') -> Iterator[StationRecord]:
+        """Yield the stations ``page`` would return, one at a time."""
+        rows, _ = page_rows(self.rows(city=city, code=code, name=name, id=id), after, limit)
+        stations = self.stations
+        for position in rows:
+            yield stations[position]
+
+    @property
+    def search_index(self) -> NameSearchIndex:
+        """Name search index, built on first use."""
+        if self._search_index is None:
+            with self._index_lock:
+                if self._search_index is None:
+                    self._search_index = NameSearchIndex([station.name for station in self.stations])
+        return self._search_index
+
+    def search(self, query: str, limit: int = 10) -> List[StationRecord]:
+        """
+        Return stations whose names best match a typeahead query.
+
+        Args:
+            query: Text typed by the user
+            limit: Maximum results
+
+        Returns:
+            Up to ``limit`` station records, best match first.
+        """
+        stations = self.stations
+        return [stations[p] for p in self.search_index.search(query, limit)]
+
+    @property
+    def geo_index(self) -> GeoGridIndex:
+        """Grid index over the stations with a position, built on first use."""
+        if self._geo_index is None:
+            with self._index_lock:
+                if self._geo_index is None:
+                    self._geo_index = GeoGridIndex([
+                        (position, station.lat, station.lon)
+                        for position, station in enumerate(self.stations) if station.lat is not None
+                    ])
+        return self._geo_index
+
+    def nearby(self, lat: float, lon: float, radius_km: Optional[float] = None,
+               k: int = 10) -> List[Tuple[StationRecord, float]]:
+        """
+        Return the stations nearest a point.
+
+        Args:
+            lat: Latitude of the point
+            lon: Longitude of the point
+            radius_km: Only return stations within this distance; None for any distance
+            k: Maximum results
+
+        Returns:
+            Up to ``k`` (station record, distance in km) pairs, nearest first.
+        """
+        stations = self.stations
+        return [(stations[p], distance) for p, distance in self.geo_index.nearby(lat, lon, radius_km, k)]
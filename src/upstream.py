@@ -0,0 +1,521 @@
+"""
+Clients for an upstream station API.
+
+The upstream serves the same ``GET /stations`` interface as this service
+(``city``, ``code``, ``name``, ``id``, ``limit`` and ``cursor`` parameters,
+a JSON list body and an ``X-Next-Cursor`` header), so a deployment can front another
+station service, such as the legacy API this endpoint was migrated from.
+It is configured with STATIONS_UPSTREAM_URL.
+
+``StationUpstream`` is the blocking client used by the Flask app. It keeps
+connections alive in a pooled ``requests.Session``, caches pages for a
+short TTL and coalesces concurrent fetches of the same page, so a cold
+page requested by many threads at once costs one upstream call.
+
+``AsyncStationUpstream`` is the non-blocking client used by the ASGI
+serving mode (src/asgi.py). It speaks HTTP/1.1 over asyncio streams
+through ``AsyncHttpPool``, which keeps upstream connections alive between
+calls, so a worker can have many calls in flight without opening a
+connection for each. It caches and coalesces pages like the blocking client.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import SplitResult, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Query parameters passed through to the upstream; projections are applied locally,
+# after the full records have been validated
+FORWARDED_PARAMS = ('city', 'code', 'name', 'id', 'limit', 'cursor')
+
+
+class UpstreamError(RuntimeError):
+    """Raised when the upstream fails, answers with an error or sends a malformed body."""
+
+
+class UpstreamTimeout(UpstreamError):
+    """Raised when the upstream does not answer in time."""
+
+
+def parse_station_payload(payload: Any) -> List[Any]:
+    """
+    Check an upstream body has the shape of a /stations response.
+
+    Records are not validated here; callers validate each one.
+
+    Raises:
+        UpstreamError: If the body is not a JSON list
+    """
+    if not isinstance(payload, list):
+        raise UpstreamError("Upstream station response is not a list")
+    return payload
+
+
+def _split_base_url(base_url: str) -> SplitResult:
+    """
+    Parse and check an upstream root URL.
+
+    Raises:
+        ValueError: If the URL is not http or https or has no host
+    """
+    parts = urlsplit(base_url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError(f"Upstream URL must be http(s)://host[:port][/path]: {base_url!r}")
+    return parts
+
+
+def _forwarded_query(params: Dict[str, str]) -> Dict[str, str]:
+    """Keep the non-empty parameters the upstream understands."""
+    return {name: params[name] for name in FORWARDED_PARAMS if params.get(name)}
+
+
+# A fetched page: (raw records, next-page cursor or None)
+Page = Tuple[List[Any], Optional[str]]
+
+
+def _page_key(params: Dict[str, str]) -> Hashable:
+    """Cache and coalescing key for a page: its forwarded query."""
+    return tuple(sorted(_forwarded_query(params).items()))
+
+
+class _PageCache:
+    """
+    Pages by forwarded query, each fresh for ``ttl`` seconds, least recently
+    used first out once ``max_entries`` is reached. Not thread-safe; callers
+    serialize access.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Page]]' = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Page]:
+        """Return the cached page for a key, or None if it is missing or stale."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, page: Page) -> None:
+        """Cache a page, evicting the least recently used pages over the bound."""
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, page)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class _Flight:
+    """An upstream fetch in progress that other callers can wait on."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Page] = None
+        self.error: Optional[UpstreamError] = None
+
+
+class StationUpstream:
+    """
+    Blocking client for an upstream /stations API, with a TTL cache and
+    single-flight coalescing.
+
+    Pages are cached per forwarded query for ``cache_ttl`` seconds, least
+    recently used first out once ``cache_max_entries`` is reached. When a
+    page is not cached, the first caller fetches it and concurrent callers
+    for the same page wait for that result instead of calling the upstream
+    themselves. A failed fetch is not cached; its waiters get the same
+    error. Coalescing is per process, so each gunicorn worker makes at
+    most one call per cold page.
+
+    Like ConnectionPool (src/repository.py), a forked child (a gunicorn
+    worker forked from a preloaded master) starts with a new session,
+    cache and lock instead of sharing the parent's kept-alive sockets.
+    """
+
+    def __init__(self, base_url: str, pool_size: int = 100, timeout: float = 5.0,
+                 cache_ttl: float = 10.0, cache_max_entries: int = 256):
+        """
+        Args:
+            base_url: Upstream root URL, e.g. http://legacy-stations:8080/api
+            pool_size: Most kept-alive upstream connections
+            timeout: Seconds allowed to connect, and between bytes of the response
+            cache_ttl: Seconds a fetched page is served from the cache (0 disables caching)
+            cache_max_entries: Most cached pages
+
+        Raises:
+            ValueError: If the URL is not http or https or has no host
+        """
+        _split_base_url(base_url)
+        self.base_url = base_url
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cache_max_entries = cache_max_entries
+        self.pool_size = pool_size
+        self._url = base_url.rstrip('/') + '/stations'
+        self._reset()
+
+    def _reset(self) -> None:
+        # The parent's connections are left open for the parent rather than closed
+        self._pid = os.getpid()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Accept'] = 'application/json'
+        self._cache = _PageCache(self.cache_ttl, self.cache_max_entries)
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def _check_process(self) -> None:
+        """Start afresh in a forked child, so it never reuses the parent's sockets."""
+        if self._pid != os.getpid():
+            self._reset()
+
+    def fetch_stations(self, params: Dict[str, str]) -> Tuple[List[Any], Optional[str]]:
+        """
+        Fetch one page of raw station records, bypassing the cache.
+
+        Args:
+            params: Query parameters; only FORWARDED_PARAMS are sent
+
+        Returns:
+            Tuple of (raw records, next-page cursor or None)
+
+        Raises:
+            UpstreamTimeout: If the upstream does not answer in time
+            UpstreamError: If the call fails or the response is not a station list
+        """
+        self._check_process()
+        try:
+            response = self.session.get(self._url, params=_forwarded_query(params), timeout=self.timeout)
+        except requests.Timeout as e:
+            raise UpstreamTimeout(f"Upstream did not answer within {self.timeout}s") from e
+        except requests.RequestException as e:
+            raise UpstreamError(f"Upstream call failed: {e}") from e
+        if response.status_code != 200:
+            raise UpstreamError(f"Upstream answered {response.status_code}")
+        try:
+            payload = json.loads(response.content)
+        except ValueError as e:
+            raise UpstreamError(f"Upstream sent invalid JSON: {e}") from e
+        return parse_station_payload(payload), response.headers.get('X-Next-Cursor')
+
+    def get_stations(self, params: Dict[str, str]) -> Tuple[List[Any], Optional[str], str]:
+        """
+        Return one page of raw station records, from the cache when fresh.
+
+        Args:
+            params: Query parameters; only FORWARDED_PARAMS are used
+
+        Returns:
+            Tuple of (raw records, next-page cursor or None, source), where
+            source is 'hit', 'miss' (fetched by this call) or 'coalesced'
+            (fetched by a concurrent call). Callers must not modify the records.
+
+        Raises:
+            UpstreamTimeout: If the upstream does not answer in time
+            UpstreamError: If the call fails or the response is not a station list
+        """
+        self._check_process()
+        key = _page_key(params)
+        with self._lock:
+            page = self._cache.get(key)
+            if page is not None:
+                return page + ('hit',)
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            # The leader's call is bounded by the same timeout
+            if not flight.done.wait(self.timeout * 2):
+                raise UpstreamTimeout(f"Upstream did not answer within {self.timeout}s")
+            if flight.error is not None:
+                raise type(flight.error)(*flight.error.args)
+            return flight.result + ('coalesced',)
+
+        try:
+            flight.result = self.fetch_stations(params)
+        except UpstreamError as e:
+            flight.error = e
+            raise
+        except Exception as e:
+            flight.error = UpstreamError(f"Upstream call failed: {e!r}")
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.result is not None:
+                    self._cache.put(key, flight.result)
+            flight.done.set()
+        return flight.result + ('miss',)
+
+    def clear(self) -> None:
+        """Drop all cached pages."""
+        with self._lock:
+            self._cache.clear()
+
+    def close(self) -> None:
+        """Close pooled upstream connections."""
+        self.session.close()
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], bytes, bool]:
+    """Read one response; return status, lower-cased headers, body and whether the connection stays open."""
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    version, status_text = head[0].split(' ', 2)[:2]
+    status = int(status_text)
+    headers: Dict[str, str] = {}
+    for line in head[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+    if status < 200 or status in (204, 304):
+        body = b''
+    elif 'chunked' in headers.get('transfer-encoding', '').lower():
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';', 1)[0], 16)
+            if size == 0:
+                # Skip any trailers up to the blank line ending the message
+                while await reader.readuntil(b'\r\n') != b'\r\n':
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        body = b''.join(chunks)
+    elif 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    else:
+        # Framed by connection close
+        body = await reader.read()
+        keep_alive = False
+    return status, headers, body, keep_alive
+
+
+class AsyncHttpPool:
+    """
+    Minimal HTTP/1.1 client with a bounded pool of kept-alive connections.
+
+    Supports what the upstream needs: GET requests, with responses framed
+    by Content-Length, chunked encoding or connection close. Like
+    ConnectionPool (src/repository.py), connections are opened lazily up
+    to ``max_connections`` and reused most recently used first, and a
+    caller that finds them all busy waits. A request sent on a kept-alive
+    connection the upstream has since closed is retried on another one.
+    asyncio streams belong to one event loop, so a pool used from a new
+    loop starts empty.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 100, timeout: float = 5.0):
+        """
+        Args:
+            base_url: Upstream root URL, e.g. http://legacy-stations:8080/api
+            max_connections: Most connections open at once
+            timeout: Seconds allowed for a whole request, including waiting for a connection
+
+        Raises:
+            ValueError: If the URL is not http or https or has no host
+        """
+        parts = _split_base_url(base_url)
+        if max_connections < 1:
+            raise ValueError("max_connections must be at least 1")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.tls = parts.scheme == 'https'
+        self.base_path = parts.path.rstrip('/')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._host_header = parts.netloc
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _bind(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._idle = []
+            self._slots = asyncio.Semaphore(self.max_connections)
+
+    async def get(self, path: str, params: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Send a GET request.
+
+        Args:
+            path: Path below the base URL, e.g. /stations
+            params: Query parameters
+
+        Returns:
+            Tuple of (status, lower-cased headers, body)
+
+        Raises:
+            UpstreamTimeout: If the request does not complete within ``timeout``
+            UpstreamError: If the connection fails or the response is malformed
+        """
+        self._bind()
+        target = self.base_path + path + (f"?{urlencode(params)}" if params else '')
+        request = (f"GET {target} HTTP/1.1\r\nHost: {self._host_header}\r\n"
+                   f"Accept: application/json\r\n\r\n").encode('latin-1')
+        try:
+            return await asyncio.wait_for(self._send(request), self.timeout)
+        except asyncio.TimeoutError as e:
+            raise UpstreamTimeout(f"Upstream did not answer within {self.timeout}s") from e
+
+    async def _send(self, request: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        async with self._slots:
+            while True:
+                reused = bool(self._idle)
+                if reused:
+                    reader, writer = self._idle.pop()
+                else:
+                    try:
+                        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.tls or None)
+                    except OSError as e:
+                        raise UpstreamError(f"Cannot connect to upstream: {e}") from e
+                try:
+                    writer.write(request)
+                    status, headers, body, keep_alive = await _read_response(reader)
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    writer.close()
+                    if reused:
+                        # Closed by the upstream while idle
+                        continue
+                    raise UpstreamError(f"Upstream connection failed: {e!r}") from e
+                except (ValueError, asyncio.LimitOverrunError) as e:
+                    writer.close()
+                    raise UpstreamError(f"Malformed upstream response: {e}") from e
+                except BaseException:
+                    # Cancelled mid-response: the connection is in an unknown state
+                    writer.close()
+                    raise
+                if keep_alive:
+                    self._idle.append((reader, writer))
+                else:
+                    writer.close()
+                return status, headers, body
+
+    async def aclose(self) -> None:
+        """Close idle connections."""
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+
+class AsyncStationUpstream:
+    """
+    Non-blocking client for an upstream /stations API, with the same TTL
+    cache and single-flight coalescing as StationUpstream.
+
+    Coalescing waits on the leader's task, so it applies to callers on one
+    event loop; a worker runs one loop, so it makes at most one call per
+    cold page.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 100, timeout: float = 5.0,
+                 cache_ttl: float = 10.0, cache_max_entries: int = 256):
+        """
+        Args:
+            base_url: Upstream root URL
+            max_connections: Most upstream connections open at once; idle ones are kept alive
+            timeout: Seconds allowed per call
+            cache_ttl: Seconds a fetched page is served from the cache (0 disables caching)
+            cache_max_entries: Most cached pages
+        """
+        self.base_url = base_url
+        self.http = AsyncHttpPool(base_url, max_connections, timeout)
+        self._cache = _PageCache(cache_ttl, cache_max_entries)
+        self._flights: Dict[Hashable, 'asyncio.Future[Page]'] = {}
+
+    async def fetch_stations(self, params: Dict[str, str]) -> Tuple[List[Any], Optional[str]]:
+        """
+        Fetch one page of raw station records.
+
+        Args:
+            params: Query parameters; only FORWARDED_PARAMS are sent
+
+        Returns:
+            Tuple of (raw records, next-page cursor or None)
+
+        Raises:
+            UpstreamTimeout: If the upstream does not answer in time
+            UpstreamError: If the call fails or the response is not a station list
+        """
+        status, headers, body = await self.http.get('/stations', _forwarded_query(params))
+        if status != 200:
+            raise UpstreamError(f"Upstream answered {status}")
+        try:
+            payload = json.loads(body)
+        except ValueError as e:
+            raise UpstreamError(f"Upstream sent invalid JSON: {e}") from e
+        return parse_station_payload(payload), headers.get('x-next-cursor')
+
+    async def get_stations(self, params: Dict[str, str]) -> Tuple[List[Any], Optional[str], str]:
+        """
+        Return one page of raw station records, from the cache when fresh.
+
+        Args:
+            params: Query parameters; only FORWARDED_PARAMS are used
+
+        Returns:
+            Tuple of (raw records, next-page cursor or None, source), where
+            source is 'hit', 'miss' (fetched by this call) or 'coalesced'
+            (fetched by a concurrent call). Callers must not modify the records.
+
+        Raises:
+            UpstreamTimeout: If the upstream does not answer in time
+            UpstreamError: If the call fails or the response is not a station list
+        """
+        key = _page_key(params)
+        page = self._cache.get(key)
+        if page is not None:
+            return page + ('hit',)
+        flight = self._flights.get(key)
+        if flight is not None:
+            # Shielded so a cancelled waiter does not cancel the leader's fetch
+            return await asyncio.shield(flight) + ('coalesced',)
+
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            page = await self.fetch_stations(params)
+        except BaseException as e:
+            # Waiters get an UpstreamError even if this call was cancelled
+            flight.set_exception(e if isinstance(e, UpstreamError) else UpstreamError(f"Upstream call failed: {e!r}"))
+            # Mark it retrieved, so an error nobody waited for is not logged as unhandled
+            flight.exception()
+            raise
+        else:
+            self._cache.put(key, page)
+            flight.set_result(page)
+        finally:
+            del self._flights[key]
+        return page + ('miss',)
+
+    def clear(self) -> None:
+        """Drop all cached pages."""
+        self._cache.clear()
+
+    async def aclose(self) -> None:
+        """Close pooled upstream connections."""
+        await self.http.aclose()
@@ -0,0 +1,64 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+class StubUpstream:
+    """Local HTTP server answering every GET with the configured response."""
+
+    def __init__(self):
+        self.status = 200
+        self.body = b'[]'
+        self.headers = {}
+        self.delay = 0.0
+        self.requests = []
+        self.client_ports = set()
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests.append(self.path)
+                    stub.client_ports.add(self.client_address[1])
+                if stub.delay:
+                    threading.Event().wait(stub.delay)
+                self.send_response(stub.status)
+                for name, value in stub.headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(stub.body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(stub.body)
+                except ConnectionError:
+                    # The client gave up waiting
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def respond(self, payload, status=200, headers=None):
+        """Set the JSON payload, status and headers of later responses."""
+        self.body = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        self.status = status
+        self.headers = headers or {}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stub_upstream():
+    """Run a stub upstream station API on a free local port."""
+    stub = StubUpstream()
+    yield stub
+    stub.close()
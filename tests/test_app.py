@@ -1,6 +1,12 @@
 import pytest
-from src.app import app, _validate_station_data
-from unittest.mock import patch, Mock
+from src.app import app, metrics, reload_station_data, warm_up, _build_station_store, _validate_station_data
+from src.repository import open_sqlite_repository
+from src.response_cache import ResponseCache
+from src.station_source import StationFileSource
+from src.compression import compress as compress_body
+from src.upstream import StationUpstream
+from unittest.mock import patch
+import gzip
 import json
 
 @pytest.fixture
@@ -16,6 +22,47 @@ def test_hello(client):
     assert response.status_code == 200
     assert response.get_json() == {'message': 'Hello, world!'}
 
+def test_ready_after_warm_up(client, monkeypatch):
+    """Test /ready answers 503 until warm-up has pre-serialized the hot responses."""
+    monkeypatch.setattr('src.app._ready_seconds', None)
+    monkeypatch.setattr('src.app.WARMUP_PATHS', ('/stations', '/stations/search?q=station'))
+    cache = ResponseCache()
+    monkeypatch.setattr('src.app._response_cache', cache)
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert client.get('/hello').status_code == 200
+    
+    seconds = warm_up()
+    assert seconds > 0
+    assert warm_up() == seconds
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'ready', 'ready_seconds': round(seconds, 3)}
+    
+    assert len(cache) == 1
+    client.get('/stations', headers={'Accept-Encoding': 'gzip'})
+    assert cache.misses == 1
+
+def test_warm_up_skips_upstream_backed_paths(monkeypatch, stub_upstream):
+    """Test warm-up makes no upstream calls, so forked workers inherit no upstream connection."""
+    monkeypatch.setattr('src.app._ready_seconds', None)
+    monkeypatch.setattr('src.app.WARMUP_PATHS', ('/stations', '/stations?city=Boston', '/stations/search?q=station'))
+    store = _build_station_store()
+    monkeypatch.setattr('src.app._station_store', store)
+    monkeypatch.setattr('src.app._station_upstream', StationUpstream(stub_upstream.url))
+    warm_up()
+    assert stub_upstream.requests == []
+    assert store._search_index is not None
+
+def test_warm_up_requests_left_out_of_metrics(monkeypatch):
+    """Test warm-up traffic does not show up in the request latency histogram."""
+    monkeypatch.setattr('src.app._ready_seconds', None)
+    monkeypatch.setattr('src.app.WARMUP_PATHS', ('/stations/nearby?lat=0&lon=0&radius=1',))
+    warm_up()
+    assert 'route="/stations/nearby"' not in metrics.render()
+    assert 'stations_ready_seconds 0.0' not in metrics.render()
+
 def test_get_stations_success(client):
     """Test successful retrieval of stations."""
     response = client.get('/stations')
@@ -37,7 +84,9 @@ def test_get_stations_success(client):
         "id": "st001",
         "name": "Union Station",
         "city": "New York",
-        "code": "NYS"
+        "code": "NYS",
+        "lat": 40.7527,
+        "lon": -73.9772
     }
     assert station == expected_station
 
@@ -159,13 +208,15 @@ def test_stations_response_structure(client):
     for station in data:
         # Each station should match the Station type from RAML
         assert isinstance(station, dict)
-        assert len(station) == 4  # id, name, city, code
+        assert set(station) <= {'id', 'name', 'city', 'code', 'lat', 'lon'}
         
         # Verify field types
         assert isinstance(station['id'], str)
         assert isinstance(station['name'], str)
         assert isinstance(station['city'], str)
         assert isinstance(station['code'], str)
+        assert isinstance(station.get('lat', 0.0), float)
+        assert isinstance(station.get('lon', 0.0), float)
 
 def test_stations_example_data_matches_raml(client):
     """Test that response includes the example data from RAML specification."""
@@ -272,4 +323,455 @@ def test_filter_stations_whitespace_parameters(client):
     assert response.status_code == 200
     
     data = response.get_json()
-    assert len(data) == 5  # All stations should be returned
\ No newline at end of file
+    assert len(data) == 5  # All stations should be returned
+
+def test_filter_stations_reflects_replaced_data(client):
+    """Test that replacing STATIONS_DATA rebuilds the lookup indexes."""
+    replacement = [
+        {"id": "st100", "name": "Harbor Station", "city": "Seattle", "code": "SEA"}
+    ]
+    with patch('src.app.STATIONS_DATA', replacement):
+        response = client.get('/stations?city=seattle')
+        assert response.status_code == 200
+        assert response.get_json() == replacement
+
+        response = client.get('/stations?city=New York')
+        assert response.get_json() == []
+
+def test_get_stations_skips_quarantined_records(client):
+    """Test that invalid records are rejected at ingest, not per request."""
+    replacement = [
+        {"id": "st100", "name": "Harbor Station", "city": "Seattle", "code": "SEA"},
+        {"id": "st101", "name": "   ", "city": "Seattle", "code": "SEB"}
+    ]
+    with patch('src.app.STATIONS_DATA', replacement), \
+            patch('src.app._validate_station_data', wraps=_validate_station_data) as validator:
+        for _ in range(3):
+            response = client.get('/stations?city=Seattle')
+            assert response.get_json() == replacement[:1]
+        assert validator.call_count == len(replacement)
+
+def test_get_stations_sets_strong_etag(client):
+    """Test that stations responses carry a strong ETag."""
+    response = client.get('/stations')
+    etag, weak = response.get_etag()
+    assert etag
+    assert not weak
+
+def test_get_stations_not_modified(client):
+    """Test that a matching If-None-Match returns 304 with no body."""
+    etag, _ = client.get('/stations?city=Chicago').get_etag()
+    
+    response = client.get('/stations?city=Chicago', headers={'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.get_etag()[0] == etag
+
+def test_get_stations_etag_differs_per_filter(client):
+    """Test that a stale ETag from another filter returns the full body."""
+    etag, _ = client.get('/stations?city=Chicago').get_etag()
+    
+    response = client.get('/stations?city=Boston', headers={'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 200
+    assert response.get_json()[0]['code'] == 'BOS'
+
+def test_get_stations_cache_shared_across_equivalent_filters(client):
+    """Test that filters differing only in case share one cached body."""
+    first = client.get('/stations?city=new york')
+    second = client.get('/stations?city=NEW YORK ')
+    assert first.get_etag() == second.get_etag()
+    assert first.data == second.data
+
+def test_get_stations_etag_changes_with_data(client):
+    """Test that replacing the station data invalidates cached bodies."""
+    etag, _ = client.get('/stations').get_etag()
+    replacement = [
+        {"id": "st100", "name": "Harbor Station", "city": "Seattle", "code": "SEA"}
+    ]
+    with patch('src.app.STATIONS_DATA', replacement):
+        response = client.get('/stations', headers={'If-None-Match': f'"{etag}"'})
+        assert response.status_code == 200
+        assert response.get_json() == replacement
+
+def test_get_stations_gzip_negotiated(client, monkeypatch):
+    """Test that clients accepting gzip get a gzip body with its own ETag, reused from the cache."""
+    monkeypatch.setattr('src.app.COMPRESSION_MIN_BYTES', 0)
+    monkeypatch.setattr('src.app.COMPRESSION_ENCODINGS', ('gzip',))
+    plain = client.get('/stations')
+    
+    with patch('src.response_cache.compress', wraps=compress_body) as compress:
+        for _ in range(2):
+            response = client.get('/stations', headers={'Accept-Encoding': 'gzip, deflate'})
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert 'Accept-Encoding' in response.headers['Vary']
+            assert gzip.decompress(response.data) == plain.data
+        assert compress.call_count == 1
+    
+    etag, _ = response.get_etag()
+    assert etag != plain.get_etag()[0]
+    response = client.get('/stations', headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 304
+
+def test_json_responses_compressed_per_request(client, monkeypatch):
+    """Test that uncached JSON responses are compressed only when large enough."""
+    monkeypatch.setattr('src.app.COMPRESSION_ENCODINGS', ('gzip',))
+    response = client.get('/stations/search?q=sta', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    
+    monkeypatch.setattr('src.app.COMPRESSION_MIN_BYTES', 0)
+    response = client.get('/stations/search?q=sta', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.data))[0]['id']
+    assert 'Content-Encoding' not in client.get('/stations/search?q=sta').headers
+
+def test_filter_stations_multiple_values(client):
+    """Test comma-separated and repeated filter values match any of them."""
+    response = client.get('/stations?city=Boston,chicago')
+    assert [s['id'] for s in response.get_json()] == ['st002', 'st005']
+    response = client.get('/stations?code=nys&code=PHL,zzz')
+    assert [s['id'] for s in response.get_json()] == ['st001', 'st004']
+
+def test_filter_stations_by_name_and_id(client):
+    """Test the name filter matches whole names and composes with id and city."""
+    assert [s['id'] for s in client.get('/stations?name=penn  STATION').get_json()] == ['st004']
+    assert client.get('/stations?name=Penn').get_json() == []
+    response = client.get('/stations?id=st005,st001,nope&city=boston')
+    assert [s['id'] for s in response.get_json()] == ['st005']
+
+def test_filter_stations_cache_shared_across_value_order(client):
+    """Test reordered or duplicated filter values share one cached body."""
+    first = client.get('/stations?city=Boston,Chicago')
+    second = client.get('/stations?city=chicago&city=boston,Boston')
+    assert first.get_etag() == second.get_etag()
+
+def test_filter_stations_too_many_values(client):
+    """Test a filter with more than the allowed number of values returns 400."""
+    ids = ','.join(f'st{n:03}' for n in range(101))
+    assert client.get(f'/stations?id={ids}').status_code == 400
+
+def test_get_stations_fields_projection(client):
+    """Test fields= returns only the requested fields, in JSON and NDJSON."""
+    response = client.get('/stations?fields=code,id&code=nys,chi')
+    assert response.get_json() == [{'code': 'NYS', 'id': 'st001'}, {'code': 'CHI', 'id': 'st002'}]
+    assert list(response.get_json()[0]) == ['code', 'id']
+    assert response.get_etag() != client.get('/stations?code=nys,chi').get_etag()
+    
+    response = client.get('/stations?stream=ndjson&fields=name&limit=2')
+    assert [json.loads(line) for line in response.data.splitlines()] == [
+        {'name': 'Union Station'}, {'name': 'Central Station'}]
+
+@pytest.mark.parametrize("query", ["fields=", "fields=,", "fields=%20", "fields=foo", "fields=id,platforms"])
+def test_get_stations_invalid_fields(client, query):
+    """Test a projection naming no field, or an unknown field, returns 400."""
+    assert client.get(f'/stations?{query}').status_code == 400
+
+def test_get_stations_unknown_field_message(client):
+    """Test the 400 for an unknown field names it and the accepted fields."""
+    error = client.get('/stations?fields=id,foo').get_json()['message']
+    assert 'foo' in error
+    assert 'id, name, city, code, lat, lon' in error
+
+def test_get_stations_fields_skip_missing(client):
+    """Test fields a station does not have are left out of its object."""
+    replacement = [
+        {"id": "st100", "name": "Harbor Station", "city": "Seattle", "code": "SEA"},
+        {"id": "st101", "name": "Pier Station", "city": "Seattle", "code": "PIE", "lat": 47.6, "lon": -122.3}
+    ]
+    with patch('src.app.STATIONS_DATA', replacement):
+        assert client.get('/stations?fields=id,lat').get_json() == [{'id': 'st100'}, {'id': 'st101', 'lat': 47.6}]
+
+def test_get_stations_pagination_walks_all_pages(client):
+    """Test that following X-Next-Cursor returns every station exactly once."""
+    all_stations = client.get('/stations').get_json()
+    
+    collected = []
+    response = client.get('/stations?limit=2')
+    while True:
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page) <= 2
+        collected.extend(page)
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+        response = client.get(f'/stations?limit=2&cursor={cursor}')
+    
+    assert collected == all_stations
+
+def test_get_stations_pagination_with_filter(client):
+    """Test that pagination applies to filtered results."""
+    response = client.get('/stations?city=Chicago&limit=1')
+    assert response.status_code == 200
+    assert [s['code'] for s in response.get_json()] == ['CHI']
+    assert 'X-Next-Cursor' not in response.headers
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=abc", "cursor=bogus", "stream=csv"])
+def test_get_stations_invalid_pagination_parameters(client, query):
+    """Test that invalid pagination parameters return 400."""
+    response = client.get(f'/stations?{query}')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Bad request'
+
+def test_get_stations_invalid_limit_message(client):
+    """Test that a non-numeric limit gets a clean error message."""
+    response = client.get('/stations?limit=abc')
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'limit must be a positive integer'
+
+def test_get_stations_ndjson_stream(client):
+    """Test that stream=ndjson returns one station per line."""
+    response = client.get('/stations?stream=ndjson')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    
+    lines = response.data.decode('utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == client.get('/stations').get_json()
+
+def test_get_stations_ndjson_stream_with_filter_and_limit(client):
+    """Test that streaming honours filters and limit."""
+    response = client.get('/stations?stream=ndjson&limit=1')
+    lines = response.data.decode('utf-8').splitlines()
+    assert len(lines) == 1
+    
+    response = client.get('/stations?stream=ndjson&code=bos')
+    assert [json.loads(line)['code'] for line in response.data.decode('utf-8').splitlines()] == ['BOS']
+
+def test_metrics_endpoint_prometheus_format(client):
+    """Test that /metrics exposes request histograms in Prometheus text format."""
+    client.get('/stations')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    
+    text = response.get_data(as_text=True)
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert 'http_request_duration_seconds_count{route="/stations",method="GET",status="200"}' in text
+    assert 'http_response_size_bytes_count{route="/stations"}' in text
+    assert 'stations_loaded 5' in text
+
+def test_metrics_count_filter_hits_and_misses(client):
+    """Test that filtered lookups are counted by filter and result."""
+    hit = (('filter', 'city'), ('result', 'hit'))
+    miss = (('filter', 'city+code'), ('result', 'miss'))
+    hits_before = metrics.value('stations_filter_requests_total', hit)
+    misses_before = metrics.value('stations_filter_requests_total', miss)
+    
+    client.get('/stations?city=Chicago')
+    client.get('/stations?city=Chicago&code=NYS')
+    
+    assert metrics.value('stations_filter_requests_total', hit) == hits_before + 1
+    assert metrics.value('stations_filter_requests_total', miss) == misses_before + 1
+
+def test_metrics_count_validation_failures(client):
+    """Test that records rejected at ingest are counted."""
+    before = metrics.value('stations_validation_failures_total')
+    replacement = [
+        {"id": "st100", "name": "Harbor Station", "city": "Seattle", "code": "SEA"},
+        {"id": "st101", "name": "", "city": "Seattle", "code": "SEB"}
+    ]
+    with patch('src.app.STATIONS_DATA', replacement):
+        client.get('/stations')
+        assert metrics.value('stations_validation_failures_total') == before + 1
+
+def test_metrics_label_unmatched_routes(client):
+    """Test that unknown paths share one route label."""
+    client.get('/does-not-exist')
+    labels = (('route', 'unmatched'), ('method', 'GET'), ('status', '404'))
+    assert metrics.value('http_request_duration_seconds', labels) >= 1
+
+def test_get_stations_from_database_backend(client, tmp_path):
+    """Test that /stations serves filtered pages from a SQLite repository."""
+    repository = open_sqlite_repository(str(tmp_path / "stations.db"))
+    repository.replace_stations([
+        {"id": "st100", "name": "Harbor Station", "city": "Seattle", "code": "SEA"},
+        {"id": "st101", "name": "King Street", "city": "Seattle", "code": "SKS"},
+        {"id": "st102", "name": "Union Station", "city": "Portland", "code": "PDX"}
+    ], _validate_station_data)
+    with patch('src.app._station_repository', repository):
+        response = client.get('/stations?city=SEATTLE&limit=1')
+        assert [s['id'] for s in response.get_json()] == ['st100']
+        
+        response = client.get(f"/stations?city=seattle&limit=1&cursor={response.headers['X-Next-Cursor']}")
+        assert [s['id'] for s in response.get_json()] == ['st101']
+        assert 'X-Next-Cursor' not in response.headers
+        
+        response = client.get('/stations?stream=ndjson&code=pdx')
+        assert [json.loads(line)['id'] for line in response.data.splitlines()] == ['st102']
+    repository.pool.close()
+
+def test_get_stations_follows_database_reloaded_elsewhere(client, tmp_path):
+    """Test that cached /stations bodies and ETags are dropped after another process reloads the database."""
+    path = str(tmp_path / "stations.db")
+    repository = open_sqlite_repository(path, check_interval=0)
+    repository.replace_stations([
+        {"id": "st100", "name": "Harbor Station", "city": "Seattle", "code": "SEA"},
+        {"id": "st101", "name": "King Street", "city": "Seattle", "code": "SKS"}
+    ], _validate_station_data)
+    with patch('src.app._station_repository', repository):
+        response = client.get('/stations')
+        assert [s['id'] for s in response.get_json()] == ['st100', 'st101']
+        etag = response.headers['ETag']
+        
+        loader = open_sqlite_repository(path)
+        loader.replace_stations([{"id": "st101", "name": "King Street", "city": "Seattle", "code": "SKS"}],
+                                _validate_station_data)
+        loader.pool.close()
+        
+        response = client.get('/stations', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert [s['id'] for s in response.get_json()] == ['st101']
+        assert response.headers['ETag'] != etag
+        assert client.get('/stations/search?q=harbor').get_json() == []
+    repository.pool.close()
+
+def test_get_stations_from_station_file(client, tmp_path):
+    """Test that /stations serves the latest snapshot of a watched station file."""
+    path = tmp_path / "stations.ndjson"
+    path.write_text(json.dumps({"id": "st100", "name": "Harbor Station", "city": "Seattle", "code": "SEA"}) + "\n")
+    source = StationFileSource(str(path), _build_station_store)
+    with patch('src.app._station_file', source):
+        assert [s['id'] for s in client.get('/stations').get_json()] == ['st100']
+        
+        path.write_text(json.dumps({"id": "st101", "name": "King Street", "city": "Seattle", "code": "SKS"}) + "\n")
+        reload_station_data()
+        assert [s['id'] for s in client.get('/stations').get_json()] == ['st101']
+
+def test_search_and_geo_indexes_built_on_first_use(client):
+    """Test that loading the data leaves the search and geo indexes until their endpoints need them."""
+    store = _build_station_store()
+    assert store._search_index is None and store._geo_index is None
+    with patch('src.app._station_store', store):
+        client.get('/stations/search?q=union')
+        assert store._search_index is not None and store._geo_index is None
+        client.get('/stations/nearby?lat=0&lon=0')
+        assert store._geo_index is not None
+
+def test_search_stations_ranks_prefix_matches(client):
+    """Test that search returns name-prefix matches before later-word matches."""
+    response = client.get('/stations/search?q=central')
+    assert response.status_code == 200
+    assert [s['id'] for s in response.get_json()] == ['st002', 'st003']
+    assert len(response.get_json()[0]) == 6
+
+def test_search_stations_typo_and_limit(client):
+    """Test that search tolerates typos and honours the limit."""
+    assert [s['id'] for s in client.get('/stations/search?q=pen%20staton').get_json()] == ['st004']
+    assert [s['id'] for s in client.get('/stations/search?q=unon&limit=5').get_json()] == ['st001']
+    assert len(client.get('/stations/search?q=station&limit=1').get_json()) == 1
+
+@pytest.mark.parametrize("query", ["", "?q=", "?q=%20%20", "?q=union&limit=0"])
+def test_search_stations_rejects_invalid_parameters(client, query):
+    """Test that a missing query or bad limit is a 400."""
+    response = client.get(f'/stations/search{query}')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Bad request'
+
+def test_validate_station_data_coordinates():
+    """Test coordinates are optional but must be paired and in range."""
+    station = {"id": "st001", "name": "Test Station", "city": "Test City", "code": "TST"}
+    assert _validate_station_data({**station, "lat": 40.7, "lon": -74.0}) == True
+    assert _validate_station_data({**station, "lat": "40.7", "lon": "-74.0"}) == True
+    assert _validate_station_data({**station, "lat": 40.7}) == False
+    assert _validate_station_data({**station, "lat": 91, "lon": 0}) == False
+    assert _validate_station_data({**station, "lat": True, "lon": 0}) == False
+
+def test_nearby_stations_nearest_first(client):
+    """Test that nearby returns the closest stations first, with distances."""
+    response = client.get('/stations/nearby?lat=40.75&lon=-73.99&k=2')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [s['id'] for s in data] == ['st001', 'st004']
+    assert data[0]['distance_km'] < 2
+    assert data[0]['distance_km'] <= data[1]['distance_km']
+
+def test_nearby_stations_radius(client):
+    """Test that stations beyond the radius are left out."""
+    response = client.get('/stations/nearby?lat=40.75&lon=-73.99&radius=200')
+    assert [s['id'] for s in response.get_json()] == ['st001', 'st004']
+    assert client.get('/stations/nearby?lat=0&lon=0&radius=10').get_json() == []
+
+@pytest.mark.parametrize("query", ["", "?lat=40", "?lat=91&lon=0", "?lat=x&lon=0",
+                                   "?lat=0&lon=0&radius=0", "?lat=0&lon=0&radius=nan", "?lat=0&lon=0&k=0"])
+def test_nearby_stations_rejects_invalid_parameters(client, query):
+    """Test that missing or invalid coordinates, radius or k are a 400."""
+    response = client.get(f'/stations/nearby{query}')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Bad request'
+
+@pytest.mark.parametrize("query,message", [
+    ("?lat=x&lon=0", "Invalid lat: 'x'"),
+    ("?lat=91&lon=0", "lat out of range (-90 to 90): '91'"),
+    ("?lat=0&lon=-181", "lon out of range (-180 to 180): '-181'"),
+    ("?lat=0&lon=0&radius=abc", "radius must be a positive number of kilometres"),
+    ("?lat=0&lon=0&radius=inf", "radius must be a positive number of kilometres"),
+    ("?lat=0&lon=0&radius=-inf", "radius must be a positive number of kilometres"),
+    ("?lat=0&lon=0&radius=NaN", "radius must be a positive number of kilometres"),
+])
+def test_nearby_stations_invalid_parameter_messages(client, query, message):
+    """Test that unparseable or non-finite parameters get clean error messages."""
+    response = client.get(f'/stations/nearby{query}')
+    assert response.status_code == 400
+    assert response.get_json()['message'] == message
+
+def test_batch_lookup_ids_in_input_order(client):
+    """Test that batch id lookups keep request order and mark misses."""
+    response = client.post('/stations/batch', json={"ids": ["st003", "missing", "st001", "st003"]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [(r['id'], r['found']) for r in data] == [("st003", True), ("missing", False), ("st001", True), ("st003", True)]
+    assert data[0]['station']['name'] == 'Grand Central'
+    assert data[1]['station'] is None
+
+def test_batch_lookup_codes_case_insensitive(client):
+    """Test that batch code lookups match like the code filter and echo the requested code."""
+    data = client.post('/stations/batch', json={"codes": ["chi", "ZZZ", " "]}).get_json()
+    assert [r['code'] for r in data] == ["chi", "ZZZ", " "]
+    assert [[s['id'] for s in r['stations']] for r in data] == [["st002"], [], []]
+    assert [r['found'] for r in data] == [True, False, False]
+
+def test_batch_lookup_from_database_backend(client, tmp_path):
+    """Test that batch lookups resolve against a SQLite repository."""
+    repository = open_sqlite_repository(str(tmp_path / "stations.db"))
+    repository.replace_stations([
+        {"id": "st100", "name": "Harbor Station", "city": "Seattle", "code": "SEA"},
+        {"id": "st101", "name": "King Street", "city": "Seattle", "code": "SEA"}
+    ], _validate_station_data)
+    with patch('src.app._station_repository', repository):
+        data = client.post('/stations/batch', json={"codes": ["sea", "pdx"]}).get_json()
+        assert [[s['id'] for s in r['stations']] for r in data] == [["st100", "st101"], []]
+        data = client.post('/stations/batch', json={"ids": ["st101", "st999"]}).get_json()
+        assert [r['found'] for r in data] == [True, False]
+    repository.pool.close()
+
+@pytest.mark.parametrize("body", [None, [], {}, {"ids": "st001"}, {"ids": [1]},
+                                  {"ids": ["st001"], "codes": ["NYS"]}, {"codes": ["NYS"] * 1001}])
+def test_batch_lookup_rejects_invalid_body(client, body):
+    """Test that a body without exactly one list of at most 1000 strings is a 400."""
+    response = client.post('/stations/batch', data=json.dumps(body), content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Bad request'
+
+def test_stations_proxied_from_upstream(client, stub_upstream):
+    """Test that /stations proxies a configured upstream, validating and caching its pages."""
+    stub_upstream.respond([
+        {"id": "up1", "name": " Harbor Station ", "city": "Seattle", "code": "SEA"},
+        {"id": "up2", "name": "", "city": "Seattle", "code": "BAD"}
+    ], headers={'X-Next-Cursor': 'next'})
+    with patch('src.app._station_upstream', StationUpstream(stub_upstream.url)):
+        for _ in range(2):
+            response = client.get('/stations?city=Seattle&limit=5000')
+            assert response.status_code == 200
+            assert response.get_json() == [{"id": "up1", "name": "Harbor Station", "city": "Seattle", "code": "SEA"}]
+            assert response.headers['X-Next-Cursor'] == 'next'
+        assert stub_upstream.requests == ['/stations?city=Seattle&limit=1000']
+        assert client.get('/stations?city=Seattle&limit=5000', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+        assert client.get('/stations?limit=0').status_code == 400
+
+@pytest.mark.parametrize("status,expected", [(503, 502), (200, 504)])
+def test_stations_upstream_failures(client, stub_upstream, status, expected):
+    """Test that upstream errors are a 502 and upstream timeouts a 504."""
+    stub_upstream.respond([], status)
+    stub_upstream.delay = 0.2 if expected == 504 else 0
+    with patch('src.app._station_upstream', StationUpstream(stub_upstream.url, timeout=0.05)):
+        response = client.get('/stations')
+    assert response.status_code == expected
@@ -0,0 +1,244 @@
+import asyncio
+import gzip
+import json
+import time
+
+import pytest
+from unittest.mock import patch
+from src.app import app, metrics
+from src.asgi import StationsAsgiApp, build_environ
+from src.upstream import AsyncStationUpstream, StationUpstream
+
+UPSTREAM_STATIONS = [
+    {"id": "up1", "name": " Harbor Station ", "city": "Seattle", "code": "SEA"},
+    {"id": "up2", "name": "", "city": "Seattle", "code": "BAD"},
+]
+
+def call(asgi_app, path, query=b'', method='GET', body=b'', headers=()):
+    """Send one HTTP request through an ASGI app; return status, headers and body."""
+    messages = []
+    request = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def receive():
+        return request.pop() if request else {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query, 'headers': list(headers),
+             'http_version': '1.1', 'scheme': 'http', 'server': ('testserver', 80), 'client': ('127.0.0.1', 5000)}
+    asyncio.run(asgi_app(scope, receive, send))
+    start = messages[0]
+    assert all(m['more_body'] for m in messages[1:-1]) and not messages[-1].get('more_body')
+    return start['status'], dict(start['headers']), b''.join(m.get('body', b'') for m in messages[1:])
+
+def test_build_environ_translates_scope():
+    """Test method, path, query and headers map to their WSGI keys."""
+    scope = {'type': 'http', 'method': 'POST', 'path': '/stations/batch', 'query_string': b'a=1',
+             'headers': [(b'content-type', b'application/json'), (b'x-tag', b'a'), (b'x-tag', b'b')]}
+    environ = build_environ(scope, b'{}')
+    assert environ['REQUEST_METHOD'] == 'POST'
+    assert environ['PATH_INFO'] == '/stations/batch'
+    assert environ['QUERY_STRING'] == 'a=1'
+    assert environ['CONTENT_TYPE'] == 'application/json'
+    assert environ['HTTP_X_TAG'] == 'a,b'
+    assert environ['wsgi.input'].read() == b'{}'
+
+def test_flask_routes_run_through_bridge():
+    """Test requests without a native handler are served by the Flask app."""
+    asgi_app = StationsAsgiApp(app)
+    status, _, body = call(asgi_app, '/stations', b'code=CHI')
+    assert status == 200
+    assert [s['id'] for s in json.loads(body)] == ['st002']
+    status, _, body = call(asgi_app, '/stations/batch', method='POST', body=b'{"ids": ["st001"]}',
+                           headers=[(b'content-type', b'application/json')])
+    assert json.loads(body)[0]['found'] is True
+
+def test_streamed_flask_response_is_relayed_in_chunks(monkeypatch):
+    """Test a streamed Flask response keeps streaming through the bridge."""
+    monkeypatch.setattr('src.app.NDJSON_CHUNK_BYTES', 1)
+    status, headers, body = call(StationsAsgiApp(app), '/stations', b'stream=ndjson')
+    assert status == 200
+    assert headers[b'content-type'] == b'application/x-ndjson'
+    assert len(body.splitlines()) == 5
+
+def test_stations_served_from_upstream(stub_upstream):
+    """Test /stations forwards filters upstream and validates what comes back."""
+    stub_upstream.respond(UPSTREAM_STATIONS, headers={'X-Next-Cursor': 'next'})
+    asgi_app = StationsAsgiApp(app, AsyncStationUpstream(stub_upstream.url))
+    status, headers, body = call(asgi_app, '/stations', b'city=Seattle&limit=2&ignored=1')
+    assert status == 200
+    assert stub_upstream.requests == ['/stations?city=Seattle&limit=2']
+    assert json.loads(body) == [{"id": "up1", "name": "Harbor Station", "city": "Seattle", "code": "SEA"}]
+    assert headers[b'x-next-cursor'] == b'next'
+
+@pytest.mark.parametrize("payload,status,expected", [
+    ([], 503, 502),
+    ({"not": "a list"}, 200, 502),
+    (b"not json", 200, 502),
+])
+def test_upstream_failures_map_to_bad_gateway(stub_upstream, payload, status, expected):
+    """Test upstream errors and malformed bodies are a 502."""
+    stub_upstream.respond(payload, status)
+    assert call(StationsAsgiApp(app, AsyncStationUpstream(stub_upstream.url)), '/stations')[0] == expected
+
+def test_upstream_timeout_is_gateway_timeout(stub_upstream):
+    """Test an upstream slower than the timeout is a 504."""
+    stub_upstream.delay = 0.5
+    upstream = AsyncStationUpstream(stub_upstream.url, timeout=0.05)
+    assert call(StationsAsgiApp(app, upstream), '/stations')[0] == 504
+
+def wsgi_and_asgi(stub_upstream, query, headers=()):
+    """Send one /stations request to the Flask route and to the native ASGI handler over the same upstream."""
+    with patch('src.app._station_upstream', StationUpstream(stub_upstream.url, cache_ttl=0)):
+        response = app.test_client().get(f'/stations?{query.decode()}',
+                                         headers=[(k.decode(), v.decode()) for k, v in headers])
+        wsgi = response.status_code, response.headers, response.data
+        # Requests the native handler hands back to Flask use the route's upstream, as in production
+        asgi_app = StationsAsgiApp(app, AsyncStationUpstream(stub_upstream.url, cache_ttl=0))
+        return wsgi, call(asgi_app, '/stations', query, headers=headers)
+
+@pytest.mark.parametrize("query", [
+    b'city=Seattle&city=Boston',
+    b'city=Seattle,Boston&code=SEA',
+    b'limit=abc',
+    b'limit=0',
+    b'fields=',
+    b'fields=code,name&limit=5',
+    b'fields=code,foo',
+    b'stream=xml',
+    b'stream=ndjson',
+])
+def test_native_stations_matches_wsgi_route(stub_upstream, query):
+    """Test the native ASGI handler answers exactly as the Flask route does."""
+    stub_upstream.respond(UPSTREAM_STATIONS, headers={'X-Next-Cursor': 'next'})
+    (wsgi_status, wsgi_headers, wsgi_body), (status, headers, body) = wsgi_and_asgi(stub_upstream, query)
+    assert status == wsgi_status
+    assert body == wsgi_body
+    assert headers[b'content-type'].decode() == wsgi_headers['Content-Type']
+    assert headers.get(b'etag', b'').decode() == wsgi_headers.get('ETag', '')
+    assert headers.get(b'x-next-cursor', b'').decode() == wsgi_headers.get('X-Next-Cursor', '')
+    # Both send the same upstream query
+    assert stub_upstream.requests[0::2] == stub_upstream.requests[1::2]
+
+def test_native_stations_merges_repeated_filters(stub_upstream):
+    """Test repeated filter parameters are merged, not reduced to the last one."""
+    stub_upstream.respond(UPSTREAM_STATIONS)
+    call(StationsAsgiApp(app, AsyncStationUpstream(stub_upstream.url)), '/stations', b'city=Boston&city=Chicago')
+    assert stub_upstream.requests == ['/stations?city=Boston%2CChicago']
+
+def test_native_stations_ndjson_is_streamed(stub_upstream):
+    """Test stream=ndjson is served as NDJSON through the Flask route."""
+    stub_upstream.respond(UPSTREAM_STATIONS)
+    with patch('src.app._station_upstream', StationUpstream(stub_upstream.url)):
+        status, headers, body = call(StationsAsgiApp(app, AsyncStationUpstream(stub_upstream.url)),
+                                     '/stations', b'stream=ndjson')
+    assert status == 200
+    assert headers[b'content-type'] == b'application/x-ndjson'
+    assert [json.loads(line)['id'] for line in body.splitlines()] == ['up1']
+
+def test_native_stations_etag_and_not_modified(stub_upstream):
+    """Test responses carry the route's ETag and a matching If-None-Match gets an empty 304."""
+    stub_upstream.respond(UPSTREAM_STATIONS, headers={'X-Next-Cursor': 'next'})
+    asgi_app = StationsAsgiApp(app, AsyncStationUpstream(stub_upstream.url))
+    status, headers, _ = call(asgi_app, '/stations')
+    assert status == 200
+    etag = headers[b'etag']
+
+    status, headers, body = call(asgi_app, '/stations', headers=[(b'if-none-match', etag)])
+    assert status == 304
+    assert body == b''
+    assert headers[b'etag'] == etag
+    assert b'content-length' not in headers and b'content-type' not in headers
+    assert call(asgi_app, '/stations', headers=[(b'if-none-match', b'"other"')])[0] == 200
+
+def test_native_stations_compressed_like_wsgi(stub_upstream, monkeypatch):
+    """Test compressed responses get the same encoding, ETag and Vary as the Flask route."""
+    monkeypatch.setattr('src.app.COMPRESSION_MIN_BYTES', 1)
+    monkeypatch.setattr('src.app.COMPRESSION_ENCODINGS', ('gzip',))
+    stub_upstream.respond(UPSTREAM_STATIONS)
+    headers = [(b'accept-encoding', b'gzip')]
+    (_, wsgi_headers, wsgi_body), (status, asgi_headers, body) = wsgi_and_asgi(stub_upstream, b'', headers)
+    assert status == 200
+    assert asgi_headers[b'content-encoding'] == b'gzip'
+    assert asgi_headers[b'etag'].decode() == wsgi_headers['ETag']
+    assert asgi_headers[b'vary'].decode() == wsgi_headers['Vary']
+    assert gzip.decompress(body) == gzip.decompress(wsgi_body)
+
+def test_native_stations_uses_upstream_cache_and_coalescing(stub_upstream):
+    """Test pages are cached and concurrent cold requests share one upstream call, as in WSGI mode."""
+    stub_upstream.respond(UPSTREAM_STATIONS)
+    stub_upstream.delay = 0.1
+    asgi_app = StationsAsgiApp(app, AsyncStationUpstream(stub_upstream.url))
+
+    async def one():
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            sent.append(message)
+
+        await asgi_app({'type': 'http', 'method': 'GET', 'path': '/stations', 'query_string': b'code=SEA',
+                        'headers': []}, receive, send)
+        return sent[0]['status']
+
+    async def run():
+        statuses = await asyncio.gather(*(one() for _ in range(5)))
+        statuses.append(await one())
+        await asgi_app.aclose()
+        return statuses
+
+    def count(result):
+        line = f'stations_upstream_requests_total{{result="{result}"}}'
+        return next((float(l.split()[-1]) for l in metrics.render().splitlines() if l.startswith(line)), 0.0)
+
+    before = {result: count(result) for result in ('miss', 'coalesced', 'hit')}
+    assert asyncio.run(run()) == [200] * 6
+    assert len(stub_upstream.requests) == 1
+    assert {result: count(result) - before[result] for result in before} == {'miss': 1, 'coalesced': 4, 'hit': 1}
+
+def test_native_stations_error_is_not_masked(stub_upstream):
+    """Test a failure inside the handler surfaces as itself, not as an unbound local in cleanup."""
+    asgi_app = StationsAsgiApp(app, AsyncStationUpstream(stub_upstream.url))
+
+    async def fail(request):
+        raise RuntimeError("boom")
+
+    asgi_app._upstream_response = fail
+    with pytest.raises(RuntimeError, match="boom"):
+        call(asgi_app, '/stations')
+
+def test_upstream_calls_overlap_and_reuse_connections(stub_upstream):
+    """Test concurrent requests wait on the upstream together over kept-alive connections."""
+    stub_upstream.respond(UPSTREAM_STATIONS[:1])
+    stub_upstream.delay = 0.1
+    asgi_app = StationsAsgiApp(app, AsyncStationUpstream(stub_upstream.url, max_connections=4, cache_ttl=0))
+
+    async def one(page):
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            sent.append(message)
+
+        # Distinct pages, so the calls are neither cached nor coalesced
+        await asgi_app({'type': 'http', 'method': 'GET', 'path': '/stations',
+                        'query_string': f'city=c{page}'.encode(), 'headers': []}, receive, send)
+        return sent[0]['status']
+
+    async def run():
+        statuses = []
+        for _ in range(3):
+            statuses += await asyncio.gather(*(one(page) for page in range(4)))
+        await asgi_app.aclose()
+        return statuses
+
+    start = time.perf_counter()
+    assert asyncio.run(run()) == [200] * 12
+    # Three rounds of four overlapping 100 ms calls, not twelve sequential ones
+    assert time.perf_counter() - start < 0.8
+    assert len(stub_upstream.client_ports) == 4
@@ -0,0 +1,539 @@
+import json
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import cli_tool
+from cli_tool import (
+    FileSummary, endpoint_slug, pack_pieces, parse_endpoint_selection, run_streaming, split_file_diff,
+    unique_endpoint_slugs
+)
+
+def endpoint(full_endpoint):
+    """Build a parsed RAML endpoint."""
+    method, path = full_endpoint.split(' ', 1)
+    return {'path': path, 'method': method, 'description': '', 'full_endpoint': full_endpoint}
+
+@pytest.mark.parametrize("choice,expected", [
+    ('all', [0, 1, 2, 3, 4]),
+    ('ALL', [0, 1, 2, 3, 4]),
+    ('2', [1]),
+    ('1,3', [0, 2]),
+    ('1, 3 ,5', [0, 2, 4]),
+    ('2-4', [1, 2, 3]),
+    ('4,1-2', [3, 0, 1]),
+    ('1-3,2-4', [0, 1, 2, 3]),
+    ('1,,2,', [0, 1]),
+])
+def test_parse_endpoint_selection(choice, expected):
+    """Test lists, ranges and 'all' become 0-based indexes in selection order, without repeats."""
+    assert parse_endpoint_selection(choice, 5) == expected
+
+@pytest.mark.parametrize("choice,message", [
+    ('', "at least one"),
+    (',', "at least one"),
+    ('0', "between 1 and 5"),
+    ('6', "between 1 and 5"),
+    ('4-2', "between 1 and 5"),
+    ('2-9', "between 1 and 5"),
+    ('x', "Invalid selection: x"),
+    ('1-', "Invalid selection: 1-"),
+    ('-2', "Invalid selection: -2"),
+    ('1-2-3', "Invalid selection: 1-2-3"),
+])
+def test_parse_endpoint_selection_rejects_bad_input(choice, message):
+    """Test empty, out of range and malformed selections raise ValueError."""
+    with pytest.raises(ValueError, match=message):
+        parse_endpoint_selection(choice, 5)
+
+def test_endpoint_slug():
+    """Test endpoints become lowercase, hyphen-separated branch name parts."""
+    assert endpoint_slug(endpoint('GET /stations/{id}')) == 'get-stations-id'
+    assert endpoint_slug(endpoint('POST /stations/batch/')) == 'post-stations-batch'
+
+def test_unique_endpoint_slugs_suffixes_collisions():
+    """Test endpoints that slug the same get distinct slugs, including against an existing suffix."""
+    endpoints = [endpoint('GET /a-b'), endpoint('GET /a_b'), endpoint('GET /a b'), endpoint('GET /a-b-2'),
+                 endpoint('GET /c')]
+    assert unique_endpoint_slugs(endpoints) == ['get-a-b', 'get-a-b-2', 'get-a-b-3', 'get-a-b-2-2', 'get-c']
+
+def test_get_diff_from_main_uses_base():
+    """Test the diff is taken against the ref the branch was made from."""
+    with patch.object(cli_tool, 'run_command', return_value='diff') as run_command:
+        assert cli_tool.get_diff_from_main('/work', 'origin/main') == 'diff'
+        cli_tool.get_diff_from_main()
+    assert [c.args[0] for c in run_command.call_args_list] == ['git diff origin/main...HEAD', 'git diff main...HEAD']
+    assert run_command.call_args_list[0].kwargs['cwd'] == '/work'
+
+@pytest.fixture(autouse=True)
+def q_cache(tmp_path, monkeypatch):
+    """Point the Amazon Q output cache at an empty directory, with caching on, for every test."""
+    monkeypatch.setattr(cli_tool, 'Q_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(cli_tool, 'q_cache_enabled', True)
+    return tmp_path
+
+def test_q_cache_key():
+    """Test keys are stable and change with the kind and with how the inputs are split."""
+    key = cli_tool.q_cache_key('agent', 'prompt', 'tree')
+    assert key == cli_tool.q_cache_key('agent', 'prompt', 'tree')
+    assert len(key) == 64
+    assert key != cli_tool.q_cache_key('summary-chunk', 'prompt', 'tree')
+    assert key != cli_tool.q_cache_key('agent', 'prompt', 'tree2')
+    assert cli_tool.q_cache_key('k', 'ab', 'c') != cli_tool.q_cache_key('k', 'a', 'bc')
+
+def test_q_cache_round_trip(q_cache):
+    """Test a stored entry is read back, and a missing key is a miss."""
+    cli_tool.q_cache_put('k1', {'output': 'summary'})
+    assert cli_tool.q_cache_get('k1') == {'output': 'summary'}
+    assert cli_tool.q_cache_get('k2') is None
+    assert [p.name for p in q_cache.iterdir()] == ['k1.json']
+
+def test_q_cache_disabled(q_cache, monkeypatch):
+    """Test nothing is read or written when caching is off."""
+    cli_tool.q_cache_put('k1', {'output': 'summary'})
+    monkeypatch.setattr(cli_tool, 'q_cache_enabled', False)
+    assert cli_tool.q_cache_get('k1') is None
+    cli_tool.q_cache_put('k2', {'output': 'other'})
+    assert not (q_cache / 'k2.json').exists()
+
+@pytest.mark.parametrize("content", ['{"output": "trunc', '', 'not json', '\udcff', '{"output": "old format"}',
+                                     '[1, 2]', '{"created": "yesterday", "entry": {}}'])
+def test_q_cache_ignores_corrupt_entries(q_cache, content):
+    """Test an unreadable cache file is a miss, and the next put replaces it."""
+    (q_cache / 'k1.json').write_text(content, encoding='utf-8', errors='surrogateescape')
+    assert cli_tool.q_cache_get('k1') is None
+    cli_tool.q_cache_put('k1', {'output': 'fresh'})
+    assert cli_tool.q_cache_get('k1') == {'output': 'fresh'}
+
+def test_q_cache_expired_entry_is_removed(q_cache, monkeypatch):
+    """Test entries created more than Q_CACHE_MAX_AGE ago are misses and are deleted, however often they are used."""
+    monkeypatch.setattr(cli_tool, 'Q_CACHE_MAX_AGE', 60)
+    clock = [time.time()]
+    monkeypatch.setattr(cli_tool.time, 'time', lambda: clock[0])
+    cli_tool.q_cache_put('k1', {'output': 'old'})
+    for _ in range(3):
+        clock[0] += 15
+        assert cli_tool.q_cache_get('k1') == {'output': 'old'}
+    clock[0] += 20
+    assert cli_tool.q_cache_get('k1') is None
+    assert not (q_cache / 'k1.json').exists()
+
+def test_evict_q_cache_drops_least_recently_used(q_cache, monkeypatch):
+    """Test eviction removes entries unused for Q_CACHE_MAX_AGE, then the least recently used until within the size limit."""
+    monkeypatch.setattr(cli_tool, 'Q_CACHE_MAX_AGE', 3600)
+    now = os.path.getmtime(q_cache)
+    for age, name in enumerate(['newest', 'newer', 'older', 'oldest', 'expired']):
+        path = q_cache / f'{name}.json'
+        path.write_text(json.dumps({'created': now - 600, 'entry': 'x' * 68}))
+        os.utime(path, (now - age * 60 - (7200 if name == 'expired' else 0),) * 2)
+    (q_cache / 'partial.json.1.2.tmp').write_text('x' * 1000)
+
+    # Reading an entry makes it the most recently used
+    cli_tool.q_cache_get('oldest')
+    monkeypatch.setattr(cli_tool, 'Q_CACHE_MAX_BYTES', 250)
+    cli_tool.evict_q_cache()
+    assert sorted(p.name for p in q_cache.iterdir()) == ['newest.json', 'oldest.json', 'partial.json.1.2.tmp']
+
+def test_q_cache_put_evicts_beyond_size_limit(q_cache, monkeypatch):
+    """Test storing an entry keeps the cache within Q_CACHE_MAX_BYTES."""
+    monkeypatch.setattr(cli_tool, 'Q_CACHE_MAX_BYTES', 100)
+    for i in range(5):
+        cli_tool.q_cache_put(f'k{i}', {'output': 'x' * 40})
+    entries = list(q_cache.iterdir())
+    assert sum(p.stat().st_size for p in entries) <= 100
+    assert 'k4.json' in [p.name for p in entries]
+
+def make_file_diff(path, hunks, lines_per_hunk=3):
+    """Build one file's unified diff with the given number of hunks."""
+    header = f"diff --git a/{path} b/{path}\nindex 1111111..2222222 100644\n--- a/{path}\n+++ b/{path}\n"
+    body = ''.join(
+        f"@@ -{h * 10 + 1},{lines_per_hunk} +{h * 10 + 1},{lines_per_hunk} @@\n"
+        + ''.join(f"+hunk {h} line {i}\n" for i in range(lines_per_hunk))
+        for h in range(hunks)
+    )
+    return header, header + body
+
+def test_pack_pieces_keeps_order_within_budget():
+    """Test consecutive pieces are grouped in order, each group within the budget."""
+    pieces = ['aaaa', 'bb', 'cc', 'd', 'eeeee', 'f']
+    groups = pack_pieces(pieces, 6)
+    assert groups == [['aaaa', 'bb'], ['cc', 'd'], ['eeeee', 'f']]
+    assert [p for group in groups for p in group] == pieces
+
+def test_pack_pieces_counts_separator_and_isolates_oversized():
+    """Test separators count towards the budget and a piece bigger than it is a group of its own."""
+    assert pack_pieces(['aa', 'bb', 'cc'], 6, '--') == [['aa', 'bb'], ['cc']]
+    assert pack_pieces(['a', 'toolong', 'b', 'c'], 3) == [['a'], ['toolong'], ['b', 'c']]
+    assert pack_pieces([], 10) == []
+
+def test_split_file_diff_cuts_between_hunks():
+    """Test pieces start with the file header, hold whole hunks in order and fit the budget."""
+    header, diff = make_file_diff('src/app.py', hunks=6)
+    hunk_size = (len(diff) - len(header)) // 6
+    budget = len(header) + 2 * hunk_size + 10
+    pieces = split_file_diff(diff, budget)
+    assert len(pieces) == 3
+    for piece in pieces:
+        assert piece.startswith(header + '@@ ')
+        assert len(piece) <= budget
+        assert piece.count('\n@@ ') == 2
+    assert header + ''.join(piece[len(header):] for piece in pieces) == diff
+
+def test_split_file_diff_cuts_oversized_hunk_between_lines():
+    """Test a hunk bigger than the budget is cut between its lines, keeping their order."""
+    header, diff = make_file_diff('src/app.py', hunks=1, lines_per_hunk=50)
+    budget = len(header) + 200
+    pieces = split_file_diff(diff, budget)
+    assert len(pieces) > 1
+    body = ''
+    for piece in pieces:
+        assert piece.startswith(header)
+        assert len(piece) <= budget
+        assert piece.endswith('\n')
+        body += piece[len(header):]
+    assert header + body == diff
+
+def test_split_file_diff_without_hunks():
+    """Test a diff without hunks, such as a binary change, is one piece cut to the budget."""
+    diff = "diff --git a/logo.png b/logo.png\nindex 1111111..2222222 100644\nBinary files differ\n"
+    assert split_file_diff(diff, 1000) == [diff]
+    assert split_file_diff(diff, 20) == [diff[:20]]
+
+def test_generate_pr_summary_splits_large_files_in_order():
+    """Test a file bigger than the chunk budget is summarized in pieces joined in diff order."""
+    _, small = make_file_diff('README.md', hunks=1)
+    header, large = make_file_diff('src/app.py', hunks=8)
+    calls = []
+
+    def fake_summarize(kind, prompt, content, cwd=None, heading="Code Changes"):
+        calls.append(kind)
+        if kind == 'summary-chunk':
+            return ','.join(line.split()[1] for line in content.splitlines() if line.startswith('+hunk'))
+        return content
+
+    with patch.object(cli_tool, 'summarize', side_effect=fake_summarize):
+        _, files = cli_tool.generate_pr_summary(small + large, chunk_chars=len(header) + 300, jobs=4)
+    assert list(files) == ['README.md', 'src/app.py']
+    assert files['README.md'].text == '0,0,0'
+    pieces = files['src/app.py'].text.splitlines()
+    assert len(pieces) > 1
+    assert ','.join(pieces) == ','.join(f'{h},{h},{h}' for h in range(8))
+    assert calls.count('summary-chunk') == 1 + len(pieces)
+
+def headed_summaries(calls):
+    """Fake summarize that heads each file's part of a chunk summary, as CHUNK_SUMMARY_PROMPT asks, and records calls."""
+    def fake_summarize(kind, prompt, content, cwd=None, heading="Code Changes"):
+        if kind != 'summary-chunk':
+            return content
+        paths = [cli_tool.diff_file_path(section) for section in cli_tool.iter_diff_files(content)]
+        calls.append(paths)
+        return '\n'.join(f"#### `{path}`\n- {path} summary {len(calls)}" for path in paths)
+    return fake_summarize
+
+def test_generate_pr_summary_packs_small_files_into_few_calls():
+    """Test small files share calls up to the chunk budget and each gets its own part of the output."""
+    diffs = [make_file_diff(f'src/module_{i:02d}.py', hunks=1) for i in range(40)]
+    size = len(diffs[0][1])
+    calls = []
+    with patch.object(cli_tool, 'summarize', side_effect=headed_summaries(calls)):
+        summary, files = cli_tool.generate_pr_summary(''.join(diff for _, diff in diffs), chunk_chars=size * 16)
+    assert [len(paths) for paths in calls] == [16, 16, 8]
+    assert [path for paths in calls for path in paths] == list(files)
+    assert files['src/module_17.py'].text == "- src/module_17.py summary 2"
+    assert all(f.diff_hash for f in files.values())
+    assert "#### `src/module_39.py`\n- src/module_39.py summary 3" in summary
+
+def test_generate_pr_summary_keeps_output_not_split_by_file():
+    """Test a packed call whose output has no file headings is still summarized, and its files are retried next time."""
+    _, first = make_file_diff('a.py', hunks=1)
+    _, second = make_file_diff('b.py', hunks=1)
+    with patch.object(cli_tool, 'summarize', side_effect=lambda kind, prompt, content, *args, **kwargs:
+                      "- Changed two files" if kind == 'summary-chunk' else content):
+        summary, files = cli_tool.generate_pr_summary(first + second)
+    assert "- Changed two files" in summary
+    assert files == {'a.py': FileSummary('', '', None), 'b.py': FileSummary('', '', None)}
+    assert cli_tool.q_cache_get(cli_tool.q_cache_key('pr-file', 'a.py', cli_tool.diff_file_hashes(first)['a.py'])) is None
+
+def test_split_summary_by_file():
+    """Test a chunk summary splits at its file headings, and fails if a file has no part."""
+    output = "Here you go:\n#### `a.py`\n- One\n- Two\n\n### `b.py`\n- Three\n"
+    assert cli_tool.split_summary_by_file(output, ['a.py', 'b.py']) == {'a.py': "- One\n- Two", 'b.py': "- Three"}
+    assert cli_tool.split_summary_by_file(output, ['a.py', 'b.py', 'c.py']) is None
+    assert cli_tool.split_summary_by_file(output + "#### `c.py`\n", ['a.py', 'b.py', 'c.py']) is None
+    assert cli_tool.split_summary_by_file("- No headings", ['a.py']) is None
+
+def summary_files():
+    """Per-file summaries as generate_pr_summary returns them."""
+    return {
+        'src/app.py': FileSummary('a1b2c3', 'abc123', "- Adds `/stations` paging\n- Keeps *markdown*"),
+        'README.md': FileSummary('d4e5f6', 'abc123', "- Documents it"),
+    }
+
+def recorded(files):
+    """The summaries as read back from a PR body: hashes and commits, without texts."""
+    return {path: f._replace(text=None) for path, f in files.items()}
+
+def test_render_and_parse_pr_body_round_trip():
+    """Test the per-file hashes and commits written into a PR body are read back unchanged, in order."""
+    body = cli_tool.render_pr_body("## Summary\n\nPaging.", summary_files(), 'abc123')
+    assert body.endswith(cli_tool.PR_FOOTER)
+    assert "Paging." in body
+    parsed = cli_tool.parse_pr_file_summaries(body)
+    assert parsed == recorded(summary_files())
+    assert list(parsed) == list(summary_files())
+
+def test_render_pr_body_leaves_file_summaries_out():
+    """Test file summary texts stay out of the body, so it grows by one short line per file."""
+    body = cli_tool.render_pr_body("## Summary", summary_files(), 'abc123')
+    assert "Documents it" not in body and "Keeps *markdown*" not in body
+
+def test_render_pr_body_keeps_text_around_generated_part():
+    """Test an update replaces only the generated part of a hand-edited body."""
+    body = cli_tool.render_pr_body("## Summary\n\nOld.", summary_files(), 'abc123')
+    edited = f"Fixes #12\n\n{body}\n\nReviewer notes: check paging."
+    files = {**summary_files(), 'README.md': FileSummary('ffffff', 'def456', "- Rewords it")}
+    updated = cli_tool.render_pr_body("## Summary\n\nNew.", files, 'def456', edited)
+    assert updated.startswith("Fixes #12\n\n")
+    assert updated.endswith("Reviewer notes: check paging.")
+    assert "Old." not in updated and "New." in updated
+    assert updated.count(cli_tool.PR_FOOTER) == 1
+    assert cli_tool.parse_pr_file_summaries(updated) == recorded(files)
+
+def test_render_pr_body_fits_size_limit(monkeypatch):
+    """Test a body over PR_BODY_MAX_CHARS drops file markers from the end, then cuts the summary."""
+    files = {f'src/module_{i}.py': FileSummary(f'{i:06x}', 'abc123', None) for i in range(40)}
+    assert len(cli_tool.render_pr_body("## Summary", files, 'abc123')) > 2000
+
+    monkeypatch.setattr(cli_tool, 'PR_BODY_MAX_CHARS', 2000)
+    body = cli_tool.render_pr_body("## Summary", files, 'abc123')
+    assert len(body) <= 2000
+    kept = cli_tool.parse_pr_file_summaries(body)
+    assert 0 < len(kept) < 40
+    assert list(kept) == list(files)[:len(kept)]
+
+    body = cli_tool.render_pr_body("x" * 5000, files, 'abc123', "Notes\n" + body)
+    assert len(body) == 2000
+    assert body.startswith("Notes\n")
+    assert cli_tool.parse_pr_file_summaries(body) == {}
+    assert cli_tool.PR_SUMMARY_TRUNCATED in body
+
+@pytest.mark.parametrize("body", [None, '', "Written by hand, no markers.", cli_tool.PR_SUMMARY_END,
+                                  cli_tool.PR_SUMMARY_START.format(commit='abc123') + "\n- unterminated"])
+def test_parse_pr_file_summaries_without_generated_part(body):
+    """Test a body without a complete generated part has no summaries to reuse."""
+    assert cli_tool.parse_pr_file_summaries(body) == {}
+
+def test_render_pr_body_replaces_body_without_generated_part():
+    """Test a body whose markers were removed gets a fresh generated part."""
+    body = cli_tool.render_pr_body("## Summary", summary_files(), 'abc123', "Written by hand.")
+    assert cli_tool.parse_pr_file_summaries(body) == recorded(summary_files())
+
+def test_parse_pr_file_summaries_with_edited_markers():
+    """Test a damaged file marker loses only that file's record."""
+    files = {**summary_files(), 'setup.py': FileSummary('0a0b0c', 'abc123', "- Pins flask")}
+    body = cli_tool.render_pr_body("## Summary", files, 'abc123')
+
+    damaged = body.replace('path="src/app.py" diff=a1b2c3', 'path="src/app.py" diff=a1b2c3!')
+    assert list(cli_tool.parse_pr_file_summaries(damaged)) == ['README.md', 'setup.py']
+    damaged = body.replace('commit=abc123 -->\n<!-- cli_tool:file path="README.md"', '-->\n<!-- x')
+    assert list(cli_tool.parse_pr_file_summaries(damaged)) == ['setup.py']
+
+def test_generate_pr_summary_resummarizes_only_changed_files():
+    """Test files summarized before are reused from the cache and the rest are summarized."""
+    _, app_diff = make_file_diff('src/app.py', hunks=1)
+    _, readme_diff = make_file_diff('README.md', hunks=2)
+    _, setup_diff = make_file_diff('setup.py', hunks=1)
+    calls = []
+    with patch.object(cli_tool, 'summarize', side_effect=headed_summaries(calls)):
+        _, first = cli_tool.generate_pr_summary(app_diff + readme_diff, commit='old')
+        previous_body = cli_tool.render_pr_body("## Summary", first, 'old')
+        assert calls == [['src/app.py', 'README.md']]
+
+        # README.md changed and setup.py is new; src/app.py is unchanged
+        _, readme_diff = make_file_diff('README.md', hunks=3)
+        diff = app_diff + readme_diff + setup_diff
+        summary, files = cli_tool.generate_pr_summary(
+            diff, previous_files=cli_tool.parse_pr_file_summaries(previous_body), commit='new')
+    hashes = cli_tool.diff_file_hashes(diff)
+    assert calls[1:] == [['README.md', 'setup.py']]
+    assert files == {
+        'src/app.py': FileSummary(hashes['src/app.py'], 'old', "- src/app.py summary 1"),
+        'README.md': FileSummary(hashes['README.md'], 'new', "- README.md summary 2"),
+        'setup.py': FileSummary(hashes['setup.py'], 'new', "- setup.py summary 2"),
+    }
+    assert "- src/app.py summary 1" in summary
+
+def test_generate_pr_summary_retries_failed_files():
+    """Test a file whose summary failed is recorded with an empty hash and summarized again next time."""
+    _, diff = make_file_diff('src/app.py', hunks=1)
+    outputs = [None, "- App summary"]
+    with patch.object(cli_tool, 'summarize', side_effect=lambda kind, prompt, content, *args, **kwargs:
+                      outputs.pop(0) if kind == 'summary-chunk' else content):
+        _, files = cli_tool.generate_pr_summary(diff, commit='old')
+        assert files['src/app.py'] == FileSummary('', 'old', "- Summary unavailable")
+        _, files = cli_tool.generate_pr_summary(diff, previous_files=files, commit='new')
+    assert files['src/app.py'].text == "- App summary"
+
+def python_command(code):
+    """Command line running a Python snippet with unbuffered output."""
+    return [sys.executable, '-u', '-c', code]
+
+def process_alive(pid):
+    """Whether a process exists and has not exited (a zombie waiting to be reaped counts as exited)."""
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            return stat.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+    except OSError:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        return True
+
+def process_exits(pid, timeout=2.0):
+    """Whether a process exits within timeout seconds; a kill is delivered asynchronously."""
+    deadline = time.monotonic() + timeout
+    while process_alive(pid):
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+def test_run_streaming_collects_output_and_lines():
+    """Test input is fed in, both outputs are collected and complete stdout lines are passed on."""
+    lines = []
+    code = "import sys\nfor line in sys.stdin: print(line.upper(), end='')\nsys.stderr.write('done'); print('tail', end='')"
+    result = run_streaming(python_command(code), "one\ntwo\r\n", on_line=lines.append, timeout=10)
+    assert result.returncode == 0
+    assert result.stdout == "ONE\nTWO\r\ntail"
+    assert result.stderr == "done"
+    assert lines == ['ONE', 'TWO', 'tail']
+    assert result.timed_out is None
+    assert result.first_output is not None and result.first_output <= result.duration
+
+def test_run_streaming_large_input_and_outputs_do_not_stall():
+    """Test input and outputs larger than a pipe buffer flow without deadlock."""
+    data = 'x' * 1023 + '\n'
+    code = "import sys\nfor line in sys.stdin: sys.stdout.write(line); sys.stderr.write(line)"
+    result = run_streaming(python_command(code), data * 1024, timeout=30)
+    assert result.returncode == 0
+    assert result.stdout == result.stderr == data * 1024
+
+def test_run_streaming_reports_exit_code():
+    """Test a failing command's exit code and stderr are returned."""
+    result = run_streaming(python_command("import sys; sys.exit('bad input')"), timeout=10)
+    assert result.returncode == 1
+    assert result.stderr.strip() == 'bad input'
+    assert result.first_output is None
+
+def test_run_streaming_total_timeout_keeps_partial_output():
+    """Test a command still printing at its time limit is stopped with what it printed so far."""
+    code = "import time\nfor i in range(1000):\n    print(f'line {i}')\n    time.sleep(0.05)"
+    lines = []
+    result = run_streaming(python_command(code), timeout=0.6, idle_timeout=5, on_line=lines.append)
+    assert result.timed_out == 'total'
+    assert result.returncode is None
+    assert 0.6 <= result.duration < 3
+    assert result.stdout.startswith('line 0\nline 1\n')
+    assert lines[:2] == ['line 0', 'line 1']
+
+def test_run_streaming_idle_timeout_keeps_partial_output():
+    """Test a command that goes silent is stopped after idle_timeout, keeping its earlier output."""
+    code = "import sys, time\nprint('started')\nsys.stderr.write('warming up')\ntime.sleep(30)"
+    result = run_streaming(python_command(code), timeout=20, idle_timeout=0.5)
+    assert result.timed_out == 'idle'
+    assert result.returncode is None
+    assert result.duration < 5
+    assert result.stdout == 'started\n'
+    assert result.stderr == 'warming up'
+
+def test_run_streaming_waits_on_command_that_closed_its_outputs():
+    """Test a command that closes its outputs but keeps running is still held to the time limit."""
+    result = run_streaming(['sh', '-c', 'echo bye; exec >&- 2>&-; sleep 30'], timeout=0.5)
+    assert result.timed_out == 'total'
+    assert result.stdout == 'bye\n'
+    assert result.duration < 5
+
+def test_run_streaming_timeout_kills_process_group():
+    """Test stopping a command also stops what it spawned, leaving no process running."""
+    result = run_streaming(['sh', '-c', 'sleep 30 & echo $!; wait'], timeout=0.5)
+    assert result.timed_out == 'total'
+    pid = int(result.stdout)
+    assert process_exits(pid)
+
+def test_run_streaming_kills_command_ignoring_sigterm(monkeypatch):
+    """Test a command that ignores SIGTERM is killed once the grace period ends."""
+    monkeypatch.setattr(cli_tool, 'Q_KILL_GRACE', 0.3)
+    code = "import os, signal, time\nsignal.signal(signal.SIGTERM, signal.SIG_IGN)\nprint(os.getpid())\ntime.sleep(30)"
+    result = run_streaming(python_command(code), timeout=0.5)
+    assert result.timed_out == 'total'
+    assert 0.8 <= result.duration < 5
+    assert process_exits(int(result.stdout))
+
+@pytest.fixture
+def fresh_cancel(monkeypatch):
+    """Give the test its own cancellation state, so a cancel does not leak into other tests."""
+    monkeypatch.setattr(cli_tool, '_cancelled', threading.Event())
+
+def wait_for_running(count, timeout=5.0):
+    """Wait until run_streaming has count commands running."""
+    deadline = time.monotonic() + timeout
+    while len(cli_tool._running_processes) < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+def test_cancel_running_commands_stops_commands_and_later_starts(fresh_cancel):
+    """Test cancelling stops commands running on other threads and refuses to start new ones."""
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        run_streaming(['sh', '-c', 'echo $$; sleep 30'], timeout=60))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    wait_for_running(2)
+    started = time.monotonic()
+    cli_tool.cancel_running_commands(grace=1)
+    for thread in threads:
+        thread.join(5)
+    assert time.monotonic() - started < 3
+    assert [r.timed_out for r in results] == ['cancelled', 'cancelled']
+    assert all(process_exits(int(r.stdout)) for r in results)
+    assert not cli_tool._running_processes
+
+    result = run_streaming(python_command("print('never')"), timeout=10)
+    assert result == cli_tool.StreamResult(None, '', '', 'cancelled', None, 0.0)
+    assert cli_tool.describe_call(result, 'q chat').startswith('q chat cancelled')
+
+def test_parallel_migration_ctrl_c_stops_agents(fresh_cancel, tmp_path, monkeypatch):
+    """Test Ctrl-C during a parallel migration stops running agents and skips queued ones promptly."""
+    endpoints = [endpoint(f'GET /e{i}') for i in range(3)]
+    started = []
+
+    def migrate(endpoint, slug, *args):
+        started.append(endpoint['full_endpoint'])
+        result = run_streaming(['sleep', '30'], timeout=60)
+        return {'endpoint': endpoint['full_endpoint'], 'branch': slug, 'duration': result.duration,
+                'status': 'failed: Amazon Q agent', 'pr_url': None}
+
+    def interrupted(futures):
+        wait_for_running(1)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(cli_tool, 'get_github_info', lambda: ('owner', 'repo'))
+    monkeypatch.setattr(cli_tool, 'run_command', lambda *args, **kwargs: '')
+    monkeypatch.setattr(cli_tool, 'read_raml_file', lambda path: '#%RAML 1.0')
+    monkeypatch.setattr(cli_tool, 'parse_raml_endpoints', lambda raml: endpoints)
+    monkeypatch.setattr(cli_tool, 'migrate_endpoint_in_worktree', migrate)
+    monkeypatch.setattr(cli_tool, 'as_completed', interrupted)
+    before = time.monotonic()
+    assert cli_tool.mulesoft_migr_parallel_command('migr', 'Migrate', jobs=1, select_all=True) is False
+    assert time.monotonic() - before < cli_tool.Q_KILL_GRACE + 3
+    assert started == ['GET /e0']
+    assert not cli_tool._running_processes
@@ -0,0 +1,38 @@
+import gzip
+
+import pytest
+from src import compression
+from src.compression import compress, configured_encodings, negotiate_encoding
+
+def test_negotiate_prefers_client_weights_then_server_order():
+    """Test the client's highest-weighted encoding wins, ties going to the preferred one."""
+    assert negotiate_encoding("gzip, deflate, br", ('br', 'gzip')) == 'br'
+    assert negotiate_encoding("br;q=0.5, gzip", ('br', 'gzip')) == 'gzip'
+    assert negotiate_encoding("*", ('br', 'gzip')) == 'br'
+    assert negotiate_encoding("gzip;q=0", ('gzip',)) is None
+    assert negotiate_encoding("identity", ('br', 'gzip')) is None
+    assert negotiate_encoding(None, ('gzip',)) is None
+    assert negotiate_encoding("gzip", ()) is None
+
+def test_configured_encodings(monkeypatch):
+    """Test the setting selects, orders and disables encodings."""
+    assert configured_encodings('off') == ()
+    assert configured_encodings('gzip, zstd') == ('gzip',)
+    assert configured_encodings('auto') == compression.available_encodings()
+    monkeypatch.setattr(compression, 'brotli', None)
+    assert configured_encodings('br,gzip') == ('gzip',)
+    assert configured_encodings('') == ('gzip',)
+
+def test_gzip_round_trip_is_deterministic():
+    """Test gzip output decompresses to the body and is the same every time."""
+    body = b'[{"city":"Chicago","code":"CHI"}]' * 100
+    assert gzip.decompress(compress(body, 'gzip')) == body
+    assert compress(body, 'gzip') == compress(body, 'gzip')
+    with pytest.raises(ValueError):
+        compress(body, 'deflate')
+
+def test_brotli_round_trip():
+    """Test brotli output decompresses to the body."""
+    brotli = pytest.importorskip('brotli')
+    body = b'[{"city":"Chicago","code":"CHI"}]' * 100
+    assert brotli.decompress(compress(body, 'br')) == body
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+from src import geo
+from src.geo import GeoGridIndex, haversine_km, parse_coordinate
+
+@pytest.fixture
+def points():
+    """Random positions, denser around a few cities and spread over the globe."""
+    rng = random.Random(7)
+    result = []
+    for row in range(3000):
+        if row % 3:
+            lat, lon = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        else:
+            lat, lon = rng.gauss(51.5, 0.3), rng.gauss(-0.1, 0.3)
+        result.append((row, lat, lon))
+    return result
+
+def brute_force(points, lat, lon, radius_km, k):
+    """Rank every point by distance, the answer the index must reproduce."""
+    ranked = sorted((haversine_km(lat, lon, p_lat, p_lon), row) for row, p_lat, p_lon in points)
+    if radius_km is not None:
+        ranked = [item for item in ranked if item[0] <= radius_km]
+    return [row for _, row in ranked[:k]]
+
+def test_haversine_known_distance():
+    """Test a known city-pair distance and the zero distance."""
+    assert haversine_km(51.5074, -0.1278, 48.8566, 2.3522) == pytest.approx(343.5, abs=1)
+    assert haversine_km(10, 20, 10, 20) == 0.0
+
+def test_parse_coordinate():
+    """Test numbers and numeric strings are accepted and bad values rejected."""
+    assert parse_coordinate("40.5", 'lat') == 40.5
+    assert parse_coordinate(-180, 'lon') == -180.0
+    assert parse_coordinate("", 'lat') is None
+    assert parse_coordinate(None, 'lat') is None
+    for bad in (90.5, "nan", "abc", True, [1]):
+        with pytest.raises(ValueError, match="lat"):
+            parse_coordinate(bad, 'lat')
+    with pytest.raises(ValueError, match=r"lon out of range \(-180 to 180\): 180\.5"):
+        parse_coordinate(180.5, 'lon')
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+@pytest.mark.parametrize("lat,lon,radius_km,k", [
+    (51.5, -0.1, None, 10),
+    (51.5, -0.1, 25.0, 50),
+    (0.0, 0.0, None, 5),
+    (0.0, 179.9, 1500.0, 20),
+    (89.9, 45.0, None, 3),
+    (-89.0, -170.0, 800.0, 10),
+])
+def test_nearby_matches_brute_force(points, monkeypatch, use_numpy, lat, lon, radius_km, k):
+    """Test grid queries return the same stations as a full scan, with and without numpy."""
+    if use_numpy and geo.numpy is None:
+        pytest.skip("numpy is not installed")
+    if not use_numpy:
+        monkeypatch.setattr(geo, "numpy", None)
+    index = GeoGridIndex(points)
+    found = index.nearby(lat, lon, radius_km, k)
+    assert [row for row, _ in found] == brute_force(points, lat, lon, radius_km, k)
+    assert [d for _, d in found] == sorted(d for _, d in found)
+
+def test_nearby_with_few_points():
+    """Test a query returns every point when there are fewer than k, and none when empty."""
+    index = GeoGridIndex([(4, 10.0, 10.0), (9, -10.0, -10.0)])
+    assert [row for row, _ in index.nearby(0, 0, None, 10)] == [4, 9]
+    assert GeoGridIndex([]).nearby(0, 0, None, 10) == []
@@ -0,0 +1,65 @@
+import datetime
+import decimal
+import json
+
+import pytest
+from flask import Flask
+
+from src import json_provider
+from src.json_provider import configure_json_provider, OrjsonJSONProvider, StdlibJSONProvider
+
+SAMPLE = [{"name": "Union Station", "id": "st001", "city": "New York", "code": "NYS"}]
+
+@pytest.fixture
+def flask_app():
+    """Create a bare Flask app to configure."""
+    return Flask(__name__)
+
+def test_stdlib_encoder_selected_explicitly(flask_app):
+    """Test that the stdlib provider can be forced."""
+    provider = configure_json_provider(flask_app, 'stdlib')
+    assert isinstance(provider, StdlibJSONProvider)
+    assert flask_app.json is provider
+
+def test_auto_falls_back_to_stdlib_without_orjson(flask_app, monkeypatch):
+    """Test that missing orjson falls back to the stdlib provider."""
+    monkeypatch.setattr(json_provider, 'orjson', None)
+    assert isinstance(configure_json_provider(flask_app, 'auto'), StdlibJSONProvider)
+    assert isinstance(configure_json_provider(flask_app, 'orjson'), StdlibJSONProvider)
+
+def test_encoder_read_from_environment(flask_app, monkeypatch):
+    """Test that JSON_ENCODER selects the provider."""
+    monkeypatch.setenv('JSON_ENCODER', 'stdlib')
+    assert isinstance(configure_json_provider(flask_app), StdlibJSONProvider)
+
+def test_unknown_encoder_uses_auto(flask_app):
+    """Test that an unknown encoder name does not break startup."""
+    assert configure_json_provider(flask_app, 'simdjson').name in ('orjson', 'stdlib')
+
+def test_stdlib_dumps_bytes_is_compact_and_sorted(flask_app):
+    """Test the cached body format matches jsonify output."""
+    provider = configure_json_provider(flask_app, 'stdlib')
+    body = provider.dumps_bytes(SAMPLE)
+    assert body == b'[{"city":"New York","code":"NYS","id":"st001","name":"Union Station"}]\n'
+    with flask_app.app_context():
+        assert provider.response(SAMPLE).data == body
+
+def test_orjson_matches_stdlib_output(flask_app):
+    """Test that orjson produces the same bytes as the stdlib provider."""
+    pytest.importorskip('orjson')
+    fast = configure_json_provider(flask_app, 'orjson')
+    assert isinstance(fast, OrjsonJSONProvider)
+    slow = StdlibJSONProvider(flask_app)
+    assert fast.dumps_bytes(SAMPLE) == slow.dumps_bytes(SAMPLE)
+    assert json.loads(fast.dumps(SAMPLE)) == SAMPLE
+    assert fast.loads(fast.dumps_bytes(SAMPLE)) == SAMPLE
+
+def test_orjson_falls_back_for_unsupported_types(flask_app):
+    """Test that types orjson cannot encode use Flask's default serializer."""
+    pytest.importorskip('orjson')
+    fast = configure_json_provider(flask_app, 'orjson')
+    slow = StdlibJSONProvider(flask_app)
+    value = {"when": datetime.date(2025, 6, 1), "amount": decimal.Decimal("1.50")}
+    assert json.loads(fast.dumps(value)) == json.loads(slow.dumps(value))
+    with pytest.raises(TypeError):
+        fast.dumps({"bad": object()})
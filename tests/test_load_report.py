@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+from argparse import Namespace
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import test_stations_endpoint as endpoint_script
+from test_stations_endpoint import compare_reports, percentile, print_load_report, summarize_latencies
+
+def make_report(rps=100.0, p50=10.0, p95=20.0, p99=30.0, error_rate=0.0):
+    """Build a load report with the given overall statistics."""
+    overall = {"requests": 1000, "errors": int(error_rate * 1000), "error_rate": error_rate, "rps": rps,
+               "mean_ms": p50, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "max_ms": p99}
+    return {"base_url": "http://api", "concurrency": 4, "duration_s": 10.0,
+            "overall": overall, "paths": {"/stations": overall}}
+
+@pytest.mark.parametrize("values,pct,expected", [
+    (list(range(1, 101)), 95, 95),
+    (list(range(1, 101)), 99, 99),
+    (list(range(1, 101)), 100, 100),
+    (list(range(1, 11)), 50, 5),
+    (list(range(1, 11)), 51, 6),
+    (list(range(1, 11)), 0, 1),
+    ([7], 99, 7),
+    (list(range(1, 101)), 7, 7),
+])
+def test_percentile_nearest_rank(values, pct, expected):
+    """Test that percentile returns the smallest value with at least pct% of values at or below it."""
+    assert percentile(values, pct) == expected
+
+def test_percentile_empty():
+    """Test that an empty run reports zero."""
+    assert percentile([], 50) == 0.0
+
+def test_summarize_latencies():
+    """Test that latencies are summarized into milliseconds, throughput and error rate."""
+    stats = summarize_latencies([0.004, 0.001, 0.003, 0.002], errors=1, elapsed=2.0)
+    assert stats["requests"] == 4
+    assert stats["errors"] == 1
+    assert stats["error_rate"] == 0.25
+    assert stats["rps"] == 2.0
+    assert stats["mean_ms"] == pytest.approx(2.5)
+    assert stats["p50_ms"] == pytest.approx(2.0)
+    assert stats["p95_ms"] == pytest.approx(4.0)
+    assert stats["max_ms"] == pytest.approx(4.0)
+
+def test_summarize_latencies_without_requests():
+    """Test that a run with no requests does not divide by zero."""
+    stats = summarize_latencies([], errors=0, elapsed=0.0)
+    assert stats["rps"] == stats["error_rate"] == stats["mean_ms"] == stats["max_ms"] == 0.0
+
+def test_compare_reports_within_tolerance():
+    """Test that small changes against the baseline are not regressions."""
+    assert compare_reports(make_report(rps=90, p99=35), make_report(), tolerance=0.2) == []
+
+def test_compare_reports_flags_each_regression():
+    """Test that throughput, latency and error rate regressions are each reported."""
+    current = make_report(rps=70, p50=13, p95=20, p99=40, error_rate=0.01)
+    regressions = compare_reports(current, make_report(), tolerance=0.2)
+    assert [line.split()[0] for line in regressions] == ["throughput", "p50_ms", "p99_ms", "error"]
+
+def test_compare_reports_ignores_empty_baseline():
+    """Test that zero baseline values are not compared against."""
+    baseline = make_report(rps=0, p50=0, p95=0, p99=0)
+    assert compare_reports(make_report(), baseline, tolerance=0.2) == []
+
+def test_print_load_report(capsys):
+    """Test that the report prints one row per path and a total row."""
+    print_load_report(make_report())
+    lines = capsys.readouterr().out.splitlines()
+    assert any(line.startswith("/stations ") for line in lines)
+    assert any(line.startswith("TOTAL ") for line in lines)
+
+def load_args(tmp_path, **overrides):
+    """Build load mode arguments writing results under tmp_path."""
+    args = {"base_url": "http://api", "concurrency": 4, "duration": 10.0, "timeout": 5.0,
+            "output": str(tmp_path / "results.json"), "compare": None, "tolerance": 0.2,
+            "max_error_rate": 0.0}
+    args.update(overrides)
+    return Namespace(**args)
+
+def test_load_command_writes_results_and_passes(tmp_path):
+    """Test that a clean run is written to --output and passes."""
+    report = make_report()
+    with patch.object(endpoint_script, 'run_load_test', return_value=report):
+        assert endpoint_script.load_command(load_args(tmp_path)) is True
+    assert json.loads((tmp_path / "results.json").read_text()) == report
+
+def test_load_command_fails_on_error_rate(tmp_path):
+    """Test that a run above --max-error-rate fails."""
+    with patch.object(endpoint_script, 'run_load_test', return_value=make_report(error_rate=0.05)):
+        assert endpoint_script.load_command(load_args(tmp_path, max_error_rate=0.01)) is False
+
+def test_load_command_fails_on_regression(tmp_path):
+    """Test that a run regressing against --compare fails."""
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(make_report()))
+    args = load_args(tmp_path, compare=str(baseline))
+    with patch.object(endpoint_script, 'run_load_test', return_value=make_report(p99=60)):
+        assert endpoint_script.load_command(args) is False
+    with patch.object(endpoint_script, 'run_load_test', return_value=make_report(p99=31)):
+        assert endpoint_script.load_command(args) is True
@@ -0,0 +1,181 @@
+import io
+import json
+import logging
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+from src.logging_config import (
+    DeferredQueueHandler, JsonFormatter, RouteSampler, begin_request_sampling, configure_logging,
+    end_request_sampling, init_request_sampling, parse_sample_rates, sampled_logger
+)
+
+@pytest.fixture
+def flask_app():
+    """Create a Flask app with request sampling and a route that logs."""
+    flask_app = Flask(__name__)
+    init_request_sampling(flask_app)
+
+    @flask_app.route('/hot')
+    def hot():
+        logging.getLogger('src.test').info("handled hot")
+        return ''
+
+    return flask_app
+
+@pytest.fixture
+def restore_logging():
+    """Reinstall the default logging configuration after the test."""
+    yield
+    configure_logging()
+
+def make_record(level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    """Build a LogRecord with optional extra attributes."""
+    record = logging.LogRecord('test', level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+def test_json_formatter_includes_message_and_extra():
+    """Test records are rendered as JSON with extra fields."""
+    entry = json.loads(JsonFormatter().format(make_record(city="Chicago")))
+    assert entry['message'] == 'hello world'
+    assert entry['level'] == 'INFO'
+    assert entry['logger'] == 'test'
+    assert entry['city'] == 'Chicago'
+    assert 'args' not in entry
+
+def test_deferred_queue_handler_does_not_format():
+    """Test records are enqueued without formatting their arguments."""
+    record = make_record()
+    prepared = DeferredQueueHandler(None).prepare(record)
+    assert prepared.msg == "hello %s"
+    assert prepared.args == ("world",)
+
+def test_parse_sample_rates():
+    """Test rate parsing, clamping and the default entry."""
+    assert parse_sample_rates('') == {}
+    assert parse_sample_rates('/stations=0.01, /hello=0,*=2') == {
+        '/stations': 0.01, '/hello': 0.0, '*': 1.0
+    }
+
+def test_route_sampler_drops_unsampled_routes(restore_logging):
+    """Test INFO records are sampled per route, but warnings always pass."""
+    sampler = RouteSampler({'/hot': 0.0})
+    configure_logging(sample_rates={'/hot': 0.0})
+    token = begin_request_sampling('/hot')
+    try:
+        assert sampler.filter(make_record()) is False
+        warning = make_record(level=logging.WARNING)
+        assert sampler.filter(warning) is True
+        assert warning.route == '/hot'
+    finally:
+        end_request_sampling(token)
+    token = begin_request_sampling('/cold')
+    try:
+        assert sampler.filter(make_record()) is True
+    finally:
+        end_request_sampling(token)
+
+def test_route_sampler_decision_is_per_request():
+    """Test rates of 0 and 1 always drop and always keep."""
+    sampler = RouteSampler({'/hot': 0.0, '/cold': 1.0})
+    assert not any(sampler.decide('/hot') for _ in range(50))
+    assert all(sampler.decide('/cold') for _ in range(50))
+
+def test_route_sampler_passes_records_outside_requests():
+    """Test records logged outside a request are never sampled."""
+    assert RouteSampler({}, default_rate=0.0).filter(make_record()) is True
+
+def test_request_sampling_hooks_drop_sampled_out_requests(flask_app, restore_logging):
+    """Test a route sampled at 0 writes no INFO lines through the app hooks."""
+    stream = io.StringIO()
+    listener = configure_logging(level='INFO', log_format='json', sample_rates={'/hot': 0.0}, stream=stream)
+    flask_app.test_client().get('/hot')
+    logging.getLogger('src.test').info("after request")
+    listener.stop()
+
+    messages = [json.loads(line)['message'] for line in stream.getvalue().splitlines()]
+    assert messages == ['after request']
+
+def test_request_sampling_hooks_tag_route(flask_app, restore_logging):
+    """Test kept records carry the matched route."""
+    stream = io.StringIO()
+    listener = configure_logging(level='INFO', log_format='json', sample_rates={}, stream=stream)
+    flask_app.test_client().get('/hot')
+    listener.stop()
+
+    entry = json.loads(stream.getvalue().splitlines()[-1])
+    assert entry['message'] == 'handled hot'
+    assert entry['route'] == '/hot'
+
+def test_configure_logging_writes_json_from_listener(restore_logging):
+    """Test the listener thread writes formatted JSON lines."""
+    stream = io.StringIO()
+    listener = configure_logging(level='INFO', log_format='json', sample_rates={}, stream=stream)
+    logging.getLogger('src.test').info("loaded %d stations", 5)
+    listener.stop()
+    
+    entry = json.loads(stream.getvalue().strip().splitlines()[-1])
+    assert entry['message'] == 'loaded 5 stations'
+    assert entry['logger'] == 'src.test'
+
+def test_configure_logging_leaves_global_logging_settings(restore_logging):
+    """Test configuring the app's logging does not change how other code's records are built."""
+    srcfile, multiprocessing = logging._srcfile, logging.logMultiprocessing
+    configure_logging(sample_rates={})
+    assert (logging._srcfile, logging.logMultiprocessing) == (srcfile, multiprocessing)
+    record = logging.getLogger('src.test').makeRecord('src.test', logging.INFO, __file__, 7, "hi", (), None)
+    assert record.lineno == 7
+
+class RecordingHandler(logging.Handler):
+    """Keep every record handed to the handler, unfiltered."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+@pytest.fixture
+def recorded():
+    """Attach a RecordingHandler to the 'src.sampled' logger."""
+    handler = RecordingHandler()
+    logger = logging.getLogger('src.sampled')
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    yield handler.records
+    logger.removeHandler(handler)
+    logger.setLevel(logging.NOTSET)
+
+def test_sampled_logger_skips_sampled_out_calls_before_building_records(recorded, restore_logging):
+    """Test INFO and DEBUG calls in a sampled-out request never reach the logger, while warnings do."""
+    logger = sampled_logger('src.sampled')
+    configure_logging(sample_rates={'/hot': 0.0})
+    token = begin_request_sampling('/hot')
+    try:
+        assert not logger.isEnabledFor(logging.INFO)
+        logger.info("dropped %s", 1)
+        logger.debug("dropped")
+        logger.warning("kept %s", 2)
+    finally:
+        end_request_sampling(token)
+    assert [r.getMessage() for r in recorded] == ["kept 2"]
+
+def test_sampled_logger_logs_outside_and_in_sampled_requests(recorded, restore_logging):
+    """Test calls outside requests and in sampled-in requests are logged with the caller's location and extra."""
+    logger = sampled_logger('src.sampled')
+    configure_logging(sample_rates={'/cold': 1.0})
+    line = sys._getframe().f_lineno + 1
+    logger.info("outside", extra={'city': 'Chicago'})
+    token = begin_request_sampling('/cold')
+    try:
+        assert logger.isEnabledFor(logging.INFO)
+        logger.debug("inside %d", 3)
+    finally:
+        end_request_sampling(token)
+    assert [r.getMessage() for r in recorded] == ["outside", "inside 3"]
+    assert recorded[0].city == 'Chicago'
+    assert (recorded[0].filename, recorded[0].lineno) == (os.path.basename(__file__), line)
@@ -0,0 +1,64 @@
+import threading
+
+from src.metrics import MetricsRegistry
+
+def make_registry():
+    """Create a registry with one metric of each type."""
+    registry = MetricsRegistry()
+    registry.counter('requests_total', 'Requests.')
+    registry.histogram('latency_seconds', 'Latency.', (0.1, 1.0))
+    registry.gauge('items', 'Items.', lambda: 3)
+    return registry
+
+def test_counter_increments_and_renders():
+    """Test counters accumulate per label set."""
+    registry = make_registry()
+    registry.inc('requests_total', (('route', '/a'),))
+    registry.inc('requests_total', (('route', '/a'),), amount=2)
+    assert registry.value('requests_total', (('route', '/a'),)) == 3
+    assert 'requests_total{route="/a"} 3' in registry.render()
+
+def test_histogram_renders_cumulative_buckets():
+    """Test histogram buckets, sum and count."""
+    registry = make_registry()
+    for value in (0.05, 0.5, 5.0):
+        registry.observe('latency_seconds', value)
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert 'latency_seconds_sum 5.55' in text
+    assert 'latency_seconds_count 3' in text
+
+def test_gauge_read_at_scrape_time():
+    """Test gauges call their callback when rendered."""
+    assert 'items 3' in make_registry().render()
+
+def test_threads_record_into_separate_shards():
+    """Test values recorded from many threads are merged on scrape."""
+    registry = make_registry()
+
+    def work():
+        for _ in range(1000):
+            registry.inc('requests_total')
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry.value('requests_total') == 8000
+
+def test_label_values_are_escaped():
+    """Test quotes and backslashes in label values are escaped."""
+    registry = make_registry()
+    registry.inc('requests_total', (('route', 'a"b\\c'),))
+    assert 'requests_total{route="a\\"b\\\\c"} 1' in registry.render()
+
+def test_reset_clears_values():
+    """Test reset drops recorded values."""
+    registry = make_registry()
+    registry.inc('requests_total')
+    registry.reset()
+    assert registry.value('requests_total') == 0
@@ -0,0 +1,44 @@
+import pytest
+from src.pagination import (
+    MAX_PAGE_SIZE, decode_cursor, encode_cursor, page_rows, parse_limit, resolve_cursor
+)
+from src.stations import StationStore
+
+def test_cursor_round_trip():
+    """Test that cursors decode to the id and position they were built from."""
+    cursor = encode_cursor("st042", 41)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("st042", 41)
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", "eyJpZCI6MX0", "W10"])
+def test_decode_cursor_rejects_malformed_tokens(cursor):
+    """Test that malformed cursors raise ValueError."""
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_resolve_cursor_follows_station_id():
+    """Test that cursors track their station when rows shift."""
+    stations = [
+        {"id": f"st{i}", "name": "Station", "city": "Boston", "code": f"C{i}"}
+        for i in range(5)
+    ]
+    store = StationStore(stations[1:], lambda station: True)
+    assert resolve_cursor(store, encode_cursor("st2", 2)) == 1
+    assert resolve_cursor(store, encode_cursor("gone", 3)) == 3
+
+def test_parse_limit():
+    """Test limit parsing, clamping and validation."""
+    assert parse_limit(None) is None
+    assert parse_limit("  ") is None
+    assert parse_limit("10") == 10
+    assert parse_limit(str(MAX_PAGE_SIZE + 1)) == MAX_PAGE_SIZE
+    for bad in ("0", "-1", "ten", "1.5"):
+        with pytest.raises(ValueError, match="^limit must be a positive integer$"):
+            parse_limit(bad)
+
+def test_page_rows_over_range_and_posting_list():
+    """Test pages slice both full ranges and sparse posting lists."""
+    assert page_rows(range(5), None, 2) == (range(0, 2), True)
+    assert page_rows(range(5), 3, 2) == (range(4, 5), False)
+    assert page_rows([1, 4, 9], 4, None) == ([9], False)
+    assert page_rows([1, 4, 9], 2, 1) == ([4], True)
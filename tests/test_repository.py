@@ -0,0 +1,224 @@
+import sqlite3
+import threading
+
+import pytest
+from src.repository import ConnectionPool, PoolTimeout, SqlStationRepository, open_sqlite_repository
+from src.stations import StationStore
+
+SAMPLE_STATIONS = [
+    {"id": "st001", "name": "Union Station", "city": "New York", "code": "NYS"},
+    {"id": "st002", "name": "Central Station", "city": "Chicago", "code": "CHI"},
+    {"id": "st003", "name": "Ogilvie Center", "city": "Chicago", "code": "OTC", "platforms": 16},
+    {"id": "st004", "name": "Penn Station", "city": "New York", "code": "NYP"},
+    {"id": "st005", "name": "Union Station", "city": "Chicago", "code": "CUS"},
+]
+
+def _is_valid(station):
+    """Minimal validator used by the repository tests."""
+    return isinstance(station, dict) and all(
+        isinstance(station.get(field), str) and station[field].strip()
+        for field in ("id", "name", "city", "code")
+    )
+
+@pytest.fixture
+def repository(tmp_path):
+    """Open a SQLite repository in a temporary file, loaded with the sample stations."""
+    repository = open_sqlite_repository(str(tmp_path / "stations.db"), pool_size=2, timeout=0.5)
+    repository.replace_stations(SAMPLE_STATIONS, _is_valid)
+    yield repository
+    repository.pool.close()
+
+def test_replace_stations_quarantines_invalid_records(repository):
+    """Test invalid rows are not written and are counted."""
+    bad = {"id": "st999", "name": "  ", "city": "Chicago", "code": "BAD"}
+    assert repository.replace_stations(SAMPLE_STATIONS + [bad], _is_valid) == 5
+    assert len(repository) == 5
+    assert repository.quarantine_count == 1
+
+def test_replace_stations_starts_new_version(repository):
+    """Test rewriting the data invalidates cached responses."""
+    version = repository.version
+    repository.replace_stations(SAMPLE_STATIONS[:1], _is_valid)
+    assert repository.version != version
+    assert len(repository) == 1
+
+@pytest.mark.parametrize("city,code", [("", ""), ("chicago", ""), ("", "nys"), ("CHICAGO", "otc"), ("Nowhere", "")])
+@pytest.mark.parametrize("after,limit", [(None, None), (None, 1), (1, 2), (4, None)])
+def test_page_matches_in_memory_store(repository, city, code, after, limit):
+    """Test the database backend returns the same pages as the in-memory store."""
+    expected = StationStore(SAMPLE_STATIONS, _is_valid).page(city=city, code=code, after=after, limit=limit)
+    page = repository.page(city=city, code=code, after=after, limit=limit)
+    assert page.records == expected.records
+    assert list(page.positions) == list(expected.positions)
+    assert page.has_more == expected.has_more
+
+@pytest.mark.parametrize("filters", [
+    {"city": ["chicago", "new york"], "code": ["CUS", "nyp", "zzz"]},
+    {"name": "UNION station"},
+    {"name": ["Union Station", "Penn Station"], "city": "New York"},
+    {"name": "Nowhere Station"},
+    {"id": ["st005", "st002", "nope"], "city": "chicago"},
+])
+def test_multi_value_filters_match_in_memory_store(repository, filters):
+    """Test multi-value, name and id filters return the same pages as the in-memory store."""
+    expected = StationStore(SAMPLE_STATIONS, _is_valid).page(after=0, limit=2, **filters)
+    page = repository.page(after=0, limit=2, **filters)
+    assert page.records == expected.records
+    assert list(page.positions) == list(expected.positions)
+    assert page.has_more == expected.has_more
+    assert list(repository.stream(**filters)) == list(StationStore(SAMPLE_STATIONS, _is_valid).stream(**filters))
+
+def test_stream_yields_matching_records(repository):
+    """Test streaming returns the same records as a page."""
+    assert list(repository.stream(city="Chicago", after=1)) == SAMPLE_STATIONS[2:3] + SAMPLE_STATIONS[4:]
+
+def test_records_keep_extra_fields(repository):
+    """Test fields outside the required set round-trip through the database."""
+    record = repository.page(code="OTC").records[0]
+    assert record["platforms"] == 16
+
+def test_position_of(repository):
+    """Test station ids resolve to their catalogue position."""
+    assert repository.position_of("st003") == 2
+    assert repository.position_of("missing") is None
+
+def test_filter_queries_use_key_indexes(repository):
+    """Test filtered queries are answered from the case-folded key indexes."""
+    for filters, index in (({'city': 'x'}, "stations_city_key"), ({'code': 'x'}, "stations_code_key"),
+                           ({'city': ['x', 'y']}, "stations_city_key"), ({'id': ['x', 'y']}, "stations_id")):
+        query, params = repository._page_params(**dict({'city': '', 'code': '', 'name': '', 'id': ''}, **filters),
+                                                after=None, limit=1)
+        with repository.pool.connection() as conn:
+            plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params))
+        assert index in plan
+
+def test_format_paramstyle_rewrites_placeholders():
+    """Test queries are rewritten for drivers using %s placeholders."""
+    repository = SqlStationRepository(ConnectionPool(lambda: None), paramstyle='format')
+    query, _ = repository._page_params('x', ['y', 'z'], '', '', after=None, limit=1)
+    assert "%s" in query
+    assert "?" not in query
+    with pytest.raises(ValueError):
+        SqlStationRepository(ConnectionPool(lambda: None), paramstyle='named')
+
+def test_pool_reuses_connections(tmp_path):
+    """Test a returned connection is handed out again."""
+    opened = []
+
+    def connect():
+        conn = sqlite3.connect(str(tmp_path / "pool.db"), check_same_thread=False)
+        opened.append(conn)
+        return conn
+
+    pool = ConnectionPool(connect, max_size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert len(opened) == 1
+
+def test_pool_times_out_when_exhausted(tmp_path):
+    """Test borrowers wait at most the pool timeout for a free connection."""
+    pool = ConnectionPool(lambda: sqlite3.connect(str(tmp_path / "pool.db"), check_same_thread=False),
+                          max_size=1, timeout=0.05)
+    with pool.connection():
+        errors = []
+
+        def borrow():
+            try:
+                with pool.connection():
+                    pass
+            except PoolTimeout as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=borrow)
+        thread.start()
+        thread.join()
+    assert len(errors) == 1
+
+def test_pool_discards_broken_connections():
+    """Test a connection that cannot be rolled back is closed, not reused."""
+    class Broken:
+        closed = False
+
+        def rollback(self):
+            raise sqlite3.OperationalError("connection lost")
+
+        def close(self):
+            self.closed = True
+
+    connections = []
+    pool = ConnectionPool(lambda: connections.append(Broken()) or connections[-1])
+    with pool.connection():
+        pass
+    with pool.connection():
+        pass
+    assert len(connections) == 2
+    assert connections[0].closed
+
+def test_search_matches_in_memory_store(repository):
+    """Test name search over the database returns the in-memory ranking."""
+    store = StationStore(SAMPLE_STATIONS, _is_valid)
+    for query in ("union", "stat", "ogilvy", "nothing"):
+        assert repository.search(query, 3) == store.search(query, 3)
+
+def test_search_index_follows_data_version(repository):
+    """Test the name index is rebuilt after the data changes."""
+    assert repository.search("penn") != []
+    repository.replace_stations(SAMPLE_STATIONS[:1], _is_valid)
+    assert repository.search("penn") == []
+
+def test_nearby_matches_in_memory_store(tmp_path):
+    """Test nearest-station queries over the database match the in-memory store."""
+    stations = [
+        {**SAMPLE_STATIONS[0], "lat": 40.7527, "lon": -73.9772},
+        {**SAMPLE_STATIONS[1], "lat": 41.8789, "lon": -87.6359},
+        SAMPLE_STATIONS[2],
+        {**SAMPLE_STATIONS[3], "lat": 40.7506, "lon": -73.9935},
+    ]
+    repository = open_sqlite_repository(str(tmp_path / "geo.db"))
+    repository.replace_stations(stations, _is_valid)
+    store = StationStore(stations, _is_valid)
+    for radius in (None, 5.0):
+        assert repository.nearby(40.75, -73.99, radius, 2) == store.nearby(40.75, -73.99, radius, 2)
+    assert [record.id for record, _ in repository.nearby(40.75, -73.99, None, 10)] == ["st004", "st001", "st002"]
+    repository.pool.close()
+
+def test_lookups_match_in_memory_store(repository, monkeypatch):
+    """Test batch id and code lookups over the database match the in-memory store, across chunks."""
+    monkeypatch.setattr("src.repository.LOOKUP_CHUNK_SIZE", 2)
+    store = StationStore(SAMPLE_STATIONS, _is_valid)
+    ids = ["st005", "nope", "st001", "st003", "st001"]
+    codes = ["cus", "NYS", "", "xxx", "otc", "nys"]
+    assert repository.lookup_ids(ids) == store.lookup_ids(ids)
+    assert repository.lookup_codes(codes) == store.lookup_codes(codes)
+
+def test_version_follows_writes_from_another_connection(tmp_path):
+    """Test a reload made through another repository, as by a separate process, starts a new version."""
+    path = str(tmp_path / "shared.db")
+    server = open_sqlite_repository(path, check_interval=0)
+    server.replace_stations(SAMPLE_STATIONS, _is_valid)
+    version = server.version
+    assert server.version == version
+    assert server.search("penn") != []
+
+    loader = open_sqlite_repository(path)
+    loader.replace_stations(SAMPLE_STATIONS[:1], _is_valid)
+    assert server.version != version
+    assert server.search("penn") == []
+    loader.pool.close()
+    server.pool.close()
+
+def test_version_checked_at_most_every_interval(tmp_path, monkeypatch):
+    """Test the generation row is only read once per check interval."""
+    clock = [1000.0]
+    monkeypatch.setattr("src.repository.time.monotonic", lambda: clock[0])
+    path = str(tmp_path / "shared.db")
+    server = open_sqlite_repository(path, check_interval=60)
+    version = server.version
+    open_sqlite_repository(path).replace_stations(SAMPLE_STATIONS, _is_valid)
+    clock[0] += 59
+    assert server.version == version
+    clock[0] += 1
+    assert server.version != version
+    server.pool.close()
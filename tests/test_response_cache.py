@@ -0,0 +1,59 @@
+from src.response_cache import CachedResponse, ResponseCache
+
+def test_cached_response_etag_is_content_based():
+    """Test identical bodies share an ETag and different bodies do not."""
+    assert CachedResponse(b"[1]").etag == CachedResponse(b"[1]").etag
+    assert CachedResponse(b"[1]").etag != CachedResponse(b"[2]").etag
+
+def test_get_returns_stored_entry():
+    """Test a stored body is returned for the same version and key."""
+    cache = ResponseCache()
+    entry = cache.put(1, ("", ""), b"[]", 0)
+    assert cache.get(1, ("", "")) is entry
+    assert cache.hits == 1
+
+def test_version_change_invalidates_entries():
+    """Test entries from an older data version are never served."""
+    cache = ResponseCache()
+    cache.put(1, ("", ""), b"[]")
+    assert cache.get(2, ("", "")) is None
+    assert len(cache) == 0
+    assert cache.misses == 1
+
+def test_lru_eviction_by_entry_count():
+    """Test the least recently used entry is evicted first."""
+    cache = ResponseCache(max_entries=2)
+    cache.put(1, "a", b"a")
+    cache.put(1, "b", b"b")
+    cache.get(1, "a")
+    cache.put(1, "c", b"c")
+    assert cache.get(1, "b") is None
+    assert cache.get(1, "a") is not None
+    assert cache.get(1, "c") is not None
+
+def test_lru_eviction_by_size():
+    """Test the cache stays within its byte budget."""
+    cache = ResponseCache(max_entries=10, max_bytes=10)
+    cache.put(1, "a", b"12345")
+    cache.put(1, "b", b"12345")
+    cache.put(1, "c", b"123")
+    assert cache.size_bytes <= 10
+    assert cache.get(1, "a") is None
+
+def test_oversized_body_is_not_cached():
+    """Test bodies larger than the byte budget are returned but not stored."""
+    cache = ResponseCache(max_bytes=4)
+    entry = cache.put(1, "a", b"123456")
+    assert entry.body == b"123456"
+    assert len(cache) == 0
+
+def test_encoded_variants_are_stored_and_counted():
+    """Test a compressed variant is built once per entry and counts towards the byte budget."""
+    cache = ResponseCache()
+    entry = cache.put(1, "a", b"[1]" * 100)
+    data = cache.encoded(1, "a", entry, 'gzip')
+    assert cache.encoded(1, "a", entry, 'gzip') is data
+    assert entry.variants == {'gzip': data}
+    assert cache.size_bytes == 300 + len(data)
+    cache.put(1, "a", b"[2]")
+    assert cache.size_bytes == 3
@@ -0,0 +1,62 @@
+import pytest
+from src.search import NameSearchIndex, normalize, similarity, trigrams
+
+NAMES = [
+    "Union Station",
+    "Central Station",
+    "Ogilvie Transportation Center",
+    "Penn Station",
+    "Union Square",
+    "Grand Central Terminal",
+    "South Station",
+]
+
+@pytest.fixture
+def index():
+    """Build a search index over the sample names."""
+    return NameSearchIndex(NAMES)
+
+def names(index, query, limit=10):
+    """Return the matching names for a query."""
+    return [NAMES[row] for row in index.search(query, limit)]
+
+def test_normalize_folds_case_and_punctuation():
+    """Test names and queries normalize to lowercase words."""
+    assert normalize("  St. Pancras-International ") == "st pancras international"
+
+def test_similarity_of_close_words():
+    """Test a one-letter typo stays above the fuzzy threshold."""
+    assert similarity(trigrams("union"), trigrams("union")) == 1.0
+    assert similarity(trigrams("unon"), trigrams("union")) >= 0.3
+    assert similarity(trigrams("penn"), trigrams("ogilvie")) == 0.0
+
+def test_name_prefix_matches_first_alphabetically(index):
+    """Test names starting with the query rank first, in alphabetical order."""
+    assert names(index, "uni") == ["Union Square", "Union Station"]
+
+def test_word_prefix_matches_follow_name_prefix(index):
+    """Test later-word prefix matches follow whole-name prefix matches."""
+    assert names(index, "centra") == ["Central Station", "Grand Central Terminal"]
+    assert names(index, "central term") == ["Grand Central Terminal"]
+
+def test_limit_is_respected(index):
+    """Test no more than limit results are returned."""
+    assert len(names(index, "station", limit=2)) == 2
+
+def test_typo_tolerant_matches(index):
+    """Test misspelled words still find the station."""
+    assert names(index, "ogilvy") == ["Ogilvie Transportation Center"]
+    assert names(index, "unon squar")[0] == "Union Square"
+
+def test_no_match(index):
+    """Test unrelated queries and queries without words return nothing."""
+    assert names(index, "xyzzy") == []
+    assert names(index, " - ") == []
+
+def test_exact_matches_whole_normalized_names(index):
+    """Test exact lookups ignore case and punctuation but not missing words."""
+    assert list(index.exact("union station")) == [0]
+    assert list(index.exact("UNION-STATION!")) == [0]
+    assert list(index.exact("Union")) == []
+    assert list(index.exact(" - ")) == []
+    assert index.key(0) == "union station"
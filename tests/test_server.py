@@ -0,0 +1,53 @@
+import pytest
+from src.server import ProductionServer, build_options
+from src.app import app
+
+def test_build_options_defaults(monkeypatch):
+    """Test default production settings."""
+    for name in ('SERVER_MODE', 'PORT', 'WEB_CONCURRENCY', 'GUNICORN_THREADS', 'GUNICORN_KEEPALIVE'):
+        monkeypatch.delenv(name, raising=False)
+    options = build_options()
+    assert options['bind'] == '0.0.0.0:80'
+    assert options['workers'] >= 1
+    assert options['worker_class'] == 'gthread'
+    assert options['keepalive'] == 65
+    assert options['preload_app'] is True
+
+def test_build_options_from_environment(monkeypatch):
+    """Test settings are read from the environment."""
+    monkeypatch.setenv('PORT', '8080')
+    monkeypatch.setenv('WEB_CONCURRENCY', '3')
+    monkeypatch.setenv('GUNICORN_THREADS', '1')
+    monkeypatch.setenv('GUNICORN_MAX_REQUESTS', '1000')
+    options = build_options()
+    assert options['bind'] == '0.0.0.0:8080'
+    assert options['workers'] == 3
+    assert options['worker_class'] == 'sync'
+    assert options['max_requests'] == 1000
+    assert options['max_requests_jitter'] == 100
+
+def test_production_server_loads_options():
+    """Test options are applied to the gunicorn config."""
+    server = ProductionServer(app, {'bind': '127.0.0.1:9000', 'workers': 2, 'threads': 8})
+    assert server.cfg.bind == ['127.0.0.1:9000']
+    assert server.cfg.workers == 2
+    assert server.cfg.threads == 8
+    assert server.load() is app
+
+def test_build_options_asgi_mode(monkeypatch):
+    """Test SERVER_MODE=asgi selects the asyncio worker."""
+    monkeypatch.setenv('SERVER_MODE', 'asgi')
+    monkeypatch.setenv('GUNICORN_WORKER_CONNECTIONS', '500')
+    options = build_options()
+    assert options['worker_class'] == 'asgi'
+    assert options['worker_connections'] == 500
+    monkeypatch.setenv('SERVER_MODE', 'eventlet')
+    with pytest.raises(ValueError):
+        build_options()
+
+def test_production_server_warms_up_on_load():
+    """Test the warm-up hook runs when gunicorn loads the app."""
+    calls = []
+    server = ProductionServer(app, {'workers': 1}, warm_up=lambda: calls.append('warm'))
+    assert server.load() is app
+    assert calls == ['warm']
@@ -0,0 +1,81 @@
+import json
+import os
+import time
+
+import pytest
+from src.station_source import StationFileSource, read_station_file
+from src.stations import StationStore
+
+SAMPLE_STATIONS = [
+    {"id": "st001", "name": "Union Station", "city": "New York", "code": "NYS"},
+    {"id": "st002", "name": "Central Station", "city": "Chicago", "code": "CHI"},
+]
+
+def _build(stations):
+    """Build a store that accepts dicts with every required field."""
+    return StationStore(stations, lambda s: isinstance(s, dict) and all(s.get(f) for f in ("id", "name", "city", "code")))
+
+def _write_json(path, stations):
+    """Write stations and move the mtime forward so the change is always seen."""
+    path.write_text(json.dumps(stations))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+@pytest.fixture
+def station_file(tmp_path):
+    """Write the sample stations to a JSON file."""
+    path = tmp_path / "stations.json"
+    _write_json(path, SAMPLE_STATIONS)
+    return path
+
+def test_read_json_ndjson_and_csv(tmp_path):
+    """Test each supported format reads to the same records."""
+    (tmp_path / "s.ndjson").write_text("\n".join(json.dumps(s) for s in SAMPLE_STATIONS) + "\n\n")
+    (tmp_path / "s.csv").write_text("id,name,city,code\n" + "".join(
+        f"{s['id']},{s['name']},{s['city']},{s['code']}\n" for s in SAMPLE_STATIONS))
+    (tmp_path / "s.json").write_text(json.dumps(SAMPLE_STATIONS))
+    for name in ("s.json", "s.ndjson", "s.csv"):
+        assert read_station_file(str(tmp_path / name)) == SAMPLE_STATIONS
+
+def test_read_rejects_unknown_extension_and_non_list(tmp_path):
+    """Test unsupported files raise ValueError."""
+    (tmp_path / "s.xml").write_text("<stations/>")
+    (tmp_path / "s.json").write_text('{"id": "st001"}')
+    with pytest.raises(ValueError):
+        read_station_file(str(tmp_path / "s.xml"))
+    with pytest.raises(ValueError):
+        read_station_file(str(tmp_path / "s.json"))
+
+def test_check_publishes_new_snapshot_on_change(station_file):
+    """Test a changed file is rebuilt and swapped in as a new store."""
+    source = StationFileSource(str(station_file), _build)
+    old_store = source.store
+    assert source.check() is False
+
+    _write_json(station_file, SAMPLE_STATIONS[:1])
+    assert source.check() is True
+    assert source.store is not old_store
+    assert len(source.store) == 1
+    # A request still holding the old snapshot sees it unchanged
+    assert len(old_store) == 2
+
+def test_check_keeps_snapshot_when_file_is_broken(station_file):
+    """Test a malformed file leaves the current snapshot in place."""
+    source = StationFileSource(str(station_file), _build)
+    store = source.store
+    station_file.write_text("[{not json")
+    assert source.check() is False
+    assert source.store is store
+
+def test_watcher_thread_reloads_in_background(station_file):
+    """Test the watcher thread picks up changes without being asked."""
+    source = StationFileSource(str(station_file), _build, interval=0.01)
+    source.start()
+    try:
+        _write_json(station_file, SAMPLE_STATIONS[:1])
+        deadline = time.time() + 5
+        while len(source.store) != 1 and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(source.store) == 1
+    finally:
+        source.stop()
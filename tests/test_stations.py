@@ -0,0 +1,159 @@
+import pytest
+from src.stations import RowFilter, StationIndex, StationRecord, StationStore, fold_key, intersect_rows
+
+SAMPLE_STATIONS = [
+    {"id": "st001", "name": "Union Station", "city": "New York", "code": "NYS"},
+    {"id": "st002", "name": "Central Station", "city": "Chicago", "code": "CHI"},
+    {"id": "st003", "name": "Ogilvie Center", "city": "Chicago", "code": "OTC"},
+    {"id": "st004", "name": "Penn Station", "city": "New York", "code": "NYP"},
+]
+
+@pytest.fixture
+def index():
+    """Build an index over the sample stations."""
+    return StationIndex(SAMPLE_STATIONS)
+
+def test_fold_key_normalizes_case_and_whitespace():
+    """Test that keys are case-folded and trimmed."""
+    assert fold_key("  New York ") == "new york"
+    assert fold_key("CHI") == fold_key("chi")
+
+def test_find_without_filters_returns_all(index):
+    """Test that an empty filter returns every station in order."""
+    assert index.find() == SAMPLE_STATIONS
+
+def test_find_by_city_preserves_catalogue_order(index):
+    """Test city lookups return all matches in catalogue order."""
+    result = index.find(city="new york")
+    assert [s["id"] for s in result] == ["st001", "st004"]
+
+def test_find_by_code(index):
+    """Test code lookups are case-insensitive."""
+    result = index.find(code="otc")
+    assert [s["id"] for s in result] == ["st003"]
+
+def test_find_by_city_and_code_intersects(index):
+    """Test combined filters return only rows matching both."""
+    assert [s["id"] for s in index.find(city="Chicago", code="CHI")] == ["st002"]
+    assert index.find(city="Chicago", code="NYS") == []
+
+def test_find_unknown_key_returns_empty(index):
+    """Test unknown keys return an empty list."""
+    assert index.find(city="Nowhere") == []
+    assert index.find(code="ZZZ") == []
+
+def test_index_skips_rows_without_string_fields():
+    """Test malformed rows are kept but never matched by a filter."""
+    index = StationIndex([{"id": "bad", "city": None}, "not a dict"] + SAMPLE_STATIONS[:1])
+    assert len(index) == 3
+    assert [s["id"] for s in index.find(city="New York")] == ["st001"]
+
+def test_index_keeps_the_list_it_is_given(index):
+    """Test the index holds the caller's list instead of a second copy."""
+    assert index.stations is SAMPLE_STATIONS
+    assert index.find() is not SAMPLE_STATIONS
+
+def _is_valid(station):
+    """Minimal validator used by the store tests."""
+    return isinstance(station, dict) and all(
+        isinstance(station.get(field), str) and station[field].strip()
+        for field in ("id", "name", "city", "code")
+    )
+
+def test_store_quarantines_invalid_records():
+    """Test invalid rows are counted and never returned."""
+    bad = {"id": "st999", "name": "", "city": "Chicago", "code": "BAD"}
+    store = StationStore(SAMPLE_STATIONS + [bad, None], _is_valid)
+    assert len(store) == len(SAMPLE_STATIONS)
+    assert store.quarantine_count == 2
+    assert store.quarantined == [bad, None]
+    assert store.find(code="BAD") == []
+
+def test_store_normalizes_records_once():
+    """Test required fields are trimmed and the validator runs once per row."""
+    calls = []
+
+    def validator(station):
+        calls.append(station)
+        return _is_valid(station)
+
+    raw = {"id": " st010 ", "name": "Back Bay ", "city": " Boston", "code": "BBY "}
+    store = StationStore([raw], validator)
+    assert store.find(city="boston") == [
+        {"id": "st010", "name": "Back Bay", "city": "Boston", "code": "BBY"}
+    ]
+    store.find(code="bby")
+    assert len(calls) == 1
+    assert raw["id"] == " st010 "
+
+def test_station_record_round_trips_dict():
+    """Test records convert back to the dict they were built from."""
+    record = StationRecord.from_dict(SAMPLE_STATIONS[0])
+    assert record.to_dict() == SAMPLE_STATIONS[0]
+    assert record == SAMPLE_STATIONS[0]
+    assert record["city"] == "New York"
+    assert record.get("code") == "NYS"
+    assert record.get("missing") is None
+    with pytest.raises(KeyError):
+        record["missing"]
+
+def test_station_record_keeps_extra_fields():
+    """Test fields outside the required set are preserved."""
+    station = dict(SAMPLE_STATIONS[1], platforms=12)
+    record = StationRecord.from_dict(station)
+    assert record["platforms"] == 12
+    assert record.to_dict() == station
+
+def test_station_record_has_no_instance_dict():
+    """Test records are slotted and share interned city strings."""
+    first = StationRecord.from_dict(SAMPLE_STATIONS[1])
+    second = StationRecord.from_dict(dict(SAMPLE_STATIONS[2], city="".join(["Chi", "cago"])))
+    assert not hasattr(first, "__dict__")
+    assert first.city is second.city
+
+def test_index_handles_single_and_shared_keys(index):
+    """Test single-row and multi-row postings are both returned as sequences."""
+    assert list(index.rows(code="NYS")) == [0]
+    assert list(index.rows(city="New York")) == [0, 3]
+    assert list(index.rows(code="missing")) == []
+
+def test_store_page_and_stream():
+    """Test pages carry positions and whether more rows follow."""
+    store = StationStore(SAMPLE_STATIONS, _is_valid)
+    page = store.page(city="New York", limit=1)
+    assert page.records == SAMPLE_STATIONS[:1]
+    assert list(page.positions) == [0]
+    assert page.has_more
+    assert list(store.stream(city="New York", after=0)) == SAMPLE_STATIONS[3:]
+
+def test_find_with_several_values_per_filter(index):
+    """Test alternatives within a filter are OR-ed and results stay in catalogue order."""
+    assert [s["id"] for s in index.find(city=["chicago", "NEW YORK"])] == ["st001", "st002", "st003", "st004"]
+    assert [s["id"] for s in index.find(city=["Chicago", "Nowhere"], code=["otc", "nys"])] == ["st003"]
+    assert index.find(city=["", " "]) == SAMPLE_STATIONS
+
+def test_store_filters_by_name_and_id():
+    """Test name and id filters compose with the city and code indexes."""
+    store = StationStore(SAMPLE_STATIONS + [{"id": "st005", "name": "union station", "city": "Chicago",
+                                             "code": "CUS"}], _is_valid)
+    assert list(store.rows(name="Union Station")) == [0, 4]
+    assert list(store.rows(name=["union station", "penn station"], city="new york")) == [0, 3]
+    assert list(store.rows(id=["st004", "st002", "nope"])) == [1, 3]
+    assert list(store.rows(id="st004", code="CHI")) == []
+    assert store.page(name="Union Station", code="CUS").records[0]["id"] == "st005"
+
+def test_intersection_walks_the_smallest_filter(index):
+    """Test only the shortest candidate list is materialized."""
+    built = []
+    filters = [RowFilter(size, lambda rows=rows: built.append(rows) or rows, lambda p, rows=rows: p in rows)
+               for size, rows in ((3, [0, 1, 2]), (1, [1]), (2, [1, 2]))]
+    assert intersect_rows(filters, 4) == [1]
+    assert built == [[1]]
+    assert intersect_rows([], 3) == range(3)
+
+def test_record_projection():
+    """Test projections keep requested fields the record has, in request order."""
+    record = StationRecord.from_dict({"id": "st001", "name": "Union Station", "city": "New York", "code": "NYS",
+                                      "platforms": 21})
+    assert record.project(("code",)) == {"code": "NYS"}
+    assert list(record.project(("platforms", "id", "lat"))) == ["platforms", "id"]
@@ -0,0 +1,171 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from src.upstream import AsyncHttpPool, AsyncStationUpstream, StationUpstream, UpstreamError, UpstreamTimeout
+
+def test_pool_rejects_bad_urls():
+    """Test only http(s) URLs with a host are accepted."""
+    for url in ("ftp://host", "http://", "stations"):
+        with pytest.raises(ValueError):
+            AsyncHttpPool(url)
+
+def test_fetch_stations_forwards_filters(stub_upstream):
+    """Test only the supported filters are sent and the next cursor is returned."""
+    stub_upstream.respond([{"id": "up1"}], headers={'X-Next-Cursor': 'abc'})
+    upstream = AsyncStationUpstream(stub_upstream.url + "/api/")
+    records, cursor = asyncio.run(upstream.fetch_stations({'code': 'SEA', 'cursor': '', 'stream': 'ndjson'}))
+    assert records == [{"id": "up1"}]
+    assert cursor == 'abc'
+    assert stub_upstream.requests == ['/api/stations?code=SEA']
+
+def test_pool_reuses_connections(stub_upstream):
+    """Test sequential calls share one kept-alive connection."""
+    pool = AsyncHttpPool(stub_upstream.url)
+
+    async def run():
+        for _ in range(3):
+            assert (await pool.get('/stations'))[0] == 200
+        await pool.aclose()
+
+    asyncio.run(run())
+    assert len(stub_upstream.requests) == 3
+    assert len(stub_upstream.client_ports) == 1
+
+def test_pool_retries_connection_closed_while_idle(stub_upstream):
+    """Test a kept-alive connection closed by the upstream is replaced transparently."""
+    pool = AsyncHttpPool(stub_upstream.url)
+
+    async def run():
+        await pool.get('/stations')
+        # Simulate the upstream dropping the idle connection
+        pool._idle[0][1].transport.abort()
+        await asyncio.sleep(0)
+        return await pool.get('/stations')
+
+    assert asyncio.run(run())[0] == 200
+
+def test_pool_reads_chunked_and_close_delimited_bodies():
+    """Test responses without a Content-Length are read in full."""
+    responses = [
+        b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n3\r\n[1,\r\n2\r\n2]\r\n0\r\n\r\n",
+        b"HTTP/1.0 200 OK\r\n\r\n[3]",
+    ]
+
+    async def run():
+        async def handle(reader, writer):
+            await reader.readuntil(b"\r\n\r\n")
+            writer.write(responses.pop(0))
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        pool = AsyncHttpPool(f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}")
+        bodies = [(await pool.get('/stations'))[2] for _ in range(2)]
+        server.close()
+        return bodies
+
+    assert asyncio.run(run()) == [b"[1,2]", b"[3]"]
+
+def test_pool_errors(stub_upstream):
+    """Test timeouts and refused connections raise upstream errors."""
+    stub_upstream.delay = 0.5
+    with pytest.raises(UpstreamTimeout):
+        asyncio.run(AsyncHttpPool(stub_upstream.url, timeout=0.05).get('/stations'))
+    with pytest.raises(UpstreamError):
+        asyncio.run(AsyncHttpPool("http://127.0.0.1:9", timeout=1).get('/stations'))
+
+def test_station_upstream_forwards_filters_and_caches(stub_upstream):
+    """Test a page is fetched once, then served from the cache over one connection."""
+    stub_upstream.respond([{"id": "up1"}], headers={'X-Next-Cursor': 'abc'})
+    upstream = StationUpstream(stub_upstream.url + "/api")
+    params = {'city': 'Seattle', 'limit': '2', 'stream': 'ndjson'}
+    assert upstream.get_stations(params) == ([{"id": "up1"}], 'abc', 'miss')
+    assert upstream.get_stations(params) == ([{"id": "up1"}], 'abc', 'hit')
+    assert upstream.get_stations({'city': 'Boston'})[2] == 'miss'
+    assert stub_upstream.requests == ['/api/stations?city=Seattle&limit=2', '/api/stations?city=Boston']
+    assert len(stub_upstream.client_ports) == 1
+
+def test_station_upstream_cache_expires(stub_upstream):
+    """Test pages older than the TTL are fetched again."""
+    upstream = StationUpstream(stub_upstream.url, cache_ttl=0.05)
+    assert upstream.get_stations({})[2] == 'miss'
+    time.sleep(0.1)
+    assert upstream.get_stations({})[2] == 'miss'
+    assert len(stub_upstream.requests) == 2
+
+def test_station_upstream_coalesces_concurrent_fetches(stub_upstream):
+    """Test concurrent requests for a cold page share one upstream call."""
+    stub_upstream.respond([{"id": "up1"}])
+    stub_upstream.delay = 0.2
+    upstream = StationUpstream(stub_upstream.url)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: upstream.get_stations({'code': 'SEA'}), range(8)))
+    assert len(stub_upstream.requests) == 1
+    assert sorted(source for _, _, source in results) == ['coalesced'] * 7 + ['miss']
+    assert all(records == [{"id": "up1"}] for records, _, _ in results)
+
+def test_station_upstream_errors_are_shared_but_not_cached(stub_upstream):
+    """Test waiters get the leader's error and the next call tries again."""
+    stub_upstream.respond([], 503)
+    stub_upstream.delay = 0.2
+    upstream = StationUpstream(stub_upstream.url)
+    errors = []
+
+    def fetch():
+        try:
+            upstream.get_stations({})
+        except UpstreamError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 4
+    assert len(stub_upstream.requests) == 1
+
+    stub_upstream.respond([])
+    assert upstream.get_stations({})[2] == 'miss'
+
+def test_station_upstream_errors(stub_upstream):
+    """Test timeouts, refused connections and malformed bodies raise upstream errors."""
+    stub_upstream.respond({"not": "a list"})
+    with pytest.raises(UpstreamError):
+        StationUpstream(stub_upstream.url).get_stations({})
+    stub_upstream.delay = 0.5
+    with pytest.raises(UpstreamTimeout):
+        StationUpstream(stub_upstream.url, timeout=0.05).get_stations({})
+    with pytest.raises(UpstreamError):
+        StationUpstream("http://127.0.0.1:9", timeout=1).get_stations({})
+    with pytest.raises(ValueError):
+        StationUpstream("stations")
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+def test_station_upstream_forked_child_uses_own_connection(stub_upstream):
+    """Test a child forked after a warm call opens its own connection instead of sharing the parent's."""
+    stub_upstream.respond([{"id": "up1"}])
+    upstream = StationUpstream(stub_upstream.url, cache_ttl=0)
+    upstream.get_stations({})
+    parent_ports = set(stub_upstream.client_ports)
+    assert len(parent_ports) == 1
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            ok = upstream.get_stations({})[0] == [{"id": "up1"}]
+        except BaseException:
+            ok = False
+        os._exit(0 if ok else 1)
+    assert os.waitpid(pid, 0)[1] == 0
+
+    child_ports = stub_upstream.client_ports - parent_ports
+    assert len(child_ports) == 1
+    # The parent keeps its own kept-alive connection
+    upstream.get_stations({})
+    assert stub_upstream.client_ports == parent_ports | child_ports
+    assert len(stub_upstream.requests) == 3